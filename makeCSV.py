@@ -1,12 +1,57 @@
 #!/usr/bin/env python
 
+import hashlib
 import os
 import os.path
+import re
+import sqlite3
 from argparse import ArgumentParser
+import sys
 from sys import stderr
 
+# result files are read the same way as by the scripts that write them
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "results", "scripts"));
+from resultfile import scanResult
+
 SOLVERS = ["UTL", "FSA", "SVPA"]
 
+# merged results of analyzeAll.py -tiered
+TIERED = "TIERED";
+
+RESULT_FILE = re.compile(r"^inter\.([A-Za-z]+)\.result(\.stack)?$");
+
+RESULT_FIELDS = ("completed", "timedOut", "memedOut", "completedTime",
+                 "failedTime", "yesCount", "noCount", "maybeCount",
+                 "peakRSS", "meanRSS", "rssGrowth", "peakJVMHeap", "phases",
+                 "escalation", "predictedTime");
+
+# telemetry summaries appended by analyzeAll.py -sample-interval
+TELEMETRY_MARKERS = [("@PEAKRSS", "peakRSS"), ("@MEANRSS", "meanRSS"),
+                     ("@RSSGROWTH", "rssGrowth"),
+                     ("@PEAKJVMHEAP", "peakJVMHeap")];
+
+# phases recorded by analyzeAll.py -phases (see scripts/phases.py)
+PHASES = ["input", "slice", "reach", "solve", "output"];
+
+# what analyzeAll.py -escalate records of the rung a run finished on (see
+# scripts/escalation.py)
+ESCALATION_COLUMNS = ["Rung", "Rungs", "TimeLimit", "MemoryLimit"];
+
+# bump whenever the runs table changes; an older index is rebuilt from scratch
+SCHEMA_VERSION = 5;
+
+RUNS_SCHEMA = """CREATE TABLE IF NOT EXISTS runs (
+                   path TEXT PRIMARY KEY, solver TEXT, stack INTEGER,
+                   app TEXT, version TEXT, fault TEXT, testcase TEXT,
+                   position INTEGER, mtime REAL, size INTEGER, sha1 TEXT,
+                   completed INTEGER, timedOut INTEGER, memedOut INTEGER,
+                   completedTime TEXT, failedTime TEXT,
+                   yesCount TEXT, noCount TEXT, maybeCount TEXT,
+                   peakRSS TEXT, meanRSS TEXT, rssGrowth TEXT,
+                   peakJVMHeap TEXT, phases TEXT, escalation TEXT,
+                   predictedTime TEXT)""";
+
 def printOne(solver, app, version, fault, completed, timeout, memoryout, totaltime, yesCount, noCount, maybeCount):
   printable = "" + solver + "," + app + "," + version + "," + fault;
   for v in [completed, timeout, memoryout]:
@@ -17,7 +62,107 @@ def printOne(solver, app, version, fault, completed, timeout, memoryout, totalti
   return(printable);
 #end: printOne
 
-def extractOneSolver(solver, path, fileToSearch):
+# app, version, and fault for a result directory (.../app/vN/fault/testcase)
+def describeRun(dirname):
+  splitDir = dirname.split('/');
+  fault = splitDir[-2];
+  version = splitDir[-3];
+  if(version[0] != "v"):
+    print >> stderr, ("Invalid version");
+    exit(1);
+  #end if
+  version = version[1:];
+  app = splitDir[-4];
+  return(app, version, fault);
+#end: describeRun
+
+def parseResult(path):
+  scanned = scanResult(path);
+  result = {"timedOut": scanned["timedOut"], "memedOut": scanned["memedOut"],
+            "completed": scanned["@ANALYSISTIME"] != None,
+            "completedTime": scanned["@ANALYSISTIME"],
+            "failedTime": scanned["@FAILURETIME"],
+            "yesCount": scanned["yesCount"], "noCount": scanned["noCount"],
+            "maybeCount": scanned["maybeCount"],
+            # "RUNG RUNGS MAX_TIME MAX_MEMORY"
+            "escalation": scanned["markers"].get("@ESCALATION"),
+            # "NAME SECONDS PEAK_RSS" for each phase, ";"-separated
+            "phases": ";".join(scanned["phases"]) or None,
+            # set only for runs skipped as predicted timeouts, which were
+            # never run
+            "predictedTime": scanned["@PREDICTEDTIMEOUT"]};
+  for (marker, field) in TELEMETRY_MARKERS:
+    result[field] = scanned["markers"].get(marker);
+  #end for
+  return(result);
+#end: parseResult
+
+# runs that analyzeAll.py -skip-predicted-timeouts skipped have no outcome;
+# they are left out of the CSV (with a note), rather than counted as timeouts
+def skipPredicted(path, result):
+  if(result["predictedTime"] == None):
+    return(False);
+  #end if
+  print >> stderr, ("Leaving out a run skipped as a predicted timeout: " + \
+                    path);
+  return(True);
+#end: skipPredicted
+
+def checkResult(path, result):
+  # check consistency
+  if(result["failedTime"] == None and result["completedTime"] == None):
+    print >> stderr, ("ERROR: run neither completed nor failed!");
+    print >> stderr, (path);
+    exit(1);
+  elif(result["failedTime"] != None and result["completedTime"] != None):
+    print >> stderr, ("ERROR: run completed and failed!");
+    print >> stderr, (path);
+    exit(1);
+  elif(result["failedTime"] != None and \
+       not result["timedOut"] and not result["memedOut"]):
+    print >> stderr, ("ERROR: failure with no time or memory out!");
+    print >> stderr, (path);
+    exit(1);
+  #end if
+#end: checkResult
+
+def printHeader(telemetry, phases=False, escalation=False):
+  print("Solver,App,Version,Fault,Completed,Timeout,Memoryout,AnalysisTime,Yes,No,Maybe" + \
+        (",PeakRSS,MeanRSS,RSSGrowth,PeakJVMHeap" if telemetry else "") + \
+        "".join("," + p.capitalize() + "Time," + p.capitalize() + "RSS"
+                for p in (PHASES if phases else [])) + \
+        "".join("," + c for c in (ESCALATION_COLUMNS if escalation else [])))
+#end: printHeader
+
+def printResult(solver, app, version, fault, result, telemetry=False,
+                phases=False, escalation=False):
+  printable = printOne(solver, app, version, fault, \
+                 result["completed"], result["timedOut"], \
+                 False if result["timedOut"] else result["memedOut"], \
+                 (result["completedTime"] if result["completedTime"] != None \
+                                          else result["failedTime"]), \
+                 result["yesCount"], result["noCount"], result["maybeCount"]);
+  if(telemetry):
+    for (_, field) in TELEMETRY_MARKERS:
+      printable += "," + (result[field] if result[field] != None else "");
+    #end for
+  #end if
+  if(phases):
+    times = dict((entry.split()[0], entry.split()[1:])
+                 for entry in (result["phases"] or "").split(";") if entry);
+    for name in PHASES:
+      printable += "," + ",".join(times.get(name, ["", ""]));
+    #end for
+  #end if
+  if(escalation):
+    printable += "," + ",".join((result["escalation"] or "").split() or
+                                [""] * len(ESCALATION_COLUMNS));
+  #end if
+  print(printable);
+#end: printResult
+
+def extractOneSolver(solver, path, fileToSearch, telemetry=False,
+                     phases=False, escalation=False):
   timeoutCount = 0;
   memoryoutCount = 0;
   completedCount = 0;
@@ -25,65 +170,14 @@ def extractOneSolver(solver, path, fileToSearch):
   for dirname, dirnames, filenames in os.walk(path):
     for filename in filenames:
       if(filename == fileToSearch):
-        splitDir = dirname.split('/');
-        fault = splitDir[-2];
-        version = splitDir[-3];
-        if(version[0] != "v"):
-          print >> stderr, ("Invalid version");
-          exit(1);
+        (app, version, fault) = describeRun(dirname);
+        result = parseResult(os.path.join(dirname, filename));
+        if(skipPredicted(os.path.join(dirname, filename), result)):
+          continue;
         #end if
-        version = version[1:];
-        app = splitDir[-4];
-
-        timedOut = False;
-        memedOut = False;
-        completed = False;
-        completedTime = None;
-        failedTime = None;
-        yesCount = None;
-        noCount = None;
-        maybeCount = None;
-
-        with open(os.path.join(dirname, filename), 'r') as readMe:
-          for line in readMe:
-            if(line[:8] == "@TIMEOUT"):
-              timedOut = True;
-            elif(line[:10] == "@MEMORYOUT"):
-              memedOut = True;
-            elif(line[:13] == "@ANALYSISTIME"):
-              completed = True;
-              completedTime = line[13:].strip();
-            elif(line[:12] == "@FAILURETIME"):
-              failedTime = line[12:].strip();
-            elif(line[:8] == "defYes ("):
-              yesCount = line[8:].split()[0].strip();
-            elif(line[:7] == "defNo ("):
-              noCount = line[7:].split()[0].strip();
-            elif(line[:7] == "maybe ("):
-              maybeCount = line[7:].split()[0].strip();
-          #end for
-        #end with
-        
-        # check consistency
-        if(failedTime == None and completedTime == None):
-          print >> stderr, ("ERROR: run neither completed nor failed!");
-          print >> stderr, (os.path.join(dirname, filename));
-          exit(1);
-        elif(failedTime != None and completedTime != None):
-          print >> stderr, ("ERROR: run completed and failed!");
-          print >> stderr, (os.path.join(dirname, filename));
-          exit(1);
-        elif(failedTime != None and not timedOut and not memedOut):
-          print >> stderr, ("ERROR: failure with no time or memory out!");
-          print >> stderr, (os.path.join(dirname, filename));
-          exit(1);
-        #end if
-
-        print(printOne(solver, app, version, fault, \
-                       completed, timedOut, \
-                       False if timedOut else memedOut, \
-                       (completedTime if completedTime != None else failedTime), \
-                       yesCount, noCount, maybeCount));
+        checkResult(os.path.join(dirname, filename), result);
+        printResult(solver, app, version, fault, result, telemetry, phases,
+                    escalation);
       #end if
     #end for
   #end for
@@ -91,13 +185,105 @@ def extractOneSolver(solver, path, fileToSearch):
   return(str(timeoutCount) + " " + str(memoryoutCount) + " " + str(completedCount));
 #end: extractOneSolver
 
-def extractCSV(path, stackOnly):
-  print("Solver,App,Version,Fault,Completed,Timeout,Memoryout,AnalysisTime,Yes,No,Maybe")
-  for solver in SOLVERS:
+def extractCSV(path, stackOnly, telemetry=False, tiered=False, phases=False,
+               escalation=False):
+  printHeader(telemetry, phases, escalation);
+  for solver in SOLVERS + ([TIERED] if tiered else []):
     extractOneSolver(solver, path, "inter." + solver + ".result" + \
-                                   (".stack" if stackOnly else ""));
+                                   (".stack" if stackOnly else ""), telemetry,
+                     phases, escalation);
 #end: extractCSV
 
+def fileHash(path):
+  with open(path, 'rb') as readMe:
+    return(hashlib.sha1(readMe.read()).hexdigest());
+#end: fileHash
+
+# bring the run index in dbPath up to date with the result files under path,
+# re-reading only files whose size, modification time, and content changed
+def ingest(path, dbPath):
+  root = os.path.abspath(path);
+  db = sqlite3.connect(dbPath);
+  if(db.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION):
+    db.execute("DROP TABLE IF EXISTS runs");
+    db.execute("PRAGMA user_version = %d" % SCHEMA_VERSION);
+  #end if
+  db.execute(RUNS_SCHEMA);
+  known = dict((row[0], row[1:]) for row in
+               db.execute("SELECT path, mtime, size, sha1 FROM runs"));
+
+  positions = [];
+  reread = 0;
+  for dirname, dirnames, filenames in os.walk(root):
+    for filename in filenames:
+      match = RESULT_FILE.match(filename);
+      if(not match or match.group(1) not in SOLVERS + [TIERED]):
+        continue;
+      #end if
+      filePath = os.path.join(dirname, filename);
+      stat = os.stat(filePath);
+      positions.append((len(positions), filePath));
+      old = known.pop(filePath, None);
+      if(old != None and old[0] == stat.st_mtime and old[1] == stat.st_size):
+        continue;
+      #end if
+      digest = fileHash(filePath);
+      if(old != None and old[2] == digest):
+        db.execute("UPDATE runs SET mtime = ?, size = ? WHERE path = ?",
+                   (stat.st_mtime, stat.st_size, filePath));
+        continue;
+      #end if
+
+      reread += 1;
+      (app, version, fault) = describeRun(dirname);
+      result = parseResult(filePath);
+      db.execute("INSERT OR REPLACE INTO runs VALUES (" + \
+                 ", ".join(["?"] * (11 + len(RESULT_FIELDS))) + ")",
+                 (filePath, match.group(1), match.group(2) != None,
+                  app, version, fault, os.path.basename(dirname),
+                  0, stat.st_mtime, stat.st_size, digest) + \
+                 tuple(result[field] for field in RESULT_FIELDS));
+    #end for
+  #end for
+
+  # remember the walk order (so the CSV rows come out as a walk would list
+  # them) and forget runs whose result files are gone
+  db.executemany("UPDATE runs SET position = ? WHERE path = ?", positions);
+  db.executemany("DELETE FROM runs WHERE path = ?",
+                 [(gone,) for gone in known if gone.startswith(root + os.sep)]);
+  db.commit();
+  print >> stderr, ("Indexed %d result files (%d re-read)." % \
+                    (len(positions), reread));
+  return(db);
+#end: ingest
+
+def extractCSVFromIndex(path, stackOnly, dbPath, telemetry=False,
+                        tiered=False, phases=False, escalation=False):
+  db = ingest(path, dbPath);
+  root = os.path.abspath(path);
+  printHeader(telemetry, phases, escalation);
+  for solver in SOLVERS + ([TIERED] if tiered else []):
+    for row in db.execute("SELECT path, app, version, fault, " + \
+                          ", ".join(RESULT_FIELDS) + " FROM runs " + \
+                          "WHERE solver = ? AND stack = ? ORDER BY position",
+                          (solver, stackOnly)):
+      if(not row[0].startswith(root + os.sep)):
+        continue;
+      #end if
+      result = dict(zip(RESULT_FIELDS, row[4:]));
+      for field in ("completed", "timedOut", "memedOut"):
+        result[field] = bool(result[field]);
+      #end for
+      if(skipPredicted(row[0], result)):
+        continue;
+      #end if
+      checkResult(row[0], result);
+      printResult(solver, str(row[1]), str(row[2]), str(row[3]), result,
+                  telemetry, phases, escalation);
+    #end for
+  #end for
+#end: extractCSVFromIndex
+
 def parseArguments():
   parser = ArgumentParser(prog="makeCSV",
               description="Create the result CSV file from a result directory");
@@ -105,13 +291,43 @@ def parseArguments():
   parser.add_argument("-stack", "--stack", action="store_true",
                       dest="stack", default=False,
                       help="Look for \"stack-only\" analysis results.");
+  parser.add_argument("-db", "--db", dest="db", default=None,
+                      help="Keep an index of runs in this SQLite database, " + \
+                           "re-reading only result files that changed " + \
+                           "since the last run.");
+  parser.add_argument("-telemetry", "--telemetry", action="store_true",
+                      dest="telemetry", default=False,
+                      help="Add the peak and mean resident size, its " + \
+                           "growth rate, and the peak JVM heap of each run " + \
+                           "(see analyzeAll.py -sample-interval).");
+  parser.add_argument("-tiered", "--tiered", action="store_true",
+                      dest="tiered", default=False,
+                      help="Add rows for the merged results of tiered " + \
+                           "analysis (see analyzeAll.py -tiered).");
+  parser.add_argument("-phases", "--phases", action="store_true",
+                      dest="phases", default=False,
+                      help="Add the time (seconds) and peak resident size " + \
+                           "(KB) of each phase of each run (see " + \
+                           "analyzeAll.py -phases).");
+  parser.add_argument("-escalation", "--escalation", action="store_true",
+                      dest="escalation", default=False,
+                      help="Add the rung each run finished on, the number " + \
+                           "of rungs, and the run's time (seconds) and " + \
+                           "memory (MB) limits there (see analyzeAll.py " + \
+                           "-escalate).");
   return(parser.parse_args());
 #end: parseArguments
 
 def main():
   args = parseArguments();
 
-  extractCSV(args.directory, args.stack);
+  if(args.db != None):
+    extractCSVFromIndex(args.directory, args.stack, args.db, args.telemetry,
+                        args.tiered, args.phases, args.escalation);
+  else:
+    extractCSV(args.directory, args.stack, args.telemetry, args.tiered,
+               args.phases, args.escalation);
+  #end if
 #end: main
 
 if __name__ == '__main__' :
@@ -1,22 +1,87 @@
 #!/usr/bin/env python
 
+import cProfile
+import grissom
 from grissom import solve
-import glob
+import hashlib
+import json
 import os
 import os.path
 import random
 import resource
+import shutil
 import signal
 from argparse import ArgumentParser
 from sys import stdout, stderr, argv
 import time
+from cStringIO import StringIO
 
 from jpype import JavaException
 
+from cfg import findGraphInput, isGraphParts, parseGraphML, procedureOf
+from cfgcache import contentHash, loadCFG
+from cfgstore import materialize, readIndex, storeKey
+from costmodel import CostModel
+from escalation import escalationMarker, ladder, needsEscalation, onRung
+from failurereport import REPORT_JSON, REPORT_NAMES, readReport, reportPath, \
+                          reportText
+from leases import Leases, checkSweep, leasedFile
+from memlimit import MemoryGuard, jvmOptions, memoryoutRSS
+from phases import PhaseTimer, calleeTimes, profilePath
+from reachindex import loadIndex, settle
+from resultcache import DEFAULT_CACHE_SIZE, ResultCache, cacheKey
+from resultfile import isFinal, readResult, recordPath, writeRecord
+from scheduler import Job, machineMemory, runJobs
+from slicing import addSlicedNo, relevantProcedures, sliceGraphML, sliceSizes
+from streams import chunks, openInputs, pipePath, releasePipePath
+from telemetry import Monitor, startHeapSampler, telemetryPath
+from tiers import TIERED, TIERS, mergeTiers, needsTier
+from warmworker import runWarmJobs
+
 RANDOM_SEED = 2132017;
 
 SOLVERS = ["UTL", "FSA", "SVPA"]
 
+# fingerprints of the inputs of queued jobs; a run that finishes with a final
+# outcome records its fingerprint next to its result file, so that a resumed
+# sweep can skip it
+FINGERPRINTS = dict();
+
+# seconds between telemetry samples (see telemetry.py), or None for no samples
+SAMPLE_INTERVAL = None;
+
+# digests of the CFG of each fault directory (and, under None, of the tool)
+GRAPH_DIGESTS = dict();
+
+# completed results by their inputs (see resultcache.py), or None; and each
+# queued job's key into it
+RESULT_CACHE = None;
+RESULT_KEYS = dict();
+
+# with escalating limits (see escalation.py), the rung each queued job is on,
+# as (rung, rungs)
+RUNGS = dict();
+
+# enforces MAX_MEMORY on resident memory (see memlimit.py), or None to limit
+# the address space of non-SVPA runs instead
+MEMORY_GUARD = None;
+
+# leases on the jobs of a sweep shared with other instances (see leases.py),
+# or None
+LEASES = None;
+
+# whether to solve on the CFG sliced for each failure (see slicing.py)
+SLICE = False;
+
+# whether to hand the solver only the blocks that the CFG's reachability index
+# doesn't settle as No (see reachindex.py)
+REACH_INDEX = False;
+
+# whether to record the time of each phase of a run, and whether to profile
+# the solver as well (see phases.py)
+PHASES = False;
+PROFILE = False;
+
 def cpu_handler(signum, frame):
   assert(signum == signal.SIGXCPU);
   print >> stderr, ("ERROR: timeout error (SIGXCPU)");
@@ -37,10 +102,7 @@ def mem_handler(signum, frame):
   exit(1);
 #end: mem_handler
 
-def analyzeOne(solver, dirname, stackOnly):
-  resultPath = os.path.join(dirname, "inter." + solver + ".result" + \
-                            (".stack" if stackOnly else ""));
-
+def readLimits():
   # maxMemory is in MegaBytes
   # maxTime is in Seconds
   try:
@@ -53,151 +115,785 @@ def analyzeOne(solver, dirname, stackOnly):
     maxTime = max(maxTime, 900);
   except:
     maxTime = 10800;
+  return(maxMemory, maxTime);
+#end: readLimits
 
-  signal.signal(signal.SIGALRM, lambda x, y: None);
-  signal.signal(signal.SIGCHLD, lambda x, y: None);
+def resultName(solver, stackOnly):
+  return("inter." + solver + ".result" + (".stack" if stackOnly else ""));
+#end: resultName
 
-  pid = os.fork();
-  if(pid != 0):
-    # in the parent: just wait for the child to finish or time/memory out
-    # i.e., we still only run one analysis instance at a time
-    startingT = time.time();
-    #os.waitpid(pid, 0);
-    while(True):
-      (childPid, childExitStatus, childRUse) = os.wait4(pid, os.WNOHANG);
-      if(childPid != 0):
-        break;
-      elif(time.time() - startingT > maxTime + 600):
-        print >> stderr, ("Killing child who missed timeout signal");
-        os.kill(pid, signal.SIGKILL);
-        (childPid, childExitStatus, childRUse) = os.wait4(pid, 0);
-        break;
-      #end if
-      signal.alarm(30);
-      signal.pause();
-      signal.alarm(0);
-    #end while
-    if(childExitStatus != 0):
-      with open(resultPath, 'a') as resultFile:
-        print >> resultFile, ("\n@FAILURETIME %0.3f" % (time.time() - startingT));
-        foundProblem = False;
-        if(childRUse.ru_utime + childRUse.ru_stime >= maxTime - 100):
-          foundProblem = True;
-          print >> resultFile, ("ERROR: timeout error final obs");
-          print >> resultFile, ("@TIMEOUT");
-        if(childRUse.ru_maxrss >= int(maxMemory * 0.625 * 1024)):
-          foundProblem = True;
-          print >> resultFile, ("ERROR: memoryout error final obs");
-          print >> resultFile, ("@MEMORYOUT");
-        if(not foundProblem):
-          print >> resultFile, ("ERROR: unknown non-zero exit status");
-          print >> resultFile, ("@UNKNOWN");
+def jobResultPath(job):
+  return(os.path.join(job.dirname, resultName(job.solver, job.stackOnly)));
+#end: jobResultPath
+
+def fingerprintPath(job):
+  return(os.path.join(job.dirname,
+                      resultName(job.solver, job.stackOnly) + ".fingerprint"));
+#end: fingerprintPath
+
+# the files of the analysis tool that a result depends on, as (name, path)
+# pairs: the Python sources and jars of grissom's package directory (with its
+# csilibs), and the symbolicautomata jars that SVPA loads, found under
+# SVPA_LIB_DIR (as in the Makefile; by default, the checkout next to grissom's)
+# or on the CLASSPATH.  Names are relative, so that hosts with the same build
+# agree on the version.
+def toolFiles():
+  analysis = os.path.dirname(os.path.abspath(grissom.__file__));
+  checkouts = os.path.dirname(os.path.dirname(analysis));
+  svpaLib = os.environ.get("SVPA_LIB_DIR", os.path.join(checkouts,
+                                                        "symbolicautomata",
+                                                        "SVPAlib"));
+  files = [];
+  for (root, extensions) in ((analysis, (".py", ".jar")), (svpaLib, (".jar",))):
+    for (dirpath, dirnames, filenames) in os.walk(root):
+      dirnames.sort();
+      for name in sorted(filenames):
+        if(os.path.splitext(name)[1] in extensions):
+          path = os.path.join(dirpath, name);
+          files.append((os.path.relpath(path, os.path.dirname(root)), path));
         #end if
-      #end with
+      #end for
+    #end for
+  #end for
+  for path in os.environ.get("CLASSPATH", "").split(os.pathsep):
+    if(path.endswith(".jar") and os.path.isfile(path)):
+      files.append((os.path.join("CLASSPATH", os.path.basename(path)), path));
     #end if
-    print >> stderr, ("Child rusage: " + str((childPid, childExitStatus, childRUse)));
-    print >> stderr, ("That one took %0.3f" % (time.time() - startingT));
+  #end for
+  return(files);
+#end: toolFiles
+
+def toolVersion():
+  digest = hashlib.sha1();
+  for (name, path) in toolFiles():
+    digest.update(name + "\0" + contentHash(path) + "\n");
+  #end for
+  return(digest.hexdigest());
+#end: toolVersion
+
+def graphDigest(faultDir):
+  inputs = findGraphInput(faultDir);
+  if(inputs):
+    return(contentHash(inputs));
+  elif(os.environ.get("CFG_STORE")):
+    (app, relDir) = storeKey(faultDir);
+    entry = readIndex(os.environ["CFG_STORE"], app).get(relDir);
+    return(entry["sha1"] if entry != None else None);
+  #end if
+  return(None);
+#end: graphDigest
+
+# (digest of the job's CFG, digest of the analysis tool)
+def inputDigests(job):
+  faultDir = os.path.dirname(os.path.abspath(job.dirname));
+  if(faultDir not in GRAPH_DIGESTS):
+    GRAPH_DIGESTS[faultDir] = graphDigest(faultDir);
+  #end if
+  if(None not in GRAPH_DIGESTS):
+    GRAPH_DIGESTS[None] = toolVersion();
+  #end if
+  return(GRAPH_DIGESTS[faultDir], GRAPH_DIGESTS[None]);
+#end: inputDigests
+
+# everything a run's outcome depends on
+def fingerprint(job):
+  (graph, tool) = inputDigests(job);
+  return(hashlib.sha1(json.dumps([
+           graph, contentHash(reportPath(job.dirname)),
+           job.solver, job.stackOnly, job.maxTime, job.maxMemory, tool] + \
+          ([MEMORY_GUARD.mode] if MEMORY_GUARD != None else []) + \
+          (["slice"] if SLICE else []) + \
+          (["reach-index"] if REACH_INDEX else []))).hexdigest());
+#end: fingerprint
+
+# the job's key into the result cache, or None if it can't be cached
+def resultCacheKey(job):
+  (graph, tool) = inputDigests(job);
+  if(graph == None):
+    return(None);
+  #end if
+  try:
+    return(cacheKey(graph, tool, job.solver, job.stackOnly,
+                    reportPath(job.dirname),
+                    {"slice": SLICE, "reachIndex": REACH_INDEX,
+                     "maxTime": job.maxTime, "maxMemory": job.maxMemory}));
+  except (IOError, ValueError):
+    return(None);
+  #end try
+#end: resultCacheKey
+
+def isDone(job):
+  try:
+    with open(fingerprintPath(job), 'r') as readMe:
+      recorded = readMe.read().strip();
+    #end with
+  except IOError:
+    return(False);
+  #end try
+  resultPath = jobResultPath(job);
+  return(recorded == FINGERPRINTS.get(job) and isFinal(readResult(resultPath)));
+#end: isDone
+
+def recordDone(job):
+  resultPath = jobResultPath(job);
+  if(job not in FINGERPRINTS or not isFinal(readResult(resultPath))):
+    return;
+  #end if
+  tempPath = fingerprintPath(job) + ".tmp";
+  with open(tempPath, 'w') as outFile:
+    print >> outFile, (FINGERPRINTS[job]);
+  #end with
+  os.rename(tempPath, fingerprintPath(job));
+#end: recordDone
+
+# the structured record of a run (see resultfile.py); childRUse is None for
+# a run that never ran, and cached is the result cache key of a result served
+# from the cache
+def writeJobRecord(job, childExitStatus, childRUse, elapsed, cached=None):
+  writeRecord(jobResultPath(job), {
+    "dirname": job.dirname, "solver": job.solver, "stackOnly": job.stackOnly,
+    "maxMemory": job.maxMemory, "maxTime": job.maxTime,
+    "exitStatus": childExitStatus, "elapsed": elapsed,
+    "utime": (childRUse.ru_utime if childRUse != None else 0.0),
+    "stime": (childRUse.ru_stime if childRUse != None else 0.0),
+    "maxrss": (childRUse.ru_maxrss if childRUse != None else 0),
+    "fingerprint": FINGERPRINTS.get(job),
+    "rung": (RUNGS[job][0] if job in RUNGS else None),
+    "cachedResult": cached});
+#end: writeJobRecord
+
+def finishOne(job, childExitStatus, childRUse, elapsed):
+  resultPath = jobResultPath(job);
+  if(childExitStatus != 0):
+    with open(resultPath, 'a') as resultFile:
+      print >> resultFile, ("\n@FAILURETIME %0.3f" % elapsed);
+      foundProblem = False;
+      if(childRUse.ru_utime + childRUse.ru_stime >= job.maxTime - 100):
+        foundProblem = True;
+        print >> resultFile, ("ERROR: timeout error final obs");
+        print >> resultFile, ("@TIMEOUT");
+      if(MEMORY_GUARD != None and MEMORY_GUARD.killedFor(job)):
+        foundProblem = True;
+        print >> resultFile, ("ERROR: memoryout error (RSS LIMIT)");
+        print >> resultFile, ("@MEMORYOUT");
+      elif(childRUse.ru_maxrss >= memoryoutRSS(job.maxMemory)):
+        foundProblem = True;
+        print >> resultFile, ("ERROR: memoryout error final obs");
+        print >> resultFile, ("@MEMORYOUT");
+      if(not foundProblem):
+        print >> resultFile, ("ERROR: unknown non-zero exit status");
+        print >> resultFile, ("@UNKNOWN");
+      #end if
+    #end with
+  #end if
+  if(job in RUNGS):
+    with open(resultPath, 'a') as resultFile:
+      print >> resultFile, (escalationMarker(RUNGS[job][0], RUNGS[job][1],
+                                             job));
+    #end with
+  #end if
+  writeJobRecord(job, childExitStatus, childRUse, elapsed);
+  recordDone(job);
+  print >> stderr, ("Child rusage: " + str((job, childExitStatus, childRUse)));
+  print >> stderr, ("That one took %0.3f" % elapsed);
+#end: finishOne
+
+# record a job that won't be run because it is predicted to time out; the
+# result file has its own status, "predicted", which is not final (see
+# resultfile.py) and which makeCSV.py leaves out
+def skipOne(job, predictedTime):
+  with open(jobResultPath(job), 'w') as resultFile:
+    print >> resultFile, ("ERROR: skipped; predicted to run %0.1f seconds" % \
+                          predictedTime);
+    print >> resultFile, ("@PREDICTEDTIMEOUT %0.1f" % predictedTime);
+  #end with
+  writeJobRecord(job, None, None, 0.0);
+#end: skipOne
+
+# cpuUsed: CPU seconds the calling process has already spent; given only for
+# a warm worker, which keeps its hard limit so that later runs can raise the
+# soft limit again
+def limitChild(job, cpuUsed=None):
+  # sadly, these all do NOTHING
+  # resource.setrlimit(resource.RLIMIT_RSS, (10, 10))
+  # resource.setrlimit(resource.RLIMIT_STACK, (100, 100))
+  # resource.setrlimit(resource.RLIMIT_DATA, (100, 100))
+
+  # don't dump core files; kill after 3 hours or using maxMemory GB of memory
+  # NOTE: this is GB of address space (not RSS) due to OS limitations
+  resource.setrlimit(resource.RLIMIT_CORE, (0,0));
+  if(cpuUsed == None):
+    resource.setrlimit(resource.RLIMIT_CPU, (job.maxTime, job.maxTime + 60));
   else:
-    # sadly, these all do NOTHING
-    # resource.setrlimit(resource.RLIMIT_RSS, (10, 10))
-    # resource.setrlimit(resource.RLIMIT_STACK, (100, 100))
-    # resource.setrlimit(resource.RLIMIT_DATA, (100, 100))
-
-    # don't dump core files; kill after 3 hours or using maxMemory GB of memory
-    # NOTE: this is GB of address space (not RSS) due to OS limitations
-    resource.setrlimit(resource.RLIMIT_CORE, (0,0));
-    resource.setrlimit(resource.RLIMIT_CPU, (maxTime, maxTime + 60));
-    signal.signal(signal.SIGXCPU, cpu_handler);
-    if(solver not in ("SVPA", "Pexpect")):
-      memLimitInBytes = int(maxMemory * 0.78125 * 1048576);
-      resource.setrlimit(resource.RLIMIT_AS, (memLimitInBytes, memLimitInBytes));
-    signal.signal(signal.SIGABRT, mem_handler);
-    signal.signal(signal.SIGTERM, mem_handler);
-    signal.signal(signal.SIGSEGV, mem_handler);
-
-    retcode = -1;
-    try:
-      os.chdir(dirname);
-      pathToOpen = "inter." + solver + ".result" + (".stack" if stackOnly else "");
-      with open(pathToOpen, 'w') as resultFile:
-        stdout.flush();
-        stderr.flush();
-        os.dup2(resultFile.fileno(), stdout.fileno());
-        os.dup2(resultFile.fileno(), stderr.fileno());
-
-        # find necessary input files via glob
-        inGraphFile = glob.glob("../*.graphml");
-        if(len(inGraphFile) != 1):
-          print >> stderr, ("ERROR: wrong number of graphml files");
-          print >> stderr, str(inGraphFile);
-          print >> stderr, ("@ERROR");
-          exit(1);
-        #end if
+    cpuHard = resource.getrlimit(resource.RLIMIT_CPU)[1];
+    resource.setrlimit(resource.RLIMIT_CPU,
+                       (int(cpuUsed) + job.maxTime, cpuHard));
+  #end if
+  signal.signal(signal.SIGXCPU, cpu_handler);
+  if(MEMORY_GUARD != None):
+    MEMORY_GUARD.join(job);
+    # the guard watches resident memory; size the JVM heap to fit within it
+    os.environ["_JAVA_OPTIONS"] = jvmOptions(job.maxMemory);
+  elif(job.solver not in ("SVPA", "Pexpect")):
+    memLimitInBytes = int(job.maxMemory * 0.78125 * 1048576);
+    resource.setrlimit(resource.RLIMIT_AS, (memLimitInBytes, memLimitInBytes));
+  signal.signal(signal.SIGABRT, mem_handler);
+  signal.signal(signal.SIGTERM, mem_handler);
+  signal.signal(signal.SIGSEGV, mem_handler);
+#end: limitChild
+
+# the CFG of inputs, or of the CFG store if there are none, as (its SHA-1,
+# function() -> its GraphML text as pieces, function() -> the parsed CFG)
+def graphSource(inputs):
+  if(inputs):
+    return(contentHash(inputs), lambda: chunks(openInputs(inputs)),
+           lambda: loadCFG(inputs));
+  #end if
+  (app, relDir) = storeKey("..");
+  pieces = lambda: materialize(os.environ["CFG_STORE"], app, relDir);
+  return(readIndex(os.environ["CFG_STORE"], app)[relDir]["sha1"], pieces,
+         lambda: parseGraphML(StringIO("".join(pieces()))));
+#end: graphSource
+
+# the CFG (as for graphSource) sliced for the failure reported in the current
+# directory; returns (path to the slice, sizes from slicing.sliceSizes), with
+# no path if slicing leaves out nothing
+def sliceInput(inputs):
+  (digest, pieces, makeGraph) = graphSource(inputs);
+  graph = makeGraph();
+  keep = relevantProcedures(loadIndex(digest, lambda: graph),
+                            readReport(reportPath(".")));
+  if(keep == None):
+    return(None, None);
+  #end if
+  sizes = sliceSizes(graph, keep);
+  if(sizes[0] == sizes[1]):
+    return(None, sizes);
+  #end if
+  return(pipePath(sliceGraphML(pieces(),
+                               lambda nodeId: procedureOf(nodeId) in keep)),
+         sizes);
+#end: sliceInput
+
+# the CFG (as for graphSource) without the blocks that its reachability
+# index settles as No for the failure reported in the current directory;
+# returns (path to the pruned CFG, or None if nothing is settled, and the
+# counts from reachindex.settle)
+def reachInput(inputs, stackOnly):
+  (digest, pieces, makeGraph) = graphSource(inputs);
+  (keep, noBlocks, yesBlocks, blocks) = \
+    settle(loadIndex(digest, makeGraph), readReport(reportPath(".")),
+           stackOnly);
+  if(noBlocks == 0):
+    return(None, (noBlocks, yesBlocks, blocks));
+  #end if
+  return(pipePath(sliceGraphML(pieces(), keep.__contains__)),
+         (noBlocks, yesBlocks, blocks));
+#end: reachInput
+
+# add the blocks a slice left out to the No count in the result file, which
+# is open as stdout and stderr; raises ValueError if the solver wrote no No
+# count
+def addSlicedBlocks(resultPath, blocks):
+  stdout.flush();
+  stderr.flush();
+  with open(resultPath, 'r') as readMe:
+    text = readMe.read();
+  #end with
+  os.ftruncate(stdout.fileno(), 0);
+  os.lseek(stdout.fileno(), 0, os.SEEK_SET);
+  os.write(stdout.fileno(), addSlicedNo(text, blocks));
+#end: addSlicedBlocks
+
+# run the solver for one job, with stdout and stderr redirected into the
+# job's result file; returns the exit status the run should report
+def solveOne(job):
+  retcode = -1;
+  timer = PhaseTimer();
+  try:
+    os.chdir(job.dirname);
+    pathToOpen = resultName(job.solver, job.stackOnly);
+    with open(pathToOpen, 'w') as resultFile:
+      stdout.flush();
+      stderr.flush();
+      os.dup2(resultFile.fileno(), stdout.fileno());
+      os.dup2(resultFile.fileno(), stderr.fileno());
+
+      # find necessary input files via glob; a split or compressed graph is
+      # streamed to the solver through a pipe rather than unpacked to disk
+      timer.start("input");
+      inGraphFile = findGraphInput("..");
+      stored = None;
+      if(not inGraphFile and os.environ.get("CFG_STORE")):
+        (app, relDir) = storeKey("..");
+        stored = materialize(os.environ["CFG_STORE"], app, relDir);
+      #end if
+      (sliced, sliceSize, reachCounts) = (None, None, None);
+      prunable = (stored != None or len(inGraphFile) == 1 or \
+                  isGraphParts(inGraphFile));
+      if(REACH_INDEX and prunable):
+        timer.start("reach");
+        reachStart = time.time();
+        (sliced, reachCounts) = reachInput(inGraphFile, job.stackOnly);
+        reachTime = time.time() - reachStart;
+        timer.start("input");
+      elif(SLICE and prunable):
+        timer.start("slice");
+        sliceStart = time.time();
+        (sliced, sliceSize) = sliceInput(inGraphFile);
+        sliceTime = time.time() - sliceStart;
+        timer.start("input");
+      #end if
+      if(sliced != None):
+        inGraphFile = sliced;
+      elif(stored != None):
+        inGraphFile = pipePath(stored);
+      elif(len(inGraphFile) != 1 and not isGraphParts(inGraphFile)):
+        print >> stderr, ("ERROR: wrong number of graphml files");
+        print >> stderr, str(inGraphFile);
+        print >> stderr, ("@ERROR");
+        return(1);
+      elif(len(inGraphFile) == 1 and inGraphFile[0].endswith(".graphml")):
         inGraphFile = inGraphFile[0];
+      else:
+        inGraphFile = pipePath(chunks(openInputs(inGraphFile)));
+      #end if
 
-        startTime = time.time();
-        retcode = solve([inGraphFile, \
-                         "--json=./data.json", \
-                         "--first=" + solver, \
-                         "--second=None"] + \
-                        (["-stackonly"] if stackOnly else []));
-        print("\n@ANALYSISTIME %0.3f" % (time.time() - startTime));
-      #end with
-    except MemoryError:
-      print >> stderr, ("ERROR: memoryout error (PYTHON NOMEM)");
-      print >> stderr, ("@MEMORYOUT");
-      exit(1);
-    except JavaException as caughtException:
-      if("OutOfMemoryError" in str(caughtException.javaClass())):
-        print >> stderr, ("ERROR: memoryout error (JAVA NOMEM)");
-        print >> stderr, ("@MEMORYOUT");
-        exit(1);
+      # the solver reads JSON; a binary report is streamed to it as JSON
+      inReport = "./" + REPORT_JSON;
+      if(not os.path.exists(inReport)):
+        inReport = pipePath([reportText(reportPath("."))]);
+      #end if
+
+      heapSampler = None;
+      if(SAMPLE_INTERVAL != None and job.solver == "SVPA"):
+        heapSampler = startHeapSampler(os.path.abspath(pathToOpen),
+                                       SAMPLE_INTERVAL);
+      #end if
+      startTime = time.time();
+      timer.start("solve");
+      solveArgs = [inGraphFile, \
+                   "--json=" + inReport, \
+                   "--first=" + job.solver, \
+                   "--second=None"] + \
+                  (["-stackonly"] if job.stackOnly else []);
+      profiler = None;
+      if(PROFILE):
+        profiler = cProfile.Profile();
+        retcode = profiler.runcall(solve, solveArgs);
       else:
-        print >> stderr, ("ERROR: some other kind of Java exception!");
-        print >> stderr, caughtException.message();
-        print >> stderr, caughtException.stacktrace();
-        exit(1);
+        retcode = solve(solveArgs);
       #end if
-    #end try
+      timer.start("output");
+      if(sliceSize != None):
+        ((procs, nodes, blocks), (keptProcs, keptNodes, keptBlocks)) = \
+          sliceSize;
+        addSlicedBlocks(pathToOpen, blocks - keptBlocks);
+        print("\n@SLICE procedures %d/%d nodes %d/%d blocks %d/%d" % \
+              (keptProcs, procs, keptNodes, nodes, keptBlocks, blocks));
+        print("@SLICETIME %0.3f" % sliceTime);
+      #end if
+      if(reachCounts != None):
+        (noBlocks, yesBlocks, blocks) = reachCounts;
+        if(noBlocks > 0):
+          addSlicedBlocks(pathToOpen, noBlocks);
+        #end if
+        print("\n@REACHINDEX blocks %d settled-no %d settled-yes %d" % \
+              (blocks, noBlocks, yesBlocks));
+        print("@REACHTIME %0.3f" % reachTime);
+      #end if
+      print("\n@ANALYSISTIME %0.3f" % (time.time() - startTime));
+      releasePipePath(inGraphFile);
+      releasePipePath(inReport);
+      if(heapSampler != None):
+        heapSampler.set();
+      #end if
+      if(profiler != None):
+        profiler.dump_stats(profilePath(os.path.abspath(pathToOpen)));
+        timer.stop();
+        for (function, seconds) in calleeTimes(profiler, solve):
+          timer.add("solve/" + function, seconds);
+        #end for
+      #end if
+      if(PHASES or PROFILE):
+        timer.report();
+      #end if
+    #end with
+  except MemoryError:
+    print >> stderr, ("ERROR: memoryout error (PYTHON NOMEM)");
+    if(PHASES or PROFILE):
+      # which phase ran out
+      timer.report(stderr);
+    #end if
+    print >> stderr, ("@MEMORYOUT");
+    return(1);
+  except JavaException as caughtException:
+    if("OutOfMemoryError" in str(caughtException.javaClass())):
+      print >> stderr, ("ERROR: memoryout error (JAVA NOMEM)");
+      if(PHASES or PROFILE):
+        timer.report(stderr);
+      #end if
+      print >> stderr, ("@MEMORYOUT");
+      return(1);
+    else:
+      print >> stderr, ("ERROR: some other kind of Java exception!");
+      print >> stderr, caughtException.message();
+      print >> stderr, caughtException.stacktrace();
+      return(1);
+    #end if
+  except ValueError as caughtError:
+    # e.g., no No count to add left-out blocks to (see addSlicedBlocks)
+    print >> stderr, ("ERROR: " + str(caughtError));
+    print >> stderr, ("@ERROR");
+    return(1);
+  #end try
+  return(0);
+#end: solveOne
 
-    # child (analysis run) should *always* exit; *never* return
-    exit(0);
+def startOne(job):
+  pid = os.fork();
+  if(pid != 0):
+    # in the parent: the scheduler waits for the child to finish or
+    # time/memory out
+    return(pid);
   #end if
+
+  limitChild(job);
+
+  # child (analysis run) should *always* exit; *never* return
+  exit(solveOne(job));
+#end: startOne
+
+def analyzeOne(solver, dirname, stackOnly):
+  (maxMemory, maxTime) = readLimits();
+  job = Job(dirname, solver, stackOnly, maxMemory, maxTime);
+  runJobs([job], startOne, finishOne);
 #end: analyzeOne
 
-def analyze(path, stackOnly):
+# allTests: queue every test case under path, rather than one picked at random
+def collectJobs(path, stackOnly, allTests=False):
   dirOptions = [];
   for dirname, dirnames, filenames in os.walk(path):
     for filename in filenames:
-      if(filename == "data.json"):
+      if(filename in REPORT_NAMES):
         dirOptions.append(dirname);
         break;
       #end if
     #end for
   #end for
 
+  (maxMemory, maxTime) = readLimits();
+  jobs = [];
   numOptions = len(dirOptions);
   didOne = (numOptions > 0);
-  if(didOne):
+  if(allTests):
+    for chosenDir in sorted(dirOptions):
+      for solver in SOLVERS:
+        jobs.append(Job(chosenDir, solver, stackOnly, maxMemory, maxTime));
+      #end for
+    #end for
+    print >> stderr, ("Queued " + str(len(jobs)) + " analysis runs.");
+    return(jobs);
+  elif(didOne):
     random.seed(RANDOM_SEED);
     chosenDir = sorted(dirOptions)[random.randint(0, numOptions-1)];
     print >> stderr, ("Analyzing (currently interprocedural only): " + chosenDir);
     for solver in SOLVERS:
-      analyzeOne(solver, chosenDir, stackOnly);
+      jobs.append(Job(chosenDir, solver, stackOnly, maxMemory, maxTime));
   #end if
 
-  print >> stderr, ("Did " + ("1" if didOne else "0") + " analysis runs.");
+  print >> stderr, ("Queued " + str(len(jobs)) + " analysis runs.");
+  return(jobs);
+#end: collectJobs
+
+# test cases of one fault whose data.json files are identical
+def batchKey(job):
+  return((os.path.dirname(os.path.abspath(job.dirname)), job.solver,
+          job.stackOnly, contentHash(reportPath(job.dirname))));
+#end: batchKey
+
+# jobs with equal sameResult(job) are analyzed once; each "leader" job maps
+# to the jobs that share its result
+def shareIdentical(jobs, sameResult):
+  leaders = [];
+  followers = dict();
+  seen = dict();
+  for job in jobs:
+    key = sameResult(job);
+    if(key in seen):
+      followers[seen[key]].append(job);
+    else:
+      seen[key] = job;
+      followers[job] = [];
+      leaders.append(job);
+    #end if
+  #end for
+  return(leaders, followers);
+#end: shareIdentical
+
+# copy a leader's result to the jobs with identical inputs
+def finishShared(job, followers, childExitStatus, childRUse, elapsed):
+  for follower in followers.get(job, []):
+    shutil.copy(jobResultPath(job), jobResultPath(follower));
+    with open(jobResultPath(follower), 'a') as resultFile:
+      print >> resultFile, ("\n@SHAREDRESULT " + job.dirname);
+    #end with
+    writeJobRecord(follower, childExitStatus, childRUse, elapsed);
+    recordDone(follower);
+  #end for
+#end: finishShared
+
+# a job answered from the result cache
+def finishCached(job):
+  with open(jobResultPath(job), 'a') as resultFile:
+    print >> resultFile, ("\n@CACHEDRESULT " + RESULT_KEYS[job]);
+    if(job in RUNGS):
+      print >> resultFile, (escalationMarker(RUNGS[job][0], RUNGS[job][1],
+                                             job));
+    #end if
+  #end with
+  if(SAMPLE_INTERVAL != None):
+    with open(telemetryPath(jobResultPath(job)), 'w') as outFile:
+      print >> outFile, ("C " + RESULT_KEYS[job]);
+    #end with
+  #end if
+  writeJobRecord(job, 0, None, 0.0, RESULT_KEYS[job]);
+  recordDone(job);
+#end: finishCached
+
+def analyze(path, stackOnly):
+  runJobs(collectJobs(path, stackOnly), startOne, finishOne);
 #end: analyze
 
 def clean_old(path, stackOnly):
   suffix = ".result" + (".stack" if stackOnly else "");
-  resultFiles = ["inter."+solver+suffix for solver in SOLVERS];
+  resultFiles = ["inter."+solver+suffix for solver in SOLVERS + [TIERED]];
+  resultFiles += [resultFile + ".fingerprint" for resultFile in resultFiles] + \
+                 [telemetryPath(resultFile) for resultFile in resultFiles] + \
+                 [recordPath(resultFile) for resultFile in resultFiles] + \
+                 [profilePath(resultFile) for resultFile in resultFiles];
   for dirname, dirnames, filenames in os.walk(path):
     for filename in filenames:
-      if(filename in resultFiles):
+      if(filename in resultFiles or leasedFile(filename) in resultFiles):
         os.remove(os.path.join(dirname, filename));
 #end: clean_old
 
+# run a list of jobs with the runner the arguments ask for
+def runPhase(args, jobs, monitors, reserve):
+  # answer what the result cache already knows, and run jobs that would
+  # give the same answer only once
+  sameResult = None;
+  if(RESULT_CACHE != None):
+    for job in jobs:
+      RESULT_KEYS[job] = resultCacheKey(job);
+    #end for
+    served = set(job for job in jobs if RESULT_KEYS[job] != None and \
+                 RESULT_CACHE.serve(RESULT_KEYS[job], jobResultPath(job)));
+    for job in served:
+      finishCached(job);
+      if(LEASES != None):
+        LEASES.release(job);
+      #end if
+    #end for
+    jobs = [job for job in jobs if job not in served];
+    sameResult = (lambda job: RESULT_KEYS[job] or (batchKey(job)
+                                                   if args.batch else job));
+  elif(args.batch):
+    sameResult = batchKey;
+  #end if
+  followers = dict();
+  if(sameResult != None):
+    (jobs, followers) = shareIdentical(jobs, sameResult);
+    print >> stderr, ("%d runs share the result of an identical run." % \
+                      sum(len(f) for f in followers.values()));
+  #end if
+  def finishAll(job, childExitStatus, childRUse, elapsed):
+    if(LEASES != None and LEASES.lostFor(job)):
+      # another instance took the job over; its result file is theirs now
+      LEASES.release(job);
+      return;
+    #end if
+    finishOne(job, childExitStatus, childRUse, elapsed);
+    if(RESULT_KEYS.get(job) != None and \
+       readResult(jobResultPath(job))["status"] == "completed"):
+      RESULT_CACHE.store(RESULT_KEYS[job], jobResultPath(job));
+    #end if
+    finishShared(job, followers, childExitStatus, childRUse, elapsed);
+    if(LEASES != None):
+      for done in [job] + followers.get(job, []):
+        LEASES.release(done);
+      #end for
+    #end if
+  #end: finishAll
+
+  memoryBudget = args.memoryBudget;
+  if(memoryBudget == None):
+    memoryBudget = machineMemory();
+  claim = None;
+  waitingOn = None;
+  if(LEASES != None):
+    def claim(job):
+      if(not LEASES.claim(job)):
+        return(False);
+      elif(os.path.exists(fingerprintPath(job))):
+        # left by an earlier sweep; the run is about to replace its result
+        os.remove(fingerprintPath(job));
+      #end if
+      return(True);
+    #end: claim
+  #end if
+  while(jobs):
+    if(args.batch):
+      runWarmJobs(jobs, limitChild, solveOne, finishAll, args.jobs,
+                  memoryBudget, (args.warm if args.warm > 0 else 100),
+                  monitors,
+                  lambda job: os.path.dirname(os.path.abspath(job.dirname)),
+                  claim=claim, reserve=reserve);
+    elif(args.warm > 0):
+      runWarmJobs(jobs, limitChild, solveOne, finishAll, args.jobs,
+                  memoryBudget, args.warm, monitors, claim=claim,
+                  reserve=reserve);
+    else:
+      runJobs(jobs, startOne, finishAll, args.jobs, memoryBudget, monitors,
+              reserve, claim);
+    #end if
+    if(LEASES == None):
+      break;
+    #end if
+
+    # jobs leased to other instances: wait for them, and take over any whose
+    # lease expires
+    jobs = [job for job in jobs if not LEASES.finished(job)];
+    if(jobs and len(jobs) != waitingOn):
+      print >> stderr, ("Waiting on %d runs leased to other instances." % \
+                        len(jobs));
+    #end if
+    if(jobs):
+      time.sleep(LEASES.interval);
+    #end if
+    waitingOn = len(jobs);
+  #end while
+#end: runPhase
+
+# the rung of the ladder (counting from 1) on which an earlier sweep finished
+# the job, or 0 if none did
+def finishedRung(job, limits):
+  try:
+    with open(fingerprintPath(job), 'r') as readMe:
+      recorded = readMe.read().strip();
+    #end with
+  except IOError:
+    return(0);
+  #end try
+  if(not isFinal(readResult(jobResultPath(job)))):
+    return(0);
+  #end if
+  for (rung, rungLimits) in enumerate(limits, 1):
+    if(fingerprint(onRung(job, rungLimits)) == recorded):
+      return(rung);
+    #end if
+  #end for
+  return(0);
+#end: finishedRung
+
+# run a list of jobs (with the full limits) on a ladder of escalating limits
+# (see escalation.py), or with the full limits if the ladder has one rung
+def runEscalated(args, jobs, monitors, reserve):
+  (maxMemory, maxTime) = readLimits();
+  limits = ladder(maxTime, maxMemory, args.escalate);
+  if(len(limits) == 1):
+    runPhase(args, jobs, monitors, reserve);
+    return;
+  #end if
+  # a resumed run that finished on some rung has only that rung's result, so
+  # it is skipped on the rungs below as well
+  finished = dict((job, (finishedRung(job, limits) if args.resume else 0))
+                  for job in jobs);
+  sweep = (LEASES.sweep if LEASES != None else None);
+  for (rung, rungLimits) in enumerate(limits, 1):
+    rungJobs = [onRung(job, rungLimits) for job in jobs];
+    queued = [];
+    for (fullJob, job) in zip(jobs, rungJobs):
+      RUNGS[job] = (rung, len(limits));
+      FINGERPRINTS[job] = fingerprint(job);
+      if(finished[fullJob] >= rung):
+        continue;
+      elif(LEASES == None and os.path.exists(fingerprintPath(job))):
+        os.remove(fingerprintPath(job));
+      #end if
+      queued.append(job);
+    #end for
+    if(LEASES != None and rung > 1):
+      # the leases of a rung say its runs are done; the next rung runs some
+      # of them again, so it takes leases of its own
+      LEASES.sweep = "%s-%d" % (sweep, rung);
+    #end if
+    print >> stderr, ("Rung %d of %d (%d seconds, %d MB): %d runs." % \
+                      (rung, len(limits), rungLimits[0], rungLimits[1],
+                       len(queued)));
+    runPhase(args, queued, monitors, reserve);
+    jobs = [job for job in jobs
+            if needsEscalation(readResult(jobResultPath(job)))];
+    if(not jobs):
+      break;
+    #end if
+  #end for
+  if(LEASES != None):
+    LEASES.sweep = sweep;
+  #end if
+#end: runEscalated
+
+# run the solvers as tiers (see tiers.py) for each (directory, stackOnly) in
+# runs, starting with the given first-tier jobs
+def runTiered(args, runs, jobs, monitors, reserve):
+  ran = dict((run, [TIERS[0]]) for run in runs);
+  runEscalated(args, jobs, monitors, reserve);
+  for solver in TIERS[1:]:
+    (maxMemory, maxTime) = readLimits();
+    jobs = [];
+    for (dirname, stackOnly) in runs:
+      results = [readResult(os.path.join(dirname, resultName(tier, stackOnly)))
+                 for tier in ran[(dirname, stackOnly)]];
+      if(not needsTier(results)):
+        continue;
+      #end if
+      ran[(dirname, stackOnly)].append(solver);
+      job = Job(dirname, solver, stackOnly, maxMemory, maxTime);
+      FINGERPRINTS[job] = fingerprint(job);
+      if(args.resume and isDone(job)):
+        continue;
+      elif(LEASES == None and args.escalate <= 1 and \
+           os.path.exists(fingerprintPath(job))):
+        os.remove(fingerprintPath(job));
+      #end if
+      jobs.append(job);
+    #end for
+    print >> stderr, ("Tier %s: %d runs still have Maybe blocks." % \
+                      (solver, len(jobs)));
+    runEscalated(args, jobs, monitors, reserve);
+  #end for
+
+  (maxMemory, maxTime) = readLimits();
+  for (dirname, stackOnly) in runs:
+    merge = Job(dirname, TIERED, stackOnly, maxMemory, maxTime);
+    if(LEASES != None and not LEASES.claim(merge)):
+      continue;
+    #end if
+    mergedPath = os.path.join(dirname, resultName(TIERED, stackOnly));
+    extra = mergeTiers([(tier, os.path.join(dirname,
+                                            resultName(tier, stackOnly)))
+                        for tier in ran[(dirname, stackOnly)]], mergedPath);
+    if(extra != None):
+      extra.update({"dirname": dirname, "solver": TIERED,
+                    "stackOnly": stackOnly});
+      writeRecord(mergedPath, extra);
+    #end if
+    if(LEASES != None):
+      LEASES.release(merge);
+    #end if
+  #end for
+#end: runTiered
+
 def parseArguments():
   parser = ArgumentParser(prog="analyzeAll",
               description="Look through subdirectories of the specified " + \
@@ -205,22 +901,265 @@ def parseArguments():
                           "analysis.  Currently, only run analysis exactly " + \
                           "*once* for the directory (since the analysis " + \
                           "only times out at 3 hours).");
-  parser.add_argument("directory", help="Path to the directory to analyze. " + \
-                                        "(It will be recursively searched " + \
-                                        "for data.json files.)");
+  parser.add_argument("directory", nargs="+",
+                      help="Path to the directory to analyze. " + \
+                           "(It will be recursively searched " + \
+                           "for data.json files.)  Several directories " + \
+                           "may be given; their runs share one job queue.");
   parser.add_argument("-stack", "--stack", action="store_true",
                       dest="stack", default=False,
                       help="Use only the stack information from data.json " + \
                            "files.  (I.e., ignore coverage data there.)");
+  parser.add_argument("-all-modes", "--all-modes", action="store_true",
+                      dest="allModes", default=False,
+                      help="Queue both the stack-only and the stack plus " + \
+                           "coverage runs for every directory.");
+  parser.add_argument("-jobs", "--jobs", type=int, dest="jobs", default=1,
+                      help="Maximum number of analysis runs to execute " + \
+                           "at once. (default: 1)");
+  parser.add_argument("-memory-budget", "--memory-budget", type=int,
+                      dest="memoryBudget", default=None,
+                      help="Total memory (MB) that concurrently running " + \
+                           "analyses may reserve; each run reserves " + \
+                           "MAX_MEMORY. (default: physical memory)");
+  parser.add_argument("-warm", "--warm", type=int, dest="warm", default=0,
+                      metavar="K",
+                      help="Run analyses in long-lived worker processes " + \
+                           "that keep the solver (and JVM) loaded, " + \
+                           "recycling each worker after K runs or any " + \
+                           "failed run.  (default: 0, fork a fresh child " + \
+                           "for every run)");
+  parser.add_argument("-batch", "--batch", action="store_true",
+                      dest="batch", default=False,
+                      help="Analyze every test case of every fault (not " + \
+                           "one picked at random).  Runs go to warm " + \
+                           "workers (see -warm; default 100 runs per " + \
+                           "worker) that stay with one fault while it has " + \
+                           "runs left, and test cases of a fault with " + \
+                           "identical data.json files are analyzed once.");
+  parser.add_argument("-result-cache", "--result-cache", dest="resultCache",
+                      default=os.environ.get("RESULT_CACHE_DIR"),
+                      metavar="DIRECTORY",
+                      help="Keep completed results in this directory, " + \
+                           "keyed by the CFG, tool version, solver, mode, " + \
+                           "and the parts of data.json the mode reads, and " + \
+                           "answer runs with the same key from it without " + \
+                           "running the solver. (default: RESULT_CACHE_DIR " + \
+                           "if set, else no cache)");
+  parser.add_argument("-result-cache-size", "--result-cache-size", type=int,
+                      dest="resultCacheSize", default=DEFAULT_CACHE_SIZE,
+                      help="Size limit (MB) of the result cache; the least " + \
+                           "recently used results are evicted first. " + \
+                           "(default: %d)" % DEFAULT_CACHE_SIZE);
+  parser.add_argument("-tiered", "--tiered", action="store_true",
+                      dest="tiered", default=False,
+                      help="Run UTL first, then FSA and SVPA only for " + \
+                           "runs whose earlier tiers left Maybe blocks, " + \
+                           "and merge the tiers' answers into " + \
+                           "inter.TIERED.result[.stack].  A tier that " + \
+                           "runs still solves every block.");
+  parser.add_argument("-escalate", "--escalate", type=int, dest="escalate",
+                      default=1, metavar="RUNGS",
+                      help="Run every job with a fraction of MAX_TIME and " + \
+                           "MAX_MEMORY first, and run again, with limits " + \
+                           "raised a rung at a time up to the full ones, " + \
+                           "only the jobs that timed out or ran out of " + \
+                           "memory (see escalation.py). (default: 1, the " + \
+                           "full limits from the start)");
+  parser.add_argument("-slice", "--slice", action="store_true",
+                      dest="slice", default=False,
+                      help="Solve each run on the CFG sliced to the " + \
+                           "procedures reachable from main and from its " + \
+                           "failure report; the blocks left out are No.");
+  parser.add_argument("-reach-index", "--reach-index", action="store_true",
+                      dest="reachIndex", default=False,
+                      help="Settle blocks from the CFG's structure before " + \
+                           "solving: blocks off every path from main to " + \
+                           "the crash are left out of the solver's graph " + \
+                           "and counted No, and the result file records " + \
+                           "how many were settled (@REACHINDEX).  " + \
+                           "Can't be combined with -slice.");
+  parser.add_argument("-phases", "--phases", action="store_true",
+                      dest="phases", default=False,
+                      help="Record the time and peak resident size of each " + \
+                           "phase of every run (input, slice, solve, " + \
+                           "output) as @PHASE lines in its result file.");
+  parser.add_argument("-profile", "--profile", action="store_true",
+                      dest="profile", default=False,
+                      help="Also profile each solver run with cProfile: " + \
+                           "dump the profile to RESULT.pstats and record " + \
+                           "the time of each function the solver's entry " + \
+                           "point calls (implies -phases).");
+  parser.add_argument("-resume", "--resume", action="store_true",
+                      dest="resume", default=False,
+                      help="Keep earlier results, and skip every run whose " + \
+                           "result is final (completed, timed out, or ran " + \
+                           "out of memory) and whose inputs, limits, and " + \
+                           "analysis tool are unchanged since it ran.");
+  parser.add_argument("-distribute", "--distribute", dest="distribute",
+                      default=None, metavar="SWEEP",
+                      help="Share the runs with other instances given the " + \
+                           "same SWEEP name and directories (on this or " + \
+                           "other hosts, over a shared filesystem): each " + \
+                           "run is taken by one instance under a lease, " + \
+                           "and runs whose instance stops renewing its " + \
+                           "lease are taken over.  Earlier results are " + \
+                           "kept (and replaced as runs finish).  SWEEP " + \
+                           "may not contain '.' or '/'. " + \
+                           "(default: run everything here)");
+  parser.add_argument("-lease-expiry", "--lease-expiry", type=float,
+                      dest="leaseExpiry", default=600.0, metavar="SECONDS",
+                      help="Seconds without renewal after which another " + \
+                           "instance takes over a run's lease. " + \
+                           "(default: 600)");
+  parser.add_argument("-sample-interval", "--sample-interval", type=float,
+                      dest="sampleInterval", default=None, metavar="SECONDS",
+                      help="Sample each run's memory and CPU use (and, " + \
+                           "for SVPA, the JVM heap) every SECONDS into a " + \
+                           ".telemetry file next to its result, and append " + \
+                           "peak/mean/growth summaries to the result file. " + \
+                           "(default: no sampling)");
+  parser.add_argument("-memory-mode", "--memory-mode",
+                      choices=["address", "rss", "cgroup"],
+                      dest="memoryMode", default="address",
+                      help="How to enforce MAX_MEMORY: limit the address " + \
+                           "space of non-SVPA runs (address); kill any run " + \
+                           "whose process tree's resident memory exceeds it " + \
+                           "(rss); or run each run in a cgroup v2 with that " + \
+                           "memory limit (cgroup, falling back to rss). " + \
+                           "The rss and cgroup modes also set the JVM's " + \
+                           "-Xmx from MAX_MEMORY.  (default: address)");
+  parser.add_argument("-order", "--order", choices=["listed", "cost"],
+                      dest="order", default="listed",
+                      help="Run jobs in the order they are found (listed), " + \
+                           "or longest predicted run first (cost), with " + \
+                           "runs that have a memory prediction reserving " + \
+                           "only what they are predicted to need. " + \
+                           "(default: listed)");
+  parser.add_argument("-cost-history", "--cost-history", action="append",
+                      dest="costHistory", default=[], metavar="DIRECTORY",
+                      help="Also learn run costs from the result files " + \
+                           "under this directory (may be repeated).  " + \
+                           "Earlier results under the analyzed directories " + \
+                           "are always used.");
+  parser.add_argument("-skip-predicted-timeouts",
+                      "--skip-predicted-timeouts", action="store_true",
+                      dest="skipPredicted", default=False,
+                      help="Don't run jobs predicted to exceed MAX_TIME; " + \
+                           "record each as a (predicted) @TIMEOUT instead.");
   return(parser.parse_args());
 #end: parseArguments
 
 def main():
+  global SAMPLE_INTERVAL, MEMORY_GUARD, RESULT_CACHE, SLICE, LEASES, PHASES, \
+         PROFILE, REACH_INDEX
   args = parseArguments();
+  if(args.slice and args.reachIndex):
+    print >> stderr, ("ERROR: -slice and -reach-index can't be combined");
+    exit(1);
+  #end if
+  SLICE = args.slice;
+  REACH_INDEX = args.reachIndex;
+  PHASES = args.phases;
+  PROFILE = args.profile;
+  if(args.distribute != None):
+    try:
+      checkSweep(args.distribute);
+    except ValueError as caughtError:
+      print >> stderr, ("ERROR: " + str(caughtError));
+      exit(1);
+    #end try
+    LEASES = Leases(args.distribute, jobResultPath, args.leaseExpiry);
+  #end if
+  modes = ([False, True] if args.allModes else [args.stack]);
+
+  # learn from earlier results before they are cleaned away
+  costModel = None;
+  if(args.order == "cost" or args.skipPredicted):
+    costModel = CostModel();
+    (maxMemory, maxTime) = readLimits();
+    costModel.learn(args.directory + args.costHistory, maxMemory, maxTime);
+  #end if
+
+  jobs = [];
+  for directory in args.directory:
+    for stackOnly in modes:
+      if(not args.resume and LEASES == None):
+        clean_old(directory, stackOnly);
+      #end if
+      jobs += collectJobs(directory, stackOnly, args.batch);
+    #end for
+  #end for
 
-  clean_old(args.directory, args.stack);
+  if(args.memoryMode != "address"):
+    MEMORY_GUARD = MemoryGuard(args.memoryMode);
+  #end if
+  for job in jobs:
+    FINGERPRINTS[job] = fingerprint(job);
+  #end for
+  runs = sorted(set((job.dirname, job.stackOnly) for job in jobs));
+  if(args.resume):
+    remaining = [job for job in jobs if not isDone(job)];
+    print >> stderr, ("Resuming: skipping %d finished runs, %d left to run." % \
+                      (len(jobs) - len(remaining), len(remaining)));
+    jobs = remaining;
+  #end if
+  for job in jobs:
+    # (with escalating limits, a run's fingerprint may be that of a lower
+    # rung, which runEscalated checks)
+    if(LEASES == None and args.escalate <= 1 and \
+       os.path.exists(fingerprintPath(job))):
+      os.remove(fingerprintPath(job));
+    #end if
+  #end for
 
-  analyze(args.directory, args.stack);
+  if(args.skipPredicted):
+    predictions = [(job, costModel.predictTime(job)) for job in jobs];
+    skipped = [(job, t) for (job, t) in predictions
+               if t != None and t >= job.maxTime];
+    for (job, predictedTime) in skipped:
+      skipOne(job, predictedTime);
+    #end for
+    print >> stderr, ("Skipping %d runs predicted to time out." % len(skipped));
+    jobs = [job for (job, t) in predictions if t == None or t < job.maxTime];
+  #end if
+  reserve = None;
+  if(args.order == "cost"):
+    jobs = costModel.order(jobs);
+    def reserve(job):
+      predicted = costModel.predictMemory(job);
+      return(job.maxMemory if predicted == None else \
+             min(job.maxMemory, int(predicted * 1.5) + 1));
+    #end: reserve
+  #end if
+
+  monitors = [];
+  if(args.sampleInterval != None and args.sampleInterval > 0):
+    SAMPLE_INTERVAL = args.sampleInterval;
+    monitors.append(Monitor(SAMPLE_INTERVAL, jobResultPath));
+  #end if
+  if(MEMORY_GUARD != None):
+    monitors.append(MEMORY_GUARD);
+  #end if
+  if(LEASES != None):
+    monitors.append(LEASES);
+  #end if
+
+  if(args.resultCache):
+    RESULT_CACHE = ResultCache(args.resultCache, args.resultCacheSize);
+  #end if
+  if(args.tiered):
+    runTiered(args, runs, [job for job in jobs if job.solver == TIERS[0]],
+              monitors, reserve);
+  else:
+    runEscalated(args, jobs, monitors, reserve);
+  #end if
+  if(RESULT_CACHE != None):
+    print >> stderr, (RESULT_CACHE.report());
+  #end if
+  if(MEMORY_GUARD != None):
+    MEMORY_GUARD.release();
+  #end if
 #end: main
 
 if __name__ == '__main__' :
@@ -0,0 +1,275 @@
+#!/usr/bin/env python
+
+# Benchmark the solvers on a fixed, seeded subset of a results tree, and
+# compare against a stored baseline.  Every run goes through the same forked,
+# resource-limited child as analyzeAll.py, but in a scratch copy of its
+# directory (failure report copied, CFG linked), so the results tree itself is
+# never touched.  For each run and repetition, the wall time, CPU time, and
+# peak RSS are recorded.  The repetitions run one round after another, so
+# that the runs of one round (at most -jobs of them at a time) are all
+# different runs, with their own scratch directories and result files.
+#
+# A metric regresses when its median exceeds the baseline median by more
+# than the relative tolerance plus three (scaled) median absolute deviations
+# of the noisier of the two samples plus a small absolute floor; a run whose
+# outcome changed (e.g., completed -> timeout) also fails.
+
+from argparse import ArgumentParser
+import json
+import os
+import os.path
+import platform
+import random
+import shutil
+from sys import stderr
+import tempfile
+
+import analyzeAll
+from analyzeAll import SOLVERS, finishOne, jobResultPath, readLimits, startOne
+from cfg import findGraphInput
+from cfgstore import readIndex, storeKey
+from failurereport import reportPath
+from resultfile import readResult
+from scheduler import Job, runJobs
+
+METRICS = ("wall", "cpu", "rss");
+
+# differences smaller than these are never regressions
+FLOORS = {"wall": 0.05, "cpu": 0.05, "rss": 4096};
+
+# the small Siemens subjects and the smaller utilities; space, sed, flex,
+# and gcc take too long per run to repeat
+DEFAULT_APPS = ["tcas", "schedule2", "schedule", "replace", "tot_info",
+                "print_tokens2", "print_tokens", "ccrypt", "gzip", "grep"];
+
+def hasGraph(faultDir):
+  if(findGraphInput(faultDir)):
+    return(True);
+  elif(os.environ.get("CFG_STORE")):
+    (app, relDir) = storeKey(faultDir);
+    return(relDir in readIndex(os.environ["CFG_STORE"], app));
+  #end if
+  return(False);
+#end: hasGraph
+
+# the test case directories (app/vN/fault/testcase, relative to results) to
+# benchmark: perApp of them for each app, picked with a fixed seed
+def selectRuns(results, apps, perApp, seed):
+  chosen = [];
+  for app in apps:
+    candidates = [];
+    for dirname, dirnames, filenames in os.walk(os.path.join(results, app)):
+      dirnames.sort();
+      if(reportPath(dirname) != None and hasGraph(os.path.dirname(dirname))):
+        candidates.append(os.path.relpath(dirname, results));
+      #end if
+    #end for
+    rng = random.Random("%d/%s" % (seed, app));
+    chosen += sorted(rng.sample(candidates, min(perApp, len(candidates))));
+  #end for
+  return(chosen);
+#end: selectRuns
+
+# copy one test case into the scratch tree, linking its CFG
+def stage(results, scratch, relDir):
+  source = os.path.join(results, relDir);
+  target = os.path.join(scratch, relDir);
+  os.makedirs(target);
+  shutil.copy(reportPath(source), target);
+  for path in findGraphInput(os.path.dirname(source)):
+    linked = os.path.join(os.path.dirname(target), os.path.basename(path));
+    if(not os.path.exists(linked)):
+      os.symlink(os.path.abspath(path), linked);
+    #end if
+  #end for
+  return(target);
+#end: stage
+
+def runKey(relDir, solver, stackOnly):
+  return(relDir + " " + solver + (" stack" if stackOnly else ""));
+#end: runKey
+
+def measure(results, runs, solvers, stackOnly, repeat, numWorkers):
+  (maxMemory, maxTime) = readLimits();
+  scratch = tempfile.mkdtemp(prefix="csi-benchmark-");
+  owner = os.getpid();
+  samples = dict();
+  try:
+    jobs = [];
+    keys = dict();
+    for relDir in runs:
+      target = stage(results, scratch, relDir);
+      for solver in solvers:
+        job = Job(target, solver, stackOnly, maxMemory, maxTime);
+        keys[job] = runKey(relDir, solver, stackOnly);
+        samples[keys[job]] = dict((m, []) for m in METRICS + ("status",));
+        jobs.append(job);
+      #end for
+    #end for
+
+    def finish(job, childExitStatus, childRUse, elapsed):
+      finishOne(job, childExitStatus, childRUse, elapsed);
+      sample = samples[keys[job]];
+      sample["wall"].append(elapsed);
+      sample["cpu"].append(childRUse.ru_utime + childRUse.ru_stime);
+      sample["rss"].append(childRUse.ru_maxrss);
+      sample["status"].append(readResult(jobResultPath(job))["status"]);
+    #end: finish
+
+    print >> stderr, ("Benchmarking %d runs, %d times each." % \
+                      (len(keys), repeat));
+    for _ in range(repeat):
+      runJobs(jobs, startOne, finish, numWorkers);
+    #end for
+  finally:
+    # forked children exit (via SystemExit) through here too
+    if(os.getpid() == owner):
+      shutil.rmtree(scratch, ignore_errors=True);
+    #end if
+  #end try
+  return(samples);
+#end: measure
+
+def median(values):
+  ordered = sorted(values);
+  middle = len(ordered) // 2;
+  return(ordered[middle] if len(ordered) % 2 else \
+         (ordered[middle - 1] + ordered[middle]) / 2.0);
+#end: median
+
+# median absolute deviation, scaled to estimate a standard deviation
+def spread(values):
+  center = median(values);
+  return(1.4826 * median([abs(v - center) for v in values]));
+#end: spread
+
+def outcome(statuses):
+  return(max(set(statuses), key=statuses.count));
+#end: outcome
+
+# compare current samples against a baseline; returns the report lines and
+# whether everything passed
+def compare(baseline, current, tolerance):
+  lines = [];
+  failed = 0;
+  for key in sorted(set(baseline) & set(current)):
+    (base, now) = (baseline[key], current[key]);
+    if(outcome(base["status"]) != outcome(now["status"])):
+      failed += 1;
+      lines.append("FAIL %s status %s -> %s" % \
+                   (key, outcome(base["status"]), outcome(now["status"])));
+      continue;
+    #end if
+    for metric in METRICS:
+      (b, c) = (median(base[metric]), median(now[metric]));
+      noise = 3 * max(spread(base[metric]), spread(now[metric]));
+      limit = b * (1 + tolerance) + noise + FLOORS[metric];
+      verdict = ("FAIL" if c > limit else "PASS");
+      failed += (verdict == "FAIL");
+      lines.append("%s %s %s %0.3f -> %0.3f (%+0.1f%%, limit %0.3f)" % \
+                   (verdict, key, metric, b, c,
+                    (100.0 * (c - b) / b if b > 0 else 0.0), limit));
+    #end for
+  #end for
+  for key in sorted(set(baseline) - set(current)):
+    lines.append("SKIP %s not run" % key);
+  #end for
+  for key in sorted(set(current) - set(baseline)):
+    lines.append("NEW  %s not in baseline" % key);
+  #end for
+  lines.append("%s: %d regressions across %d runs compared" % \
+               (("FAIL" if failed else "PASS"), failed,
+                len(set(baseline) & set(current))));
+  return(lines, failed == 0);
+#end: compare
+
+def parseArguments():
+  parser = ArgumentParser(prog="benchmark",
+              description="Time the solvers on a fixed, seeded subset of " + \
+                          "a results tree, and compare against a baseline.");
+  parser.add_argument("results", help="Path to the results tree " + \
+                                      "(e.g., results_trace).");
+  parser.add_argument("-apps", "--apps", nargs="+", dest="apps",
+                      default=None,
+                      help="Applications to draw runs from. (default: " + \
+                           " ".join(DEFAULT_APPS) + ")");
+  parser.add_argument("-per-app", "--per-app", type=int, dest="perApp",
+                      default=2, help="Test cases per application. " + \
+                                      "(default: 2)");
+  parser.add_argument("-repeat", "--repeat", type=int, dest="repeat",
+                      default=3, help="Repetitions of each run. (default: 3)");
+  parser.add_argument("-seed", "--seed", type=int, dest="seed",
+                      default=analyzeAll.RANDOM_SEED,
+                      help="Seed for picking test cases.");
+  parser.add_argument("-solvers", "--solvers", nargs="+", dest="solvers",
+                      choices=SOLVERS, default=SOLVERS,
+                      help="Solvers to benchmark. (default: all)");
+  parser.add_argument("-stack", "--stack", action="store_true",
+                      dest="stack", default=False,
+                      help="Benchmark the stack-only analysis.");
+  parser.add_argument("-slice", "--slice", action="store_true",
+                      dest="slice", default=False,
+                      help="Solve on CFGs sliced for each failure (see " + \
+                           "analyzeAll.py -slice).");
+  parser.add_argument("-reach-index", "--reach-index", action="store_true",
+                      dest="reachIndex", default=False,
+                      help="Settle blocks with the CFG's reachability " + \
+                           "index before solving (see analyzeAll.py " + \
+                           "-reach-index).");
+  parser.add_argument("-jobs", "--jobs", type=int, dest="jobs", default=1,
+                      help="Runs to execute at once; more than 1 makes " + \
+                           "timings noisier. (default: 1)");
+  parser.add_argument("-output", "--output", dest="output", default=None,
+                      help="Write the measurements here (usable as a " + \
+                           "later -baseline).");
+  parser.add_argument("-baseline", "--baseline", dest="baseline",
+                      default=None,
+                      help="Compare against measurements written by an " + \
+                           "earlier -output; exit with status 1 on any " + \
+                           "regression.");
+  parser.add_argument("-tolerance", "--tolerance", type=float,
+                      dest="tolerance", default=0.10,
+                      help="Relative slowdown allowed beyond the " + \
+                           "measured noise. (default: 0.10)");
+  return(parser.parse_args());
+#end: parseArguments
+
+def main():
+  args = parseArguments();
+  if(args.slice and args.reachIndex):
+    print >> stderr, ("ERROR: -slice and -reach-index can't be combined");
+    exit(1);
+  #end if
+  analyzeAll.SLICE = args.slice;
+  analyzeAll.REACH_INDEX = args.reachIndex;
+  apps = (args.apps if args.apps != None else DEFAULT_APPS);
+  runs = selectRuns(args.results, apps, args.perApp, args.seed);
+  samples = measure(args.results, runs, args.solvers, args.stack,
+                    args.repeat, args.jobs);
+
+  if(args.output != None):
+    with open(args.output, 'w') as outFile:
+      json.dump({"host": platform.node(), "seed": args.seed,
+                 "repeat": args.repeat, "runs": samples},
+                outFile, indent=1, sort_keys=True);
+    #end with
+  #end if
+  if(args.baseline != None):
+    with open(args.baseline, 'r') as readMe:
+      baseline = json.load(readMe)["runs"];
+    #end with
+    (lines, passed) = compare(baseline, samples, args.tolerance);
+    for line in lines:
+      print(line);
+    #end for
+    exit(0 if passed else 1);
+  #end if
+  for key in sorted(samples):
+    print("%s wall %0.3f cpu %0.3f rss %d %s" % \
+          (key, median(samples[key]["wall"]), median(samples[key]["cpu"]),
+           median(samples[key]["rss"]), outcome(samples[key]["status"])));
+  #end for
+#end: main
+
+if __name__ == '__main__' :
+  main()
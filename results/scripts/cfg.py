@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+
+# In-memory control-flow graph read from a csi-cc GraphML file.  Only the
+# parts that the driver-side tools need are kept: node ids, a few node
+# attributes, and the intraprocedural/interprocedural edge lists.  Nodes are
+# numbered in file order; edges are flat arrays of (source, target) indices.
+
+from array import array
+import fnmatch
+import glob
+import os.path
+import re
+import xml.etree.cElementTree as ElementTree
+
+from streams import openInputs
+
+GRAPHML_NS = "{http://graphml.graphdrawing.org/xmlns}";
+
+# the procedure every execution starts in
+ENTRY_POINT = "main";
+
+# node attributes kept in a parsed CFG
+NODE_ATTRS = ("kind", "basic-block", "procedure", "csi-label", "call-id");
+
+class CFG(object):
+  def __init__(self):
+    self.nodes = [];
+    self.attrs = dict((name, dict()) for name in NODE_ATTRS);
+    self.defaults = dict();
+    self.intraEdges = array('i');
+    self.interEdges = array('i');
+    self._index = None;
+  #end: __init__
+
+  def index(self, nodeId):
+    if(self._index == None):
+      self._index = dict((n, i) for i, n in enumerate(self.nodes));
+    #end if
+    return(self._index[nodeId]);
+  #end: index
+
+  def attr(self, name, node):
+    return(self.attrs[name].get(node, self.defaults.get(name)));
+  #end: attr
+
+  def numEdges(self):
+    return((len(self.intraEdges) + len(self.interEdges)) / 2);
+  #end: numEdges
+#end: CFG
+
+# the GraphML input for a fault directory: a single (possibly compressed)
+# file, or a file split into graph.partNN pieces
+GRAPH_PATTERNS = ("*.graphml", "*.graphml.gz", "*.graphml.zst");
+PART_PATTERN = re.compile(r"graph\.part[0-9]+$");
+
+def findGraphInput(dirname):
+  for pattern in GRAPH_PATTERNS:
+    found = glob.glob(os.path.join(dirname, pattern));
+    if(found):
+      return(found);
+    #end if
+  #end for
+  return(sorted(glob.glob(os.path.join(dirname, "graph.part[0-9]*"))));
+#end: findGraphInput
+
+def isGraphParts(paths):
+  return(len(paths) > 0 and all(PART_PATTERN.search(p) for p in paths));
+#end: isGraphParts
+
+# whether files with these names, alone in a directory, would be what
+# findGraphInput finds there
+def isGraphInput(paths):
+  names = [os.path.basename(p) for p in paths];
+  if(not names or len(set(names)) != len(names)):
+    return(False);
+  #end if
+  for pattern in GRAPH_PATTERNS:
+    if(all(fnmatch.fnmatch(name, pattern) for name in names)):
+      return(True);
+    #end if
+  #end for
+  return(isGraphParts(names));
+#end: isGraphInput
+
+# paths: a GraphML file, a list of files to read one after another (see
+# streams.openInputs), or an open stream; elements are discarded as soon as
+# they are read, so memory stays proportional to the kept CFG rather than to
+# the XML
+def parseGraphML(paths):
+  if(isinstance(paths, basestring)):
+    paths = [paths];
+  #end if
+  graph = CFG();
+  inter = array('b');
+  pending = [];
+  stream = (paths if hasattr(paths, "read") else openInputs(paths));
+  try:
+    events = ElementTree.iterparse(stream, events=("start", "end"));
+    (_, parent) = events.next();
+    for (event, element) in events:
+      if(event == "start"):
+        if(element.tag == GRAPHML_NS + "graph"):
+          parent = element;
+        #end if
+        continue;
+      elif(element.tag == GRAPHML_NS + "node"):
+        node = len(graph.nodes);
+        graph.nodes.append(element.get("id"));
+        for data in element.findall(GRAPHML_NS + "data"):
+          if(data.get("key") in NODE_ATTRS):
+            graph.attrs[data.get("key")][node] = data.text;
+          #end if
+        #end for
+      elif(element.tag == GRAPHML_NS + "edge"):
+        scope = [data.text for data in element.findall(GRAPHML_NS + "data")
+                           if data.get("key") == "scope"];
+        pending.append(element.get("source"));
+        pending.append(element.get("target"));
+        inter.append(scope == ["interprocedural"]);
+      elif(element.tag == GRAPHML_NS + "key"):
+        name = element.get("attr.name");
+        default = element.find(GRAPHML_NS + "default");
+        if(name in NODE_ATTRS and element.get("for") == "node" and \
+           default != None):
+          graph.defaults[name] = default.text.strip();
+        #end if
+      else:
+        continue;
+      #end if
+      parent.clear();
+    #end for
+  finally:
+    stream.close();
+  #end try
+
+  # edges may name nodes that appear later in the file
+  for i in range(len(inter)):
+    edgeList = (graph.interEdges if inter[i] else graph.intraEdges);
+    edgeList.append(graph.index(pending[2 * i]));
+    edgeList.append(graph.index(pending[2 * i + 1]));
+  #end for
+  return(graph);
+#end: parseGraphML
+
+# node ids look like "n:-P:K" for node K of procedure number P
+def procedureOf(nodeId):
+  return(nodeId.split(":")[1]);
+#end: procedureOf
+
+# map each procedure number to its name (from its entry node)
+def procedureNames(graph):
+  return(dict((procedureOf(graph.nodes[node]), name) \
+              for (node, name) in graph.attrs["procedure"].items()));
+#end: procedureNames
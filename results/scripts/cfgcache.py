@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+
+# Content-addressed cache of parsed CFGs.  Parsing a multi-megabyte GraphML
+# file costs far more than reading back the few arrays we keep from it, so
+# each parsed CFG is stored in a compact binary file named by the SHA-1 of
+# the GraphML content and read back via mmap.  The cache is bounded in size;
+# the least recently used entries are evicted first.
+#
+# NOTE: entries use native byte order and are meant for the local machine.
+
+from argparse import ArgumentParser
+from array import array
+import hashlib
+import mmap
+import os
+import os.path
+import struct
+from sys import stderr
+import tempfile
+import time
+
+from cfg import CFG, parseGraphML
+
+MAGIC = "CSICFG1\n";
+HEADER = struct.Struct("<8sIIIII");
+SECTION = struct.Struct("<HI");
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/csi-cfg");
+DEFAULT_CACHE_SIZE = 1024; # in MegaBytes
+
+def cacheDir():
+  return(os.environ.get("CFG_CACHE_DIR", DEFAULT_CACHE_DIR));
+#end: cacheDir
+
+def cacheSize():
+  try:
+    return(int(os.environ.get("CFG_CACHE_SIZE", DEFAULT_CACHE_SIZE)));
+  except ValueError:
+    return(DEFAULT_CACHE_SIZE);
+#end: cacheSize
+
+def contentHash(paths):
+  if(isinstance(paths, basestring)):
+    paths = [paths];
+  #end if
+  digest = hashlib.sha1();
+  for path in paths:
+    with open(path, 'rb') as readMe:
+      for chunk in iter(lambda: readMe.read(1048576), ""):
+        digest.update(chunk);
+    #end with
+  #end for
+  return(digest.hexdigest());
+#end: contentHash
+
+def writeCFG(graph, outFile):
+  strings = list(graph.nodes);
+  stringIndex = dict();
+  sections = [];
+  for name in sorted(graph.attrs):
+    pairs = array('i');
+    values = graph.attrs[name].items();
+    if(name in graph.defaults):
+      values.append((-1, graph.defaults[name]));
+    #end if
+    for (node, value) in values:
+      if(value not in stringIndex):
+        stringIndex[value] = len(strings);
+        strings.append(value);
+      #end if
+      pairs.append(node);
+      pairs.append(stringIndex[value]);
+    #end for
+    sections.append((name, pairs));
+  #end for
+
+  stringTable = "\0".join(s.encode("utf-8") for s in strings);
+  outFile.write(HEADER.pack(MAGIC, len(graph.nodes), len(strings),
+                            len(stringTable), len(graph.intraEdges),
+                            len(graph.interEdges)));
+  outFile.write(stringTable);
+  outFile.write(struct.pack("<I", len(sections)));
+  for (name, pairs) in sections:
+    outFile.write(SECTION.pack(len(name), len(pairs)));
+    outFile.write(name);
+    pairs.tofile(outFile);
+  #end for
+  graph.intraEdges.tofile(outFile);
+  graph.interEdges.tofile(outFile);
+#end: writeCFG
+
+def readCFG(path):
+  with open(path, 'rb') as readMe:
+    view = mmap.mmap(readMe.fileno(), 0, access=mmap.ACCESS_READ);
+  #end with
+  try:
+    (magic, numNodes, numStrings, tableLen, intraLen, interLen) = \
+      HEADER.unpack_from(view, 0);
+    if(magic != MAGIC):
+      raise ValueError("not a cached CFG: " + path);
+    #end if
+    offset = HEADER.size;
+    strings = [s.decode("utf-8") for s in
+               view[offset:offset + tableLen].split("\0")];
+    offset += tableLen;
+
+    graph = CFG();
+    graph.nodes = strings[:numNodes];
+    (numSections,) = struct.unpack_from("<I", view, offset);
+    offset += 4;
+    for i in range(numSections):
+      (nameLen, numPairs) = SECTION.unpack_from(view, offset);
+      offset += SECTION.size;
+      name = view[offset:offset + nameLen];
+      offset += nameLen;
+      pairs = array('i');
+      pairs.fromstring(view[offset:offset + numPairs * pairs.itemsize]);
+      offset += numPairs * pairs.itemsize;
+      values = graph.attrs.setdefault(name, dict());
+      for j in range(0, numPairs, 2):
+        if(pairs[j] < 0):
+          graph.defaults[name] = strings[pairs[j + 1]];
+        else:
+          values[pairs[j]] = strings[pairs[j + 1]];
+        #end if
+      #end for
+    #end for
+    for (edgeList, length) in ((graph.intraEdges, intraLen),
+                               (graph.interEdges, interLen)):
+      edgeList.fromstring(view[offset:offset + length * edgeList.itemsize]);
+      offset += length * edgeList.itemsize;
+    #end for
+    return(graph);
+  finally:
+    view.close();
+  #end try
+#end: readCFG
+
+# remove the least recently used entries (files ending in suffix) until the
+# rest fit in maxBytes
+def evict(directory, maxBytes, suffix=".cfg"):
+  entries = [];
+  for filename in os.listdir(directory):
+    if(filename.endswith(suffix)):
+      stat = os.stat(os.path.join(directory, filename));
+      entries.append((stat.st_mtime, stat.st_size, filename));
+    #end if
+  #end for
+  total = sum(size for (_, size, _) in entries);
+  for (_, size, filename) in sorted(entries):
+    if(total <= maxBytes):
+      break;
+    #end if
+    try:
+      os.remove(os.path.join(directory, filename));
+    except OSError:
+      pass;
+    #end try
+    total -= size;
+  #end for
+#end: evict
+
+# load the CFG for a GraphML file (or its parts), from the cache when possible
+def loadCFG(paths, directory=None, maxSize=None):
+  directory = (directory if directory != None else cacheDir());
+  maxSize = (maxSize if maxSize != None else cacheSize());
+  cached = os.path.join(directory, contentHash(paths) + ".cfg");
+  if(os.path.exists(cached)):
+    try:
+      graph = readCFG(cached);
+      os.utime(cached, None);
+      return(graph);
+    except (ValueError, struct.error, EnvironmentError):
+      print >> stderr, ("WARNING: ignoring damaged cache entry " + cached);
+    #end try
+  #end if
+
+  graph = parseGraphML(paths);
+  try:
+    if(not os.path.isdir(directory)):
+      os.makedirs(directory);
+    #end if
+    (fd, tempPath) = tempfile.mkstemp(dir=directory, suffix=".tmp");
+    with os.fdopen(fd, 'wb') as outFile:
+      writeCFG(graph, outFile);
+    #end with
+    os.rename(tempPath, cached);
+    evict(directory, maxSize * 1048576);
+  except EnvironmentError as caughtError:
+    print >> stderr, ("WARNING: could not cache CFG: " + str(caughtError));
+  #end try
+  return(graph);
+#end: loadCFG
+
+# time a load function in a fresh child so its peak RSS is its own
+def measure(load, path):
+  pid = os.fork();
+  if(pid == 0):
+    load(path);
+    os._exit(0);
+  #end if
+  startingT = time.time();
+  (_, exitStatus, childRUse) = os.wait4(pid, 0);
+  return(time.time() - startingT, childRUse.ru_maxrss, exitStatus);
+#end: measure
+
+def parseArguments():
+  parser = ArgumentParser(prog="cfgcache",
+              description="Fill the parsed-CFG cache for GraphML files and " + \
+                          "report load time and peak memory with and " + \
+                          "without the cache.");
+  parser.add_argument("graphml", nargs="+", help="GraphML files to cache.");
+  return(parser.parse_args());
+#end: parseArguments
+
+def main():
+  args = parseArguments();
+  for path in args.graphml:
+    (parseT, parseRSS, parseStatus) = measure(parseGraphML, path);
+    loadCFG(path);
+    (loadT, loadRSS, loadStatus) = measure(loadCFG, path);
+    if(parseStatus != 0 or loadStatus != 0):
+      print >> stderr, ("ERROR: could not load " + path);
+      exit(1);
+    #end if
+    print("%s: parse %0.3f s, %d KB peak RSS; cached %0.3f s, %d KB peak RSS" % \
+          (path, parseT, parseRSS, loadT, loadRSS));
+  #end for
+#end: main
+
+if __name__ == '__main__' :
+  main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+
+# Deduplicated store of the CFGs under a results tree.  The GraphML files for
+# the variants of one application are nearly identical: they differ mostly in
+# the "versions/vN" part of embedded source paths plus a few changed blocks.
+# The store keeps one base graph per application and, for every fault
+# directory, a line-level delta against that base with the version number
+# factored out.  Every reconstruction is checked against the SHA-1 of the
+# original file when the store is built.
+#
+# Layout of a store directory:
+#   APP/base.graphml.gz     normalized GraphML of the application's base graph
+#   APP/REL.delta           zlib-compressed delta for fault directory APP/REL
+#                           (REL is e.g. "v3/singleton", with "/" as "%")
+#   APP/index.json          per fault directory: SHA-1 and delta file
+
+from argparse import ArgumentParser
+import difflib
+import gzip
+import hashlib
+import json
+import marshal
+import os
+import os.path
+import re
+from sys import stdout, stderr
+import zlib
+
+from cfg import findGraphInput
+from streams import chunks, openInputs
+
+VERSION_PATH = re.compile(r"/versions/v([0-9]+)/");
+VERSION_HOLE = "/versions/v@VERSION@/";
+
+def deltaName(relDir):
+  return(relDir.replace("/", "%") + ".delta");
+#end: deltaName
+
+# split GraphML text into lines with the version number factored out; returns
+# None if the text names more than one version (and so can't be normalized)
+def normalize(text):
+  versions = set(VERSION_PATH.findall(text));
+  if(len(versions) > 1):
+    return(None, None);
+  #end if
+  return(VERSION_PATH.sub(VERSION_HOLE, text).splitlines(True),
+         (versions.pop() if versions else None));
+#end: normalize
+
+def makeDelta(baseLines, text):
+  (lines, version) = normalize(text);
+  if(lines == None):
+    return(zlib.compress(marshal.dumps((None, text))));
+  #end if
+  matcher = difflib.SequenceMatcher(None, baseLines, lines);
+  ops = [(i1, i2, "".join(lines[j1:j2])) \
+         for (tag, i1, i2, j1, j2) in matcher.get_opcodes() if tag != "equal"];
+  return(zlib.compress(marshal.dumps((version, ops))));
+#end: makeDelta
+
+# yield the original GraphML text for a delta, piece by piece
+def applyDelta(baseLines, delta):
+  (version, ops) = marshal.loads(zlib.decompress(delta));
+  if(version == None and isinstance(ops, basestring)):
+    yield ops;
+    return;
+  #end if
+  fill = (lambda piece: piece.replace(VERSION_HOLE, "/versions/v%s/" % version)
+          if version != None else piece);
+  position = 0;
+  for (i1, i2, replacement) in ops:
+    yield fill("".join(baseLines[position:i1]));
+    yield fill(replacement);
+    position = i2;
+  #end for
+  yield fill("".join(baseLines[position:]));
+#end: applyDelta
+
+def readBase(store, app):
+  with gzip.open(os.path.join(store, app, "base.graphml.gz"), 'rb') as readMe:
+    return(readMe.read().splitlines(True));
+  #end with
+#end: readBase
+
+def readIndex(store, app):
+  path = os.path.join(store, app, "index.json");
+  if(not os.path.exists(path)):
+    return(dict());
+  #end if
+  with open(path, 'r') as readMe:
+    return(json.load(readMe));
+  #end with
+#end: readIndex
+
+# the reconstructed GraphML for APP/REL as a sequence of strings (which can
+# be handed to streams.pipePath), or None if the store doesn't have it
+def materialize(store, app, relDir, baseLines=None):
+  entry = readIndex(store, app).get(relDir);
+  if(entry == None):
+    return(None);
+  #end if
+  if(baseLines == None):
+    baseLines = readBase(store, app);
+  #end if
+  with open(os.path.join(store, app, entry["delta"]), 'rb') as readMe:
+    return(applyDelta(baseLines, readMe.read()));
+  #end with
+#end: materialize
+
+# locate the store entry for a fault directory laid out as .../APP/vN/FAULT
+def storeKey(faultDir):
+  parts = os.path.abspath(faultDir).split(os.sep);
+  return(parts[-3], parts[-2] + "/" + parts[-1]);
+#end: storeKey
+
+def versionNumber(relDir):
+  match = re.match(r"v([0-9]+)/", relDir);
+  return(int(match.group(1)) if match else 0);
+#end: versionNumber
+
+def buildApp(appDir, store, app):
+  faultDirs = [];
+  for version in os.listdir(appDir):
+    versionDir = os.path.join(appDir, version);
+    if(not os.path.isdir(versionDir)):
+      continue;
+    #end if
+    for fault in os.listdir(versionDir):
+      if(findGraphInput(os.path.join(versionDir, fault))):
+        faultDirs.append(version + "/" + fault);
+      #end if
+    #end for
+  #end for
+  if(not faultDirs):
+    return([]);
+  #end if
+  faultDirs.sort(key=lambda rel: (versionNumber(rel), rel));
+
+  appStore = os.path.join(store, app);
+  if(not os.path.isdir(appStore)):
+    os.makedirs(appStore);
+  #end if
+  def readText(relDir):
+    return("".join(chunks(openInputs(findGraphInput(os.path.join(appDir,
+                                                                 relDir))))));
+  #end: readText
+
+  baseLines = normalize(readText(faultDirs[0]))[0];
+  if(baseLines == None):
+    baseLines = readText(faultDirs[0]).splitlines(True);
+  #end if
+  with gzip.open(os.path.join(appStore, "base.graphml.gz"), 'wb') as outFile:
+    outFile.write("".join(baseLines));
+  #end with
+
+  index = dict();
+  stored = [];
+  for relDir in faultDirs:
+    text = readText(relDir);
+    delta = makeDelta(baseLines, text);
+    digest = hashlib.sha1(text).hexdigest();
+    if(hashlib.sha1("".join(applyDelta(baseLines, delta))).hexdigest() != \
+       digest):
+      print >> stderr, ("ERROR: delta does not reproduce " + app + "/" + relDir);
+      exit(1);
+    #end if
+    with open(os.path.join(appStore, deltaName(relDir)), 'wb') as outFile:
+      outFile.write(delta);
+    #end with
+    index[relDir] = {"sha1": digest, "delta": deltaName(relDir)};
+    stored.append((relDir, len(text), len(delta)));
+  #end for
+  with open(os.path.join(appStore, "index.json"), 'w') as outFile:
+    json.dump(index, outFile, indent=1, sort_keys=True);
+  #end with
+  return(stored);
+#end: buildApp
+
+def build(results, store, removeOriginals):
+  for app in sorted(os.listdir(results)):
+    if(not os.path.isdir(os.path.join(results, app))):
+      continue;
+    #end if
+    stored = buildApp(os.path.join(results, app), store, app);
+    if(not stored):
+      continue;
+    #end if
+    baseSize = os.path.getsize(os.path.join(store, app, "base.graphml.gz"));
+    print("%s: %d graphs, %d bytes -> %d bytes" % \
+          (app, len(stored), sum(s[1] for s in stored),
+           baseSize + sum(s[2] for s in stored)));
+    if(removeOriginals):
+      for (relDir, _, _) in stored:
+        for path in findGraphInput(os.path.join(results, app, relDir)):
+          os.remove(path);
+        #end for
+      #end for
+    #end if
+  #end for
+#end: build
+
+def parseArguments():
+  parser = ArgumentParser(prog="cfgstore",
+              description="Build or read a deduplicated store of the CFGs " + \
+                          "in a results tree.");
+  commands = parser.add_subparsers(dest="command");
+  building = commands.add_parser("build",
+                                 help="Store every CFG under a results tree.");
+  building.add_argument("results", help="Path to the results tree " + \
+                                        "(e.g., results_trace).");
+  building.add_argument("store", help="Path to the store directory.");
+  building.add_argument("-remove-originals", "--remove-originals",
+                        action="store_true", dest="removeOriginals",
+                        default=False,
+                        help="Delete each GraphML file once its delta " + \
+                             "has been verified.");
+  extracting = commands.add_parser("extract",
+                                   help="Write one stored CFG to stdout.");
+  extracting.add_argument("store", help="Path to the store directory.");
+  extracting.add_argument("app", help="Application name.");
+  extracting.add_argument("relDir", help="Fault directory within the " + \
+                                         "application (e.g., v3/singleton).");
+  return(parser.parse_args());
+#end: parseArguments
+
+def main():
+  args = parseArguments();
+  if(args.command == "build"):
+    build(args.results, args.store, args.removeOriginals);
+  else:
+    pieces = materialize(args.store, args.app, args.relDir);
+    if(pieces == None):
+      print >> stderr, ("ERROR: no stored CFG for " + args.app + "/" + \
+                        args.relDir);
+      exit(1);
+    #end if
+    for piece in pieces:
+      stdout.write(piece);
+    #end for
+  #end if
+#end: main
+
+if __name__ == '__main__' :
+  main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+
+# Predict how long (and how much memory) an analysis run will take, from
+# features of its inputs and from earlier result files.  The features are the
+# size of the CFG (nodes, edges, procedures), the size of the failure report
+# (observed Yes entries, observed No entries, crash nodes, and stack frames),
+# and the application's mean lines of code from
+# summarize/applications.csv.  For every (solver, stack-only) pair, a model
+#   log(seconds) = w0 + sum_i wi * log(1 + feature_i)
+# is fit by (ridge-regularized) least squares over the earlier runs; a run
+# that timed out counts as taking the time limit it ran with, as its
+# structured record (see resultfile.writeRecord) gives it, and is left out if
+# it has no record.  The same is done for peak resident memory, using the
+# @PEAKRSS telemetry of earlier runs when present.
+
+import math
+import os
+import os.path
+import re
+from cStringIO import StringIO
+from sys import stderr
+
+from cfg import findGraphInput, parseGraphML, procedureNames
+from cfgcache import loadCFG
+from cfgstore import materialize, storeKey
+from failurereport import readReport, reportPath
+from resultfile import readRecord, readResult
+from scheduler import Job
+
+FEATURES = ("nodes", "edges", "procedures", "obsYes", "obsNo", "crash",
+            "stack", "loc");
+
+RESULT_FILE = re.compile(r"^inter\.([A-Za-z]+)\.result(\.stack)?$");
+
+APPLICATIONS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "summarize", "applications.csv");
+
+# fewer earlier runs than this, and a model makes no predictions
+MIN_SAMPLES = 2 * (len(FEATURES) + 1);
+
+RIDGE = 0.01;
+
+def graphFeatures(faultDir):
+  inputs = findGraphInput(faultDir);
+  if(inputs):
+    graph = loadCFG(inputs);
+  elif(os.environ.get("CFG_STORE")):
+    (app, relDir) = storeKey(faultDir);
+    pieces = materialize(os.environ["CFG_STORE"], app, relDir);
+    if(pieces == None):
+      return(None);
+    #end if
+    graph = parseGraphML(StringIO("".join(pieces)));
+  else:
+    return(None);
+  #end if
+  return({"nodes": len(graph.nodes), "edges": graph.numEdges(),
+          "procedures": len(procedureNames(graph))});
+#end: graphFeatures
+
+def dataFeatures(dirname):
+  path = reportPath(dirname);
+  if(path == None):
+    return(None);
+  #end if
+  try:
+    return(readReport(path).counts());
+  except (IOError, ValueError):
+    return(None);
+  #end try
+#end: dataFeatures
+
+def linesOfCode(path=APPLICATIONS_CSV):
+  loc = dict();
+  try:
+    with open(path, 'r') as readMe:
+      header = readMe.readline().strip().split(",");
+      for line in readMe:
+        row = dict(zip(header, line.strip().split(",")));
+        loc[row["App"]] = float(row["Mean LoC"]);
+      #end for
+    #end with
+  except (IOError, KeyError, ValueError):
+    pass;
+  #end try
+  return(loc);
+#end: linesOfCode
+
+# solve the square system a x = b by Gaussian elimination (a and b are
+# overwritten)
+def solveLinear(a, b):
+  n = len(b);
+  for col in range(n):
+    pivot = max(range(col, n), key=lambda row: abs(a[row][col]));
+    if(abs(a[pivot][col]) < 1e-12):
+      return(None);
+    #end if
+    (a[col], a[pivot]) = (a[pivot], a[col]);
+    (b[col], b[pivot]) = (b[pivot], b[col]);
+    for row in range(col + 1, n):
+      factor = a[row][col] / a[col][col];
+      for k in range(col, n):
+        a[row][k] -= factor * a[col][k];
+      #end for
+      b[row] -= factor * b[col];
+    #end for
+  #end for
+  x = [0.0] * n;
+  for row in reversed(range(n)):
+    x[row] = (b[row] - sum(a[row][k] * x[k] for k in range(row + 1, n))) / \
+             a[row][row];
+  #end for
+  return(x);
+#end: solveLinear
+
+# ridge least squares fit of ys (already logs) on rows of xs
+def fitLogLinear(xs, ys):
+  if(len(xs) < MIN_SAMPLES):
+    return(None);
+  #end if
+  n = len(xs[0]);
+  a = [[sum(x[i] * x[j] for x in xs) + (RIDGE if i == j and i > 0 else 0.0)
+        for j in range(n)] for i in range(n)];
+  b = [sum(x[i] * y for (x, y) in zip(xs, ys)) for i in range(n)];
+  return(solveLinear(a, b));
+#end: fitLogLinear
+
+# the time limit a run had, from its structured record, or None if it has no
+# (readable) record
+def recordedTimeLimit(resultPath):
+  try:
+    return(float(readRecord(resultPath)["maxTime"]));
+  except (IOError, ValueError, KeyError, TypeError):
+    return(None);
+  #end try
+#end: recordedTimeLimit
+
+class CostModel(object):
+  def __init__(self):
+    self.loc = linesOfCode();
+    self.graphs = dict();
+    self.samples = dict();
+    self.timeWeights = dict();
+    self.memoryWeights = dict();
+  #end: __init__
+
+  # log-scaled feature vector (with a leading 1) for a job, or None
+  def features(self, job):
+    dirname = os.path.abspath(job.dirname);
+    faultDir = os.path.dirname(dirname);
+    if(faultDir not in self.graphs):
+      self.graphs[faultDir] = graphFeatures(faultDir);
+    #end if
+    graph = self.graphs[faultDir];
+    data = dataFeatures(dirname);
+    if(graph == None or data == None):
+      return(None);
+    #end if
+    values = dict(graph, **data);
+    values["loc"] = self.loc.get(dirname.split(os.sep)[-4], 0.0);
+    return([1.0] + [math.log(1.0 + values[f]) for f in FEATURES]);
+  #end: features
+
+  # maxTime: the time limit the run had, or None if it isn't known
+  def observe(self, job, result, maxTime):
+    if(result["status"] == "completed"):
+      seconds = result["analysisTime"];
+    elif(result["status"] == "timeout" and maxTime != None):
+      seconds = maxTime;
+    else:
+      return;
+    #end if
+    x = self.features(job);
+    if(x == None):
+      return;
+    #end if
+    self.samples.setdefault((job.solver, job.stackOnly), []).append(
+      (x, math.log(max(seconds, 0.001)),
+       (math.log(result["peakRSS"] / 1024.0) if result["peakRSS"] else None)));
+  #end: observe
+
+  # learn from the result files under the given directories
+  def learn(self, paths, maxMemory, maxTime):
+    for path in paths:
+      for dirname, dirnames, filenames in os.walk(path):
+        for filename in filenames:
+          match = RESULT_FILE.match(filename);
+          if(not match):
+            continue;
+          #end if
+          job = Job(dirname, match.group(1), match.group(2) != None,
+                    maxMemory, maxTime);
+          resultPath = os.path.join(dirname, filename);
+          self.observe(job, readResult(resultPath),
+                       recordedTimeLimit(resultPath));
+        #end for
+      #end for
+    #end for
+    for (key, samples) in self.samples.items():
+      self.timeWeights[key] = fitLogLinear([x for (x, _, _) in samples],
+                                           [t for (_, t, _) in samples]);
+      withMemory = [(x, m) for (x, _, m) in samples if m != None];
+      self.memoryWeights[key] = fitLogLinear([x for (x, _) in withMemory],
+                                             [m for (_, m) in withMemory]);
+    #end for
+    print >> stderr, ("Cost model learned from %d earlier runs." % \
+                      sum(len(s) for s in self.samples.values()));
+  #end: learn
+
+  def predict(self, weights, job):
+    w = weights.get((job.solver, job.stackOnly));
+    x = (self.features(job) if w != None else None);
+    if(x == None):
+      return(None);
+    #end if
+    return(math.exp(sum(wi * xi for (wi, xi) in zip(w, x))));
+  #end: predict
+
+  # predicted seconds for a job, or None if there is too little history
+  def predictTime(self, job):
+    return(self.predict(self.timeWeights, job));
+  #end: predictTime
+
+  # predicted peak resident memory (MB) for a job, or None
+  def predictMemory(self, job):
+    return(self.predict(self.memoryWeights, job));
+  #end: predictMemory
+
+  # a size-based stand-in for the cost of a job, for ordering jobs when
+  # there is no history to predict from
+  def proxy(self, job):
+    x = self.features(job);
+    return(sum(x[1:]) if x != None else 0.0);
+  #end: proxy
+
+  # jobs ordered longest first, by predicted time when every job has a
+  # prediction and by the size-based stand-in otherwise
+  def order(self, jobs):
+    predictions = [self.predictTime(job) for job in jobs];
+    if(None in predictions):
+      return(sorted(jobs, key=self.proxy, reverse=True));
+    #end if
+    return([job for (_, job) in
+            sorted(zip(predictions, jobs), key=lambda p: p[0], reverse=True)]);
+  #end: order
+#end: CostModel
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+
+# Escalating limits: rather than give every run the full MAX_TIME and
+# MAX_MEMORY, run the whole sweep on a ladder of rungs.  Every run starts on
+# the first rung, with a small fraction of the limits; only the runs that hit
+# a rung's time or memory limit are run again, on the next rung, and the last
+# rung has the full limits.  Most runs finish on a low rung, so near-complete
+# results for the sweep come in long before the runs that need hours; and a
+# run that fails on the last rung fails with the same limits as without
+# escalation, so @TIMEOUT and @MEMORYOUT (and makeCSV.py's columns) mean what
+# they always did.  Each run's result file ends with
+#   @ESCALATION RUNG RUNGS MAX_TIME MAX_MEMORY
+# for the rung it finished on (counting from 1), and the limits it had there.
+
+# each rung down the ladder divides the time limit and the memory limit by
+# these
+TIME_FACTOR = 4;
+MEMORY_FACTOR = 2;
+
+# no rung goes below these (seconds, MB)
+MIN_TIME = 300;
+MIN_MEMORY = 1024;
+
+# the (maxTime, maxMemory) of each rung, lowest first; rungs that the minimums
+# make equal are merged
+def ladder(maxTime, maxMemory, rungs):
+  limits = [];
+  for below in reversed(range(max(rungs, 1))):
+    rung = (max(maxTime // TIME_FACTOR ** below, min(MIN_TIME, maxTime)),
+            max(maxMemory // MEMORY_FACTOR ** below,
+                min(MIN_MEMORY, maxMemory)));
+    if(rung not in limits):
+      limits.append(rung);
+    #end if
+  #end for
+  return(limits);
+#end: ladder
+
+# the job with a rung's limits
+def onRung(job, limits):
+  (maxTime, maxMemory) = limits;
+  return(job._replace(maxTime=maxTime, maxMemory=maxMemory));
+#end: onRung
+
+# whether a run needs the next rung, given its result (see resultfile.py)
+def needsEscalation(result):
+  return(result["status"] in ("timeout", "memoryout"));
+#end: needsEscalation
+
+def escalationMarker(rung, rungs, job):
+  return("@ESCALATION %d %d %d %d" % (rung, rungs, job.maxTime, job.maxMemory));
+#end: escalationMarker
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+
+# Share one sweep among several analyzeAll.py instances (on one host or on
+# many, over a shared filesystem) without a coordinator.  Before running a
+# job, an instance takes its lease: a file next to the job's result file,
+#   RESULT.SWEEP.lease.G
+# created with O_EXCL, so only one instance can create it.  The holder touches
+# the file every heartbeat while the run lasts, and rewrites it as "done"
+# when the run has finished.  A lease whose file wasn't touched for the expiry
+# time belongs to a crashed (or cut off) instance; any instance may then take
+# generation G+1, and again only one can create it.  An instance that finds
+# its lease file gone kills its run and leaves the result file to the new
+# holder.  SWEEP names can't contain ".", so that a lease file's name shows
+# which result file it belongs to (see leasedFile).
+#
+# Lease expiry compares file modification times with the local clock, so the
+# hosts' clocks must agree to well within the expiry time.
+
+import errno
+import os
+import os.path
+import re
+import signal
+import socket
+from sys import stderr
+import time
+
+from telemetry import processTree
+
+# RESULT.SWEEP.lease.G, or the temporary file that release renames onto it
+LEASE_FILE = re.compile(r"^(.+)\.[^./]+\.lease\.[0-9]+(\.tmp)?$");
+
+# the name of the result file that a lease file belongs to, or None if the
+# name isn't a lease file's
+def leasedFile(filename):
+  match = LEASE_FILE.match(filename);
+  return(match.group(1) if match else None);
+#end: leasedFile
+
+def checkSweep(sweep):
+  if(not sweep or "." in sweep or "/" in sweep):
+    raise ValueError("sweep names can't be empty or contain '.' or '/': " + \
+                     sweep);
+  #end if
+#end: checkSweep
+
+class Leases(object):
+  def __init__(self, sweep, resultPathFor, expiry=600.0):
+    checkSweep(sweep);
+    self.sweep = sweep;
+    self.resultPathFor = resultPathFor;
+    self.expiry = expiry;
+    self.interval = expiry / 10.0;
+    self.owner = "%s %d" % (socket.gethostname(), os.getpid());
+    self.held = dict();
+    self.pids = dict();
+    self.lost = set();
+  #end: __init__
+
+  def prefix(self, job):
+    return(self.resultPathFor(job) + "." + self.sweep + ".lease.");
+  #end: prefix
+
+  # the job's lease files, as (generation, path), latest last
+  def generations(self, job):
+    prefix = self.prefix(job);
+    (dirname, base) = os.path.split(prefix);
+    found = [];
+    for name in os.listdir(dirname or "."):
+      if(name.startswith(base) and name[len(base):].isdigit()):
+        found.append((int(name[len(base):]), os.path.join(dirname, name)));
+      #end if
+    #end for
+    return(sorted(found));
+  #end: generations
+
+  # (owner, state, seconds since the last heartbeat) of a lease file, or None
+  # if it is gone
+  def inspect(self, path):
+    try:
+      with open(path, 'r') as readMe:
+        fields = readMe.read().split();
+      #end with
+      age = time.time() - os.stat(path).st_mtime;
+    except (IOError, OSError):
+      return(None);
+    #end try
+    return(" ".join(fields[:-1]), (fields[-1] if fields else None), age);
+  #end: inspect
+
+  # create the given generation of the job's lease; returns its path, or
+  # None if another instance got there first
+  def create(self, job, generation, state):
+    path = self.prefix(job) + str(generation);
+    try:
+      fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0644);
+    except OSError as caughtError:
+      if(caughtError.errno != errno.EEXIST):
+        raise;
+      #end if
+      return(None);
+    #end try
+    os.write(fd, "%s %s\n" % (self.owner, state));
+    os.close(fd);
+    return(path);
+  #end: create
+
+  # take the job's lease; returns whether this instance may run the job
+  def claim(self, job):
+    found = self.generations(job);
+    generation = 0;
+    if(found):
+      lease = self.inspect(found[-1][1]);
+      if(lease == None or lease[1] == "done" or lease[2] < self.expiry):
+        return(False);
+      #end if
+      print >> stderr, ("Reclaiming expired lease of " + lease[0] + \
+                        ": " + str(job));
+      generation = found[-1][0] + 1;
+    #end if
+    path = self.create(job, generation, "running");
+    if(path == None):
+      return(False);
+    #end if
+    for (_, old) in found:
+      try:
+        os.remove(old);
+      except OSError:
+        pass;
+      #end try
+    #end for
+    self.held[job] = path;
+    return(True);
+  #end: claim
+
+  # whether the job's latest lease says it is done
+  def finished(self, job):
+    found = self.generations(job);
+    lease = (self.inspect(found[-1][1]) if found else None);
+    return(lease != None and lease[1] == "done");
+  #end: finished
+
+  # whether this instance lost the job's lease while running it
+  def lostFor(self, job):
+    return(job in self.lost);
+  #end: lostFor
+
+  # mark the job done; a job this instance never held (e.g., one that got a
+  # copy of another run's result) gets a new generation saying so
+  def release(self, job):
+    path = self.held.pop(job, None);
+    if(job in self.lost):
+      self.lost.discard(job);
+      return;
+    elif(path == None):
+      if(not self.finished(job)):
+        found = self.generations(job);
+        self.create(job, (found[-1][0] + 1 if found else 0), "done");
+      #end if
+      return;
+    #end if
+    tempPath = path + ".tmp";
+    with open(tempPath, 'w') as outFile:
+      print >> outFile, ("%s done" % self.owner);
+    #end with
+    os.rename(tempPath, path);
+  #end: release
+
+  # monitor hooks (see scheduler.runJobs): heartbeats while runs last
+  def starting(self, job):
+    pass;
+  #end: starting
+
+  def started(self, job, pid):
+    self.pids[job] = pid;
+  #end: started
+
+  def stopped(self, job):
+    self.pids.pop(job, None);
+  #end: stopped
+
+  def sample(self):
+    for (job, path) in self.held.items():
+      try:
+        os.utime(path, None);
+        continue;
+      except OSError:
+        pass;
+      #end try
+      print >> stderr, ("Lost the lease; stopping run: " + str(job));
+      del self.held[job];
+      self.lost.add(job);
+      for member in (processTree(self.pids[job]) if job in self.pids else []):
+        try:
+          os.kill(member, signal.SIGKILL);
+        except OSError:
+          pass;
+        #end try
+      #end for
+    #end for
+  #end: sample
+#end: Leases
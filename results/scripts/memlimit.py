@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+
+# Enforce MAX_MEMORY on the resident memory of a run, rather than on its
+# address space.  RLIMIT_AS can't be used for SVPA at all (the JVM reserves far
+# more address space than it touches), and for the other solvers it kills runs
+# that never come close to MAX_MEMORY of real memory.  A MemoryGuard either
+#   rss     samples the resident size of each run's process tree and kills the
+#           tree as soon as it exceeds MAX_MEMORY, or
+#   cgroup  has each run's process join its own cgroup v2, with memory.max set
+#           to MAX_MEMORY, before it starts solving (see join), so the kernel
+#           kills it at exactly that point.
+# The cgroup mode needs a delegated cgroup v2 directory with the memory
+# controller enabled for its children (MEMORY_CGROUP, or the cgroup the
+# driver runs in); without one, the guard falls back to rss.
+
+import errno
+import os
+import os.path
+import signal
+from sys import stderr
+
+from telemetry import processTree, sampleTree
+
+CGROUP_MOUNT = "/sys/fs/cgroup";
+
+# share of MAX_MEMORY given to the JVM heap; the rest is left for the JVM's
+# own native memory and the Python side, so that a run that needs too much
+# heap fails with an OutOfMemoryError rather than being killed
+JVM_HEAP_SHARE = 0.75;
+
+def jvmOptions(maxMemory):
+  return("-Xmx%dm" % int(maxMemory * JVM_HEAP_SHARE));
+#end: jvmOptions
+
+# a run whose peak resident size (KB) reaches this is taken to have run out
+# of memory
+def memoryoutRSS(maxMemory):
+  return(int(maxMemory * 0.625 * 1024));
+#end: memoryoutRSS
+
+# a cgroup v2 directory under which this process may create memory-limited
+# children, or None
+def cgroupRoot():
+  root = os.environ.get("MEMORY_CGROUP");
+  if(not root):
+    try:
+      with open("/proc/self/cgroup", 'r') as readMe:
+        unified = [line.strip()[3:] for line in readMe
+                   if line.startswith("0::")];
+      #end with
+    except IOError:
+      return(None);
+    #end try
+    if(not unified):
+      return(None);
+    #end if
+    root = os.path.join(CGROUP_MOUNT, unified[0].lstrip("/"));
+  #end if
+  try:
+    with open(os.path.join(root, "cgroup.subtree_control"), 'r') as readMe:
+      controllers = readMe.read().split();
+    #end with
+  except IOError:
+    return(None);
+  #end try
+  if("memory" not in controllers or not os.access(root, os.W_OK)):
+    return(None);
+  #end if
+  return(root);
+#end: cgroupRoot
+
+def writeControl(cgroup, name, value):
+  with open(os.path.join(cgroup, name), 'w') as outFile:
+    outFile.write(str(value));
+  #end with
+#end: writeControl
+
+def readEvents(cgroup, name):
+  events = dict();
+  try:
+    with open(os.path.join(cgroup, name), 'r') as readMe:
+      for line in readMe:
+        (key, value) = line.split();
+        events[key] = int(value);
+      #end for
+    #end with
+  except IOError:
+    pass;
+  #end try
+  return(events);
+#end: readEvents
+
+class MemoryGuard(object):
+  def __init__(self, mode, interval=1.0):
+    self.mode = mode;
+    self.interval = interval;
+    self.root = None;
+    if(mode == "cgroup"):
+      self.root = cgroupRoot();
+      if(self.root == None):
+        print >> stderr, ("WARNING: no delegated cgroup v2 memory " + \
+                          "controller; watching resident memory instead");
+        self.mode = "rss";
+      #end if
+    #end if
+    self.runs = dict();
+    self.cgroups = dict();
+    self.killed = set();
+  #end: __init__
+
+  def starting(self, job):
+    pass;
+  #end: starting
+
+  def cgroupFor(self, pid):
+    return(os.path.join(self.root, "analyze-%d" % pid));
+  #end: cgroupFor
+
+  # in the run's process, before it solves: join the run's cgroup, creating
+  # it if need be; a warm worker keeps its cgroup for all of its runs (all of
+  # which have the same MAX_MEMORY)
+  def join(self, job):
+    if(self.mode != "cgroup"):
+      return;
+    #end if
+    cgroup = self.cgroupFor(os.getpid());
+    if(not os.path.isdir(cgroup)):
+      os.mkdir(cgroup);
+      writeControl(cgroup, "memory.max", job.maxMemory * 1048576);
+      if(os.path.exists(os.path.join(cgroup, "memory.swap.max"))):
+        writeControl(cgroup, "memory.swap.max", 0);
+      #end if
+    #end if
+    writeControl(cgroup, "cgroup.procs", os.getpid());
+  #end: join
+
+  def started(self, job, pid):
+    self.killed.discard(job);
+    ooms = None;
+    if(self.mode == "cgroup"):
+      if(pid in self.cgroups):
+        ooms = readEvents(self.cgroups[pid], "memory.events").get("oom_kill",
+                                                                   0);
+      else:
+        # the run may not have made its cgroup yet, but it starts with no
+        # OOM kills
+        self.cgroups[pid] = self.cgroupFor(pid);
+        ooms = 0;
+      #end if
+    #end if
+    self.runs[job] = (pid, ooms);
+  #end: started
+
+  def sample(self):
+    if(self.mode != "rss"):
+      return;
+    #end if
+    for (job, (pid, _)) in self.runs.items():
+      sample = sampleTree(pid);
+      if(job in self.killed or sample == None or \
+         sample[0] <= job.maxMemory * 1024):
+        continue;
+      #end if
+      print >> stderr, ("Killing run over its memory limit: " + str(job));
+      self.killed.add(job);
+      for member in processTree(pid):
+        try:
+          os.kill(member, signal.SIGKILL);
+        except OSError:
+          pass;
+        #end try
+      #end for
+    #end for
+  #end: sample
+
+  def stopped(self, job):
+    if(job not in self.runs):
+      return;
+    #end if
+    (pid, ooms) = self.runs.pop(job);
+    if(self.mode == "cgroup"):
+      cgroup = self.cgroups[pid];
+      if(readEvents(cgroup, "memory.events").get("oom_kill", 0) > ooms):
+        self.killed.add(job);
+      #end if
+      self.release();
+    #end if
+  #end: stopped
+
+  # whether the guard (or the kernel, on its behalf) killed the job's run
+  def killedFor(self, job):
+    return(job in self.killed);
+  #end: killedFor
+
+  # remove the cgroups whose processes have all exited (or, for runs that
+  # have ended, never joined)
+  def release(self):
+    running = set(pid for (pid, _) in self.runs.values());
+    for (pid, cgroup) in self.cgroups.items():
+      if(pid in running or (os.path.isdir(cgroup) and \
+         readEvents(cgroup, "cgroup.events").get("populated", 1) != 0)):
+        continue;
+      #end if
+      try:
+        os.rmdir(cgroup);
+      except OSError as caughtError:
+        if(caughtError.errno != errno.ENOENT):
+          continue;
+        #end if
+      #end try
+      del self.cgroups[pid];
+    #end for
+  #end: release
+#end: MemoryGuard
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+
+# Where a run's time goes.  analyzeAll.py -phases times the steps of each run
+# and appends one line per step to the result file:
+#   @PHASE NAME SECONDS PEAK_RSS_KB
+# where the phases are
+#   input    finding the CFG and failure report, and setting up the streams
+#            that feed them to the solver
+#   slice    slicing the CFG (analyzeAll.py -slice)
+#   reach    settling blocks with the CFG's reachability index
+#            (analyzeAll.py -reach-index)
+#   solve    the solver itself; streamed inputs are decoded as it reads them
+#   output   adjusting and finishing the result file
+# and PEAK_RSS_KB is the largest resident size of the run's process so far
+# (for a warm worker, of every run it has done).  With -profile, the solve
+# phase also runs under cProfile: the profile is dumped next to the result
+# file (RESULT.pstats, for pstats or snakeviz), and each function the solver's
+# entry point calls directly (up to CALLEES of them) gets a line
+#   @PHASE solve/FUNCTION SECONDS -
+# with the time spent in it (and everything it calls), largest first.
+
+import os.path
+import pstats
+import re
+import resource
+from sys import stdout
+import time
+
+PHASES = ("input", "slice", "reach", "solve", "output");
+
+# how many of the solver's callees get a line of their own
+CALLEES = 10;
+
+def profilePath(resultPath):
+  return(resultPath + ".pstats");
+#end: profilePath
+
+def peakRSS():
+  return(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss);
+#end: peakRSS
+
+class PhaseTimer(object):
+  def __init__(self):
+    self.phases = [];
+    self.current = None;
+  #end: __init__
+
+  # end the current phase (if any) and start the named one; a phase started
+  # again adds to its earlier time
+  def start(self, name):
+    self.stop();
+    self.current = (name, time.time());
+  #end: start
+
+  def stop(self):
+    if(self.current != None):
+      (name, startTime) = self.current;
+      self.add(name, time.time() - startTime, peakRSS());
+      self.current = None;
+    #end if
+  #end: stop
+
+  def add(self, name, seconds, rss=None):
+    for (i, (earlier, earlierSeconds, earlierRSS)) in enumerate(self.phases):
+      if(earlier == name):
+        self.phases[i] = (name, earlierSeconds + seconds, max(earlierRSS, rss));
+        return;
+      #end if
+    #end for
+    self.phases.append((name, seconds, rss));
+  #end: add
+
+  def report(self, outFile=stdout):
+    self.stop();
+    for (name, seconds, rss) in self.phases:
+      print >> outFile, ("@PHASE %s %0.3f %s" % \
+                         (name, seconds, ("-" if rss == None else rss)));
+    #end for
+  #end: report
+#end: PhaseTimer
+
+# (function name, cumulative seconds) for the CALLEES functions that entry
+# called that took longest, from a finished cProfile.Profile, largest first
+def calleeTimes(profiler, entry):
+  stats = pstats.Stats(profiler);
+  stats.calc_callees();
+  code = entry.func_code;
+  for (key, callees) in stats.all_callees.items():
+    (filename, line, function) = key;
+    if(function == code.co_name and line == code.co_firstlineno and \
+       os.path.abspath(filename) == os.path.abspath(code.co_filename)):
+      # builtins are named like "<method 'split' of 'str' objects>"
+      return(sorted([(re.sub(r"\s+", "_", callee[2]), times[3])
+                     for (callee, times) in callees.items()],
+                    key=lambda pair: -pair[1])[:CALLEES]);
+    #end if
+  #end for
+  return([]);
+#end: calleeTimes
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+
+# Settle blocks from the structure of the CFG before the solver runs.  The
+# index of a CFG is its supergraph: the intraprocedural edges (a call site's
+# edge to the node after it stands for the call returning), each call site's
+# edge to its callee's entry, and an edge from each procedure's exit to the
+# node after every call site that calls it.  Every path the program can take
+# is a path of the supergraph, so a node that main's entry can't reach, or
+# that can't reach any crash node, never ran in the failing run.  A basic
+# block made only of such nodes is definitely No: it is left out of the graph
+# the solver sees (no path the solver considers goes through it), and added
+# to the solver's No count.  A block is definitely Yes if it holds main's
+# entry, the only crash node, or the only node of a reliable observation; the
+# solver still decides those (they constrain its paths), so they are only
+# counted.  The solver reads the whole failure report, so the blocks of the
+# nodes it names are always kept (and never counted as settled).
+#
+# The CFG resolves calls through function pointers to call edges, but code
+# outside it (a library handed a callback, or a signal handler) can call a
+# procedure with no call edge at all.  A procedure that no call edge reaches
+# is therefore a root, like main's entry; and if a crash node can be reached
+# from a root other than main's entry, any node could have led to the call
+# from outside, so nothing is settled by the crash.  A procedure that is
+# called both through call edges and from outside the CFG is not detected
+# (the GraphML does not record whose address is taken): if only the calls
+# from outside ran, its blocks can be wrongly settled No.
+#
+# The index depends only on the CFG, so it is built once and kept with the
+# parsed-CFG cache (see cfgcache.py) as HASH.reach, where HASH is the SHA-1
+# of the GraphML (for a CFG store, the one its index records).  It holds the
+# node ids, each node's basic block, the supergraph's edges reversed (as
+# offsets into an array of sources), the nodes the roots reach, the call
+# edges, and the roots other than main's entry.
+
+from array import array
+from collections import deque
+import os
+import os.path
+import struct
+from sys import stderr
+import tempfile
+
+from cfg import ENTRY_POINT, procedureOf
+from cfgcache import cacheDir, cacheSize, evict
+
+MAGIC = "CSIRCH2\n";
+
+# magic, nodes, blocks, reversed edges, call edge array length, entry node
+# (-1 if none), other roots, length of the node id table
+HEADER = struct.Struct("<8sIIIIiII");
+
+class ReachIndex(object):
+  def __init__(self):
+    self.nodes = [];
+    self.blocks = array('i');
+    self.numBlocks = 0;
+    self.offsets = array('i');
+    self.sources = array('i');
+    self.fromEntry = array('B');
+    self.calls = array('i');
+    self.entry = -1;
+    self.roots = array('i');
+    self._index = None;
+  #end: __init__
+
+  def index(self, nodeId):
+    if(self._index == None):
+      self._index = dict((n, i) for i, n in enumerate(self.nodes));
+    #end if
+    return(self._index.get(nodeId));
+  #end: index
+
+  # nodes that can reach any of targets, as a bytearray of flags
+  def reaching(self, targets):
+    seen = bytearray(len(self.nodes));
+    pending = deque(targets);
+    for node in targets:
+      seen[node] = 1;
+    #end for
+    while(pending):
+      node = pending.popleft();
+      for i in xrange(self.offsets[node], self.offsets[node + 1]):
+        source = self.sources[i];
+        if(not seen[source]):
+          seen[source] = 1;
+          pending.append(source);
+        #end if
+      #end for
+    #end while
+    return(seen);
+  #end: reaching
+
+  def write(self, outFile):
+    table = "\0".join(n.encode("utf-8") for n in self.nodes);
+    outFile.write(HEADER.pack(MAGIC, len(self.nodes), self.numBlocks,
+                              len(self.sources), len(self.calls), self.entry,
+                              len(self.roots), len(table)));
+    outFile.write(table);
+    for values in (self.blocks, self.offsets, self.sources, self.fromEntry,
+                   self.calls, self.roots):
+      values.tofile(outFile);
+    #end for
+  #end: write
+
+  @staticmethod
+  def read(readMe):
+    index = ReachIndex();
+    try:
+      (magic, numNodes, index.numBlocks, numSources, numCalls, index.entry,
+       numRoots, tableLen) = HEADER.unpack(readMe.read(HEADER.size));
+      if(magic != MAGIC):
+        raise ValueError("not a reachability index: " + readMe.name);
+      #end if
+      index.nodes = [n.decode("utf-8") for n in
+                     readMe.read(tableLen).split("\0")][:numNodes];
+      for (values, length) in ((index.blocks, numNodes),
+                               (index.offsets, numNodes + 1),
+                               (index.sources, numSources),
+                               (index.fromEntry, numNodes),
+                               (index.calls, numCalls),
+                               (index.roots, numRoots)):
+        values.fromfile(readMe, length);
+      #end for
+    except (EOFError, struct.error):
+      raise ValueError("truncated reachability index: " + readMe.name);
+    #end try
+    return(index);
+  #end: read
+#end: ReachIndex
+
+def buildIndex(graph):
+  index = ReachIndex();
+  index.nodes = list(graph.nodes);
+  numNodes = len(graph.nodes);
+  blockIds = dict();
+  exits = dict();
+  for node in range(numNodes):
+    proc = procedureOf(graph.nodes[node]);
+    block = (proc, graph.attr("basic-block", node));
+    index.blocks.append(blockIds.setdefault(block, len(blockIds)));
+    if(graph.attr("kind", node) == "exit"):
+      exits[proc] = node;
+    #end if
+  #end for
+  index.numBlocks = len(blockIds);
+  entries = [node for (node, name) in graph.attrs["procedure"].items()
+             if name == ENTRY_POINT and graph.attr("kind", node) == "entry"];
+  index.entry = (entries[0] if entries else -1);
+  called = set();
+
+  successors = dict();
+  for i in range(0, len(graph.intraEdges), 2):
+    successors.setdefault(graph.intraEdges[i], []).append(
+      graph.intraEdges[i + 1]);
+  #end for
+  edges = [(graph.intraEdges[i], graph.intraEdges[i + 1])
+           for i in range(0, len(graph.intraEdges), 2)];
+  for i in range(0, len(graph.interEdges), 2):
+    (site, callee) = (graph.interEdges[i], graph.interEdges[i + 1]);
+    if(graph.attr("kind", callee) != "entry"):
+      continue;
+    #end if
+    index.calls.extend((site, callee));
+    called.add(callee);
+    edges.append((site, callee));
+    calleeExit = exits.get(procedureOf(graph.nodes[callee]));
+    if(calleeExit != None):
+      edges += [(calleeExit, after) for after in successors.get(site, [])];
+    #end if
+  #end for
+
+  # reversed edges, grouped by target
+  counts = [0] * (numNodes + 1);
+  for (source, target) in edges:
+    counts[target + 1] += 1;
+  #end for
+  for node in range(numNodes):
+    counts[node + 1] += counts[node];
+  #end for
+  index.offsets = array('i', counts);
+  fill = list(counts);
+  sources = [0] * len(edges);
+  for (source, target) in edges:
+    sources[fill[target]] = source;
+    fill[target] += 1;
+  #end for
+  index.sources = array('i', sources);
+
+  # procedures that only code outside the CFG can call
+  index.roots = array('i', sorted(
+    node for node in graph.attrs["procedure"]
+    if graph.attr("kind", node) == "entry" and node not in called and \
+       node != index.entry));
+
+  # forward reachability from the roots, on the same edges
+  index.fromEntry = array('B', [1] * numNodes);
+  if(index.entry >= 0):
+    forward = dict();
+    for (source, target) in edges:
+      forward.setdefault(source, []).append(target);
+    #end for
+    seen = bytearray(numNodes);
+    pending = deque([index.entry] + list(index.roots));
+    for node in pending:
+      seen[node] = 1;
+    #end for
+    while(pending):
+      for target in forward.get(pending.popleft(), ()):
+        if(not seen[target]):
+          seen[target] = 1;
+          pending.append(target);
+        #end if
+      #end for
+    #end while
+    index.fromEntry = array('B', seen);
+  #end if
+  return(index);
+#end: buildIndex
+
+# the index of the CFG whose GraphML has the given SHA-1, from the cache, or
+# built from makeGraph() (and cached) if it isn't there
+def loadIndex(digest, makeGraph, directory=None, maxSize=None):
+  directory = (directory if directory != None else cacheDir());
+  maxSize = (maxSize if maxSize != None else cacheSize());
+  cached = os.path.join(directory, digest + ".reach");
+  if(os.path.exists(cached)):
+    try:
+      with open(cached, 'rb') as readMe:
+        index = ReachIndex.read(readMe);
+      #end with
+      os.utime(cached, None);
+      return(index);
+    except (ValueError, EnvironmentError):
+      print >> stderr, ("WARNING: ignoring damaged cache entry " + cached);
+    #end try
+  #end if
+
+  index = buildIndex(makeGraph());
+  try:
+    if(not os.path.isdir(directory)):
+      os.makedirs(directory);
+    #end if
+    (fd, tempPath) = tempfile.mkstemp(dir=directory, suffix=".tmp");
+    with os.fdopen(fd, 'wb') as outFile:
+      index.write(outFile);
+    #end with
+    os.rename(tempPath, cached);
+    evict(directory, maxSize * 1048576, ".reach");
+  except EnvironmentError as caughtError:
+    print >> stderr, ("WARNING: could not cache reachability index: " + \
+                      str(caughtError));
+  #end try
+  return(index);
+#end: loadIndex
+
+# the blocks of the index that hold a node the roots reach and that can reach
+# one of the crash nodes (any node, if there are none, or if a root other
+# than main's entry can reach one), and the blocks of the nodes in named, as
+# a bytearray of flags
+def liveBlocks(index, crash, named=()):
+  useful = (index.reaching(crash) if crash else None);
+  if(useful == None or any(useful[root] for root in index.roots)):
+    useful = bytearray([1]) * len(index.nodes);
+  #end if
+  liveBlocks = bytearray(index.numBlocks);
+  for node in xrange(len(index.nodes)):
+    if(useful[node] and index.fromEntry[node]):
+      liveBlocks[index.blocks[node]] = 1;
+    #end if
+  #end for
+  for node in named:
+    liveBlocks[index.blocks[node]] = 1;
+  #end for
+  # a kept call site whose callee can neither return nor crash still gets the
+  # callee's entry block, so the solver sees the call go somewhere
+  changed = True;
+  while(changed):
+    changed = False;
+    for i in xrange(0, len(index.calls), 2):
+      (site, callee) = (index.calls[i], index.calls[i + 1]);
+      if(liveBlocks[index.blocks[site]] and \
+         not liveBlocks[index.blocks[callee]]):
+        liveBlocks[index.blocks[callee]] = 1;
+        changed = True;
+      #end if
+    #end for
+  #end while
+  return(liveBlocks);
+#end: liveBlocks
+
+# the crash nodes of a failure report (see failurereport.py) in the index
+def crashNodes(index, report):
+  crash = [index.index(report.nodeId(i)) for i in report.crash];
+  return([node for node in crash if node != None]);
+#end: crashNodes
+
+# every node a failure report names, in the index
+def reportedNodes(index, report):
+  named = [index.index(report.nodeId(i)) for i in xrange(len(report.procs))];
+  return([node for node in named if node != None]);
+#end: reportedNodes
+
+# settle what the index can for one failure report (see failurereport.py);
+# returns (node ids to hand the solver, blocks settled No, blocks settled
+# Yes, all blocks)
+def settle(index, report, stackOnly):
+  nodeIndex = lambda i: index.index(report.nodeId(i));
+  crash = crashNodes(index, report);
+  live = liveBlocks(index, crash, reportedNodes(index, report));
+  keep = set(index.nodes[node] for node in xrange(len(index.nodes))
+             if live[index.blocks[node]]);
+
+  yesNodes = ([index.entry] if index.entry >= 0 else []) + \
+             (crash if len(crash) == 1 else []);
+  if(not stackOnly):
+    offset = 0;
+    entry = 0;
+    for (i, count) in enumerate(report.obsYesCounts):
+      lengths = report.obsYesLengths[entry:entry + count];
+      if(report.reliable[i // 8] & (1 << (i % 8)) and list(lengths) == [1]):
+        node = nodeIndex(report.obsYes[offset]);
+        if(node != None):
+          yesNodes.append(node);
+        #end if
+      #end if
+      offset += sum(lengths);
+      entry += count;
+    #end for
+  #end if
+  yesBlocks = set(index.blocks[node] for node in yesNodes
+                  if live[index.blocks[node]]);
+  return(keep, index.numBlocks - sum(live), len(yesBlocks),
+         index.numBlocks);
+#end: settle
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+# On-disk cache of completed analysis results.  A result is keyed by the
+# content hash of the CFG, the analysis tool's version, the solver, the mode,
+# the parts of data.json the mode actually reads, in a canonical form (in
+# stack-only mode, only the crash nodes and the stack; otherwise also the
+# observed Yes and No entries, whose order does not matter), and the driver's
+# other settings for the run: whether the CFG was sliced or pruned by the
+# reachability index, and the run's limits.  Many failing test cases of one
+# fault crash at the same node with the same stack, so in stack-only mode
+# most of them share one cached answer.
+#
+# Entries are result files (KEY.result) without the markers that describe
+# the run rather than its answer (telemetry, phases, escalation, and
+# sharing); a served result keeps the solver's timings of the run that
+# computed it.  A hit refreshes the entry's modification time, and the least
+# recently used entries are evicted once the cache grows past its size
+# limit.  Only completed runs are cached, since a timeout or memoryout also
+# depends on the limits.
+
+import hashlib
+import json
+import os
+import os.path
+import shutil
+import tempfile
+from sys import stderr
+
+from cfgcache import evict
+from failurereport import readReport
+
+DEFAULT_CACHE_DIR = os.path.expanduser("~/.cache/csi-results");
+DEFAULT_CACHE_SIZE = 1024; # in MegaBytes
+
+# result file markers that describe one run rather than its answer
+RUN_MARKERS = ("@PEAKRSS", "@MEANRSS", "@RSSGROWTH", "@PEAKJVMHEAP", "@PHASE",
+               "@ESCALATION", "@CACHEDRESULT", "@SHAREDRESULT");
+
+def canonical(value):
+  return(json.dumps(value, sort_keys=True, separators=(",", ":")));
+#end: canonical
+
+# the parts of a failure report that the analysis reads in the given mode
+def evidence(dataPath, stackOnly):
+  data = readReport(dataPath).toData();
+  relevant = {"crash": data.get("crash", []), "stack": data.get("stack", [])};
+  if(not stackOnly):
+    relevant["obsYes"] = sorted(canonical(obs)
+                                for obs in data.get("obsYes", []));
+    relevant["obsNo"] = sorted(canonical(obs)
+                               for obs in data.get("obsNo", []));
+  #end if
+  return(relevant);
+#end: evidence
+
+# settings: the driver's other settings that the answer depends on, as a
+# value json can encode
+def cacheKey(graphDigest, toolVersion, solver, stackOnly, dataPath, settings):
+  return(hashlib.sha1(canonical([graphDigest, toolVersion, solver, stackOnly,
+                                 evidence(dataPath, stackOnly),
+                                 settings])).hexdigest());
+#end: cacheKey
+
+class ResultCache(object):
+  def __init__(self, directory=DEFAULT_CACHE_DIR, maxSize=DEFAULT_CACHE_SIZE):
+    self.directory = directory;
+    self.maxSize = maxSize;
+    self.hits = 0;
+    self.misses = 0;
+    if(not os.path.isdir(directory)):
+      os.makedirs(directory);
+    #end if
+  #end: __init__
+
+  def entryPath(self, key):
+    return(os.path.join(self.directory, key + ".result"));
+  #end: entryPath
+
+  # copy the cached result for key to resultPath; returns whether there was one
+  def serve(self, key, resultPath):
+    try:
+      shutil.copyfile(self.entryPath(key), resultPath);
+      os.utime(self.entryPath(key), None);
+    except EnvironmentError:
+      self.misses += 1;
+      return(False);
+    #end try
+    self.hits += 1;
+    return(True);
+  #end: serve
+
+  def store(self, key, resultPath):
+    try:
+      (fd, tempPath) = tempfile.mkstemp(dir=self.directory, suffix=".tmp");
+      with os.fdopen(fd, 'w') as outFile:
+        with open(resultPath, 'r') as readMe:
+          for line in readMe:
+            if(line.split()[:1] and line.split()[0] in RUN_MARKERS):
+              continue;
+            #end if
+            outFile.write(line);
+          #end for
+        #end with
+      #end with
+      os.rename(tempPath, self.entryPath(key));
+      evict(self.directory, self.maxSize * 1048576, ".result");
+    except EnvironmentError as caughtError:
+      print >> stderr, ("WARNING: could not cache result: " + str(caughtError));
+    #end try
+  #end: store
+
+  def report(self):
+    lookups = self.hits + self.misses;
+    return("Result cache: %d hits, %d misses (%0.1f%% hit rate)" % \
+           (self.hits, self.misses,
+            (100.0 * self.hits / lookups if lookups else 0.0)));
+  #end: report
+#end: ResultCache
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+
+# Read the text result file written by one analysis run.  The markers are the
+# same ones makeCSV.py looks for; "status" summarizes them as one of
+#   completed   the solver finished (@ANALYSISTIME)
+#   timeout     the run hit its time limit (@TIMEOUT)
+#   memoryout   the run hit its memory limit (@MEMORYOUT)
+#   failed      the run ended some other way (@UNKNOWN, @ERROR, ...)
+#   partial     the run never finished (e.g., the driver was killed)
+#   predicted   the run was skipped as a predicted timeout (see costmodel.py)
+# or None if there is no result file at all.
+#
+# Each finished run also gets a structured record next to its result file
+# (inter.SOLVER.result[.stack].json), so that later tools need not scan the
+# solver's log output; see writeRecord.
+
+import json
+import os
+import os.path
+
+# the count headers of the Yes, No, and Maybe sets, as makeCSV.py has always
+# matched them: the count is the first word after the prefix (e.g., "42" in
+# "defNo (42 total):")
+COUNT_PREFIXES = (("defYes (", "yesCount"), ("defNo (", "noCount"),
+                  ("maybe (", "maybeCount"));
+
+# the markers of a result file, as written: "@ANALYSISTIME", "@FAILURETIME",
+# "@PREDICTEDTIMEOUT", and the count of each of the Yes, No, and Maybe sets
+# (as "yesCount", ...) are strings, or None if absent; "timedOut" and
+# "memedOut" say whether @TIMEOUT and @MEMORYOUT appear; "markers" holds the
+# rest of the line of every other marker (the last, if it repeats), and
+# "phases" the rest of each @PHASE line, in order.  This is the one parser of
+# result files; readResult and makeCSV.py both build on it.
+def scanResult(path):
+  scanned = {"timedOut": False, "memedOut": False, "@ANALYSISTIME": None,
+             "@FAILURETIME": None, "@PREDICTEDTIMEOUT": None,
+             "yesCount": None, "noCount": None, "maybeCount": None,
+             "markers": dict(), "phases": []};
+  with open(path, 'r') as readMe:
+    for line in readMe:
+      for (prefix, count) in COUNT_PREFIXES:
+        if(line[:len(prefix)] == prefix):
+          scanned[count] = line[len(prefix):].split()[0].strip();
+        #end if
+      #end for
+      if(line[:1] != "@" or not line[1:].strip()):
+        continue;
+      #end if
+      marker = line.split()[0];
+      rest = line[len(marker):].strip();
+      if(marker == "@TIMEOUT"):
+        scanned["timedOut"] = True;
+      elif(marker == "@MEMORYOUT"):
+        scanned["memedOut"] = True;
+      elif(marker in scanned):
+        scanned[marker] = rest;
+      elif(marker == "@PHASE"):
+        scanned["phases"].append(rest);
+      else:
+        scanned["markers"][marker] = rest;
+      #end if
+    #end for
+  #end with
+  return(scanned);
+#end: scanResult
+
+def toNumber(text, kind):
+  return(kind(text) if text != None else None);
+#end: toNumber
+
+def readResult(path):
+  result = {"status": None, "timedOut": False, "memedOut": False,
+            "analysisTime": None, "failureTime": None,
+            "yesCount": None, "noCount": None, "maybeCount": None,
+            "predictedTime": None, "peakRSS": None};
+  if(not os.path.exists(path)):
+    return(result);
+  #end if
+  scanned = scanResult(path);
+  result.update({"timedOut": scanned["timedOut"],
+                 "memedOut": scanned["memedOut"],
+                 "analysisTime": toNumber(scanned["@ANALYSISTIME"], float),
+                 "failureTime": toNumber(scanned["@FAILURETIME"], float),
+                 "predictedTime": toNumber(scanned["@PREDICTEDTIMEOUT"],
+                                           float),
+                 "peakRSS": toNumber(scanned["markers"].get("@PEAKRSS"), int)});
+  for count in ("yesCount", "noCount", "maybeCount"):
+    result[count] = toNumber(scanned[count], int);
+  #end for
+
+  if(result["predictedTime"] != None):
+    result["status"] = "predicted";
+  elif(result["timedOut"]):
+    result["status"] = "timeout";
+  elif(result["memedOut"]):
+    result["status"] = "memoryout";
+  elif(result["failureTime"] != None):
+    result["status"] = "failed";
+  elif(result["analysisTime"] != None):
+    result["status"] = "completed";
+  else:
+    result["status"] = "partial";
+  #end if
+  return(result);
+#end: readResult
+
+# whether a run's outcome is final, i.e., re-running it with the same inputs
+# and limits would not be expected to do any better
+def isFinal(result):
+  return(result["status"] in ("completed", "timeout", "memoryout"));
+#end: isFinal
+
+def recordPath(resultPath):
+  return(resultPath + ".json");
+#end: recordPath
+
+# write the structured record for a finished run, atomically; extra holds
+# what only the driver knows (limits, exit status, resource usage, ...)
+def writeRecord(resultPath, extra):
+  record = readResult(resultPath);
+  record.update(extra);
+  tempPath = recordPath(resultPath) + ".tmp";
+  with open(tempPath, 'w') as outFile:
+    json.dump(record, outFile, sort_keys=True, separators=(",", ":"));
+  #end with
+  os.rename(tempPath, recordPath(resultPath));
+#end: writeRecord
+
+def readRecord(resultPath):
+  with open(recordPath(resultPath), 'r') as readMe:
+    return(json.load(readMe));
+  #end with
+#end: readRecord
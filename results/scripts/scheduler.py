@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# Run a list of analysis jobs across several child processes at once.  A job
+# is only admitted when its MAX_MEMORY reservation fits in what remains of the
+# memory budget, so a 12-core box with 32GB does not run twelve 32GB analyses.
+# (At least one job always runs, even if its reservation exceeds the budget.)
+
+from collections import namedtuple
+import os
+import signal
+from sys import stderr
+import time
+
+Job = namedtuple("Job", ["dirname", "solver", "stackOnly", \
+                         "maxMemory", "maxTime"]);
+
+# how often (seconds) the scheduler wakes to check for missed timeouts
+TICK = 30;
+
+# maxMemory is in MegaBytes
+def machineMemory():
+  try:
+    return(int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / \
+               1048576));
+  except (ValueError, OSError):
+    return(None);
+#end: machineMemory
+
+# start: function(job) -> pid of the forked analysis child
+# finish: function(job, exitStatus, rusage, elapsedSeconds)
+# monitors: objects notified just before a run starts (starting(job)), once
+# it has started and as it stops (started(job, pid), stopped(job)), and
+# sampled while it runs (see telemetry.Monitor and memlimit.MemoryGuard)
+# reserve: function(job) -> MB of the memory budget the job holds while it
+# runs (default: its MAX_MEMORY)
+# claim: if given, function(job) -> whether to run the job, asked just before
+# it would start; a job that isn't claimed is dropped (see leases.py)
+def runJobs(jobs, start, finish, numWorkers=1, memoryBudget=None,
+            monitors=None, reserve=None, claim=None):
+  monitors = (monitors if monitors != None else []);
+  reservation = (reserve if reserve != None else lambda job: job.maxMemory);
+  pending = list(jobs);
+  running = dict();
+  reserved = 0;
+
+  signal.signal(signal.SIGALRM, lambda x, y: None);
+  signal.signal(signal.SIGCHLD, lambda x, y: None);
+
+  while(pending or running):
+    # admit as many pending jobs as the worker count and memory budget allow
+    while(pending and len(running) < max(numWorkers, 1)):
+      job = pending[0];
+      if(running and memoryBudget != None and \
+         reserved + reservation(job) > memoryBudget):
+        break;
+      #end if
+      pending.pop(0);
+      if(claim != None and not claim(job)):
+        continue;
+      #end if
+      for monitor in monitors:
+        monitor.starting(job);
+      #end for
+      pid = start(job);
+      running[pid] = (job, time.time());
+      for monitor in monitors:
+        monitor.started(job, pid);
+      #end for
+      reserved += reservation(job);
+    #end while
+
+    # reap every finished child; kill any that missed their timeout signal
+    reaped = False;
+    while(running):
+      (childPid, childExitStatus, childRUse) = os.wait4(-1, os.WNOHANG);
+      if(childPid == 0):
+        break;
+      elif(childPid not in running):
+        continue;
+      #end if
+      (job, startingT) = running.pop(childPid);
+      reserved -= reservation(job);
+      reaped = True;
+      for monitor in monitors:
+        monitor.stopped(job);
+      #end for
+      finish(job, childExitStatus, childRUse, time.time() - startingT);
+    #end while
+    for pid, (job, startingT) in running.items():
+      if(time.time() - startingT > job.maxTime + 600):
+        print >> stderr, ("Killing child who missed timeout signal");
+        os.kill(pid, signal.SIGKILL);
+        (childPid, childExitStatus, childRUse) = os.wait4(pid, 0);
+        del running[pid];
+        reserved -= reservation(job);
+        reaped = True;
+        for monitor in monitors:
+          monitor.stopped(job);
+        #end for
+        finish(job, childExitStatus, childRUse, time.time() - startingT);
+      #end if
+    #end for
+
+    # sleep until a child exits (SIGCHLD) or the next tick
+    if(running and not reaped):
+      signal.setitimer(signal.ITIMER_REAL,
+                       min([TICK] + [m.interval for m in monitors]));
+      signal.pause();
+      signal.setitimer(signal.ITIMER_REAL, 0);
+      for monitor in monitors:
+        monitor.sample();
+      #end for
+    #end if
+  #end while
+#end: runJobs
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+# Slice a CFG down to the procedures that can matter for one failure, before
+# solving.  The failing run started at main's entry and ended at a crash
+# node, so it only ran nodes that main's entry reaches and that can reach a
+# crash node along the CFG's supergraph (see reachindex.py, whose index this
+# reuses); every block of any other procedure is No whatever the failure
+# report says.  The slice keeps the procedures with such a node (and the
+# callees of their call sites, as reachindex.settle does), and only their
+# nodes and edges; the solver runs on the slice, and the blocks of the
+# procedures left out are added to its No count.  A procedure that was
+# called and returned before the crash is kept: after it returns, the path
+# goes on to the crash.  The solver still reads the whole failure report, so
+# the slice also keeps every procedure that the report names a node of (e.g.,
+# an observed No in a procedure the failing run never reached); otherwise
+# the solver would be asked about nodes that aren't in its graph.
+
+import re
+
+from cfg import procedureOf
+from reachindex import crashNodes, liveBlocks
+
+# node elements (with or without data) and edge elements of a GraphML file
+ELEMENT = re.compile(r'<node id="([^"]+)"(?:\s*/>|>.*?</node>)|' + \
+                     r'<edge source="([^"]+)" target="([^"]+)"' + \
+                     r'(?:[^>]*/>|[^>]*>.*?</edge>)', re.S);
+
+# the procedures to keep for a failure report (see failurereport.py), given
+# the CFG's reachability index, or None if the CFG has no entry point to slice
+# from
+def relevantProcedures(index, report):
+  if(index.entry < 0):
+    return(None);
+  #end if
+  live = liveBlocks(index, crashNodes(index, report));
+  return(set(procedureOf(index.nodes[node])
+             for node in xrange(len(index.nodes))
+             if live[index.blocks[node]]) | report.procedures());
+#end: relevantProcedures
+
+# (procedures, nodes, basic blocks) of the graph, and of them in keep
+def sliceSizes(graph, keep):
+  total = [set(), 0, set()];
+  kept = [set(), 0, set()];
+  for node in range(len(graph.nodes)):
+    proc = procedureOf(graph.nodes[node]);
+    block = (proc, graph.attr("basic-block", node));
+    for sizes in ([total, kept] if proc in keep else [total]):
+      sizes[0].add(proc);
+      sizes[1] += 1;
+      sizes[2].add(block);
+    #end for
+  #end for
+  return([(len(k[0]), k[1], len(k[2])) for k in (total, kept)]);
+#end: sliceSizes
+
+# GraphML text (as pieces) with only the nodes that keeps(nodeId) accepts and
+# the edges between them; everything else passes through unchanged
+def sliceGraphML(pieces, keeps):
+  def kept(match):
+    if(match.group(1) != None):
+      return(keeps(match.group(1)));
+    #end if
+    return(keeps(match.group(2)) and keeps(match.group(3)));
+  #end: kept
+  pending = "";
+  for piece in pieces:
+    pending += piece;
+    done = 0;
+    out = [];
+    for match in ELEMENT.finditer(pending):
+      out.append(pending[done:match.start()]);
+      if(kept(match)):
+        out.append(match.group(0));
+      #end if
+      done = match.end();
+    #end for
+    pending = pending[done:];
+    yield("".join(out));
+  #end for
+  yield(pending);
+#end: sliceGraphML
+
+# the result text with the left-out blocks added to the solver's No count
+# (the number after "defNo (", as resultfile.scanResult reads it); raises
+# ValueError if the text has no No count
+def addSlicedNo(text, blocks):
+  (added, found) = re.subn(r"^defNo \(([0-9]+)",
+                           lambda m: "defNo (%d" % (int(m.group(1)) + blocks),
+                           text, count=1, flags=re.M);
+  if(found == 0):
+    raise ValueError("no defNo count to add %d left-out blocks to" % blocks);
+  #end if
+  return(added);
+#end: addSlicedNo
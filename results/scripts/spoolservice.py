@@ -0,0 +1,402 @@
+#!/usr/bin/env python
+
+# A long-running analysis service fed through a spool directory.  Each
+# failure to analyze is a submission: a directory that appears (by rename,
+# so it is complete) in SPOOL/incoming, holding job.json and either the
+# extracted failure report (data.json or data.bin) or an executable and core
+# dump to extract it from (with the -extract command).  job.json says
+#   app, version, fault   where the run goes: SPOOL/results/APP/VERSION/FAULT
+#                         (one fault directory per executable, which holds
+#                         its CFG)
+#   graph                 the CFG's GraphML file(s), which must exist and be
+#                         named as cfg.findGraphInput expects (or none, if the
+#                         fault directory already has its CFG, or with
+#                         CFG_STORE)
+#   priority              higher runs first (default 0)
+#   solvers, stackOnly    what to run (default: every solver; not stack-only)
+#   executable, core      file names within the submission, for -extract
+# Accepted submissions become runs like any in a results tree, so makeCSV.py
+# reads SPOOL/results directly.  Runs go to warm workers (see warmworker.py),
+# which take the runs of one fault directory in turn, keeping the solver (and
+# the JVM) loaded; grissom still parses the CFG for every run.  The current
+# state of every submission is kept in SPOOL/status/NAME.json, and
+# submissions that can't be run (including any whose job.json has a field of
+# the wrong type, or names graph files that can't serve as a CFG) are moved
+# to SPOOL/failed.
+#
+# "spoolservice.py submit" turns test case directories of an existing results
+# tree into submissions, so the service can be tried out on results_trace.
+
+from argparse import ArgumentParser
+import json
+import os
+import os.path
+import shlex
+import shutil
+import signal
+import subprocess
+from sys import stderr
+import tempfile
+import time
+
+import analyzeAll
+from analyzeAll import SOLVERS, finishOne, jobResultPath, limitChild, \
+                       readLimits, solveOne
+from cfg import findGraphInput, isGraphInput
+from failurereport import reportPath
+from resultfile import readResult
+from scheduler import Job, machineMemory
+from warmworker import runWarmJobs
+
+SUBMISSION = "job.json";
+
+# raise ValueError unless a parsed job.json has the fields described above,
+# each of the right type
+def checkRequest(request):
+  if(not isinstance(request, dict)):
+    raise ValueError("not a JSON object");
+  #end if
+  for field in ("app", "version", "fault", "executable", "core"):
+    value = request.get(field, "");
+    if(not isinstance(value, basestring) or "/" in value or \
+       value in (".", "..")):
+      raise ValueError("%s must be a file name" % field);
+    #end if
+  #end for
+  for field in ("app", "version", "fault"):
+    if(not request.get(field)):
+      raise ValueError("no " + field);
+    #end if
+  #end for
+  if(not request["version"].startswith("v")):
+    raise ValueError("version must look like vN");
+  #end if
+  for field in ("graph", "solvers"):
+    value = request.get(field, []);
+    if(not isinstance(value, list) or \
+       not all(isinstance(v, basestring) for v in value)):
+      raise ValueError("%s must be a list of strings" % field);
+    #end if
+  #end for
+  graph = request.get("graph", []);
+  for path in graph:
+    if(not os.path.isfile(path)):
+      raise ValueError("no graph file " + path);
+    #end if
+  #end for
+  if(graph and not isGraphInput(graph)):
+    raise ValueError("graph files must be *.graphml, *.graphml.gz, " + \
+                     "*.graphml.zst, or graph.partNN: " + ", ".join(graph));
+  #end if
+  if(request.get("solvers") == [] or \
+     [s for s in request.get("solvers", []) if s not in SOLVERS]):
+    raise ValueError("solvers must be among " + ", ".join(SOLVERS));
+  #end if
+  if(not isinstance(request.get("stackOnly", False), bool)):
+    raise ValueError("stackOnly must be true or false");
+  #end if
+  priority = request.get("priority", 0);
+  if(not isinstance(priority, (int, long)) or isinstance(priority, bool)):
+    raise ValueError("priority must be an integer");
+  #end if
+#end: checkRequest
+
+def writeStatus(path, status):
+  tempPath = path + ".tmp";
+  with open(tempPath, 'w') as outFile:
+    json.dump(status, outFile, indent=1, sort_keys=True);
+  #end with
+  os.rename(tempPath, path);
+#end: writeStatus
+
+class Spool(object):
+  def __init__(self, directory, extract=None, interval=5.0):
+    self.directory = os.path.abspath(directory);
+    self.extract = extract;
+    self.interval = interval;
+    for part in ("incoming", "results", "status", "failed"):
+      if(not os.path.isdir(os.path.join(directory, part))):
+        os.makedirs(os.path.join(directory, part));
+      #end if
+    #end for
+    self.names = dict();
+    self.priorities = dict();
+    self.statuses = dict();
+    self.stopping = False;
+  #end: __init__
+
+  def path(self, *parts):
+    return(os.path.join(self.directory, *parts));
+  #end: path
+
+  def updateStatus(self, name, **changes):
+    status = self.statuses[name];
+    status.update(changes);
+    status["updated"] = time.time();
+    writeStatus(self.path("status", name + ".json"), status);
+  #end: updateStatus
+
+  # name, or name-N for the first N that no other submission has taken
+  def uniqueName(self, name, directory):
+    unique = name;
+    suffix = 1;
+    while(unique in self.statuses or \
+          os.path.exists(os.path.join(directory, unique)) or \
+          os.path.exists(self.path("status", unique + ".json"))):
+      suffix += 1;
+      unique = "%s-%d" % (name, suffix);
+    #end while
+    return(unique);
+  #end: uniqueName
+
+  def reject(self, name, reason):
+    print >> stderr, ("Rejecting submission " + name + ": " + reason);
+    failedName = self.uniqueName(name, self.path("failed"));
+    shutil.move(self.path("incoming", name), self.path("failed", failedName));
+    self.statuses[failedName] = {"name": failedName, "submitted": time.time()};
+    self.updateStatus(failedName, state="failed", reason=reason);
+  #end: reject
+
+  # the jobs for one submission, or [] if it was rejected
+  def accept(self, name):
+    incoming = self.path("incoming", name);
+    try:
+      with open(os.path.join(incoming, SUBMISSION), 'r') as readMe:
+        request = json.load(readMe);
+      #end with
+      checkRequest(request);
+      faultDir = self.path("results", request["app"], request["version"],
+                           request["fault"]);
+      graph = request.get("graph", []);
+      solvers = request.get("solvers", SOLVERS);
+      stackOnly = request.get("stackOnly", False);
+      priority = request.get("priority", 0);
+    except (IOError, ValueError) as caughtError:
+      self.reject(name, "bad " + SUBMISSION + ": " + str(caughtError));
+      return([]);
+    #end try
+    if(reportPath(incoming) == None and self.extract != None and \
+       "executable" in request and "core" in request):
+      command = shlex.split(self.extract) + \
+                [os.path.join(incoming, request["executable"]),
+                 os.path.join(incoming, request["core"]), incoming];
+      if(subprocess.call(command) != 0):
+        self.reject(name, "extraction failed: " + " ".join(command));
+        return([]);
+      #end if
+    #end if
+    if(reportPath(incoming) == None):
+      self.reject(name, "no failure report");
+      return([]);
+    #end if
+
+    # the fault directory holds the CFG of its executable, for every run
+    links = [];
+    try:
+      if(not os.path.isdir(faultDir)):
+        os.makedirs(faultDir);
+      #end if
+      if(not findGraphInput(faultDir)):
+        for path in graph:
+          link = os.path.join(faultDir, os.path.basename(path));
+          os.symlink(os.path.abspath(path), link);
+          links.append(link);
+        #end for
+      #end if
+      if(not findGraphInput(faultDir) and not os.environ.get("CFG_STORE")):
+        raise ValueError("no graph given, and none in " + faultDir);
+      #end if
+      # a failure submitted again is analyzed again, under a new name
+      runName = self.uniqueName(name, faultDir);
+      runDir = os.path.join(faultDir, runName);
+      os.rename(incoming, runDir);
+    except (OSError, ValueError) as caughtError:
+      for link in links:
+        os.remove(link);
+      #end for
+      self.reject(name, str(caughtError));
+      return([]);
+    #end try
+    name = runName;
+
+    (maxMemory, maxTime) = readLimits();
+    jobs = [Job(runDir, solver, stackOnly, maxMemory, maxTime)
+            for solver in solvers];
+    for job in jobs:
+      self.names[job] = name;
+      self.priorities[job] = priority;
+    #end for
+    self.statuses[name] = {"name": name, "runDir": runDir,
+                           "priority": priority, "submitted": time.time(),
+                           "solvers": dict((s, "queued") for s in solvers)};
+    self.updateStatus(name, state="queued");
+    print >> stderr, ("Accepted submission " + name + " (%d runs)" % len(jobs));
+    return(jobs);
+  #end: accept
+
+  # new jobs from the incoming directory, or None once the service stops
+  def poll(self):
+    if(self.stopping):
+      return(None);
+    #end if
+    jobs = [];
+    for name in sorted(os.listdir(self.path("incoming"))):
+      if(not name.startswith(".") and \
+         os.path.isdir(self.path("incoming", name))):
+        jobs += self.accept(name);
+      #end if
+    #end for
+    return(jobs);
+  #end: poll
+
+  def priority(self, job):
+    return(-self.priorities[job]);
+  #end: priority
+
+  def group(self, job):
+    return(os.path.dirname(job.dirname));
+  #end: group
+
+  # monitor hooks (see scheduler.runJobs)
+  def starting(self, job):
+    pass;
+  #end: starting
+
+  def started(self, job, pid):
+    name = self.names[job];
+    self.statuses[name]["solvers"][job.solver] = "running";
+    self.updateStatus(name, state="running");
+  #end: started
+
+  def stopped(self, job):
+    pass;
+  #end: stopped
+
+  def sample(self):
+    pass;
+  #end: sample
+
+  def finish(self, job, childExitStatus, childRUse, elapsed):
+    finishOne(job, childExitStatus, childRUse, elapsed);
+    name = self.names.pop(job);
+    del self.priorities[job];
+    solvers = self.statuses[name]["solvers"];
+    solvers[job.solver] = readResult(jobResultPath(job))["status"];
+    done = not [s for s in solvers.values() if s in ("queued", "running")];
+    self.updateStatus(name, state=("done" if done else "running"));
+  #end: finish
+#end: Spool
+
+# copy a test case directory of a results tree (app/vN/fault/testcase) into
+# the spool as a submission
+def submit(spool, testDir, priority, solvers, stackOnly):
+  testDir = os.path.abspath(testDir);
+  parts = testDir.split(os.sep);
+  if(reportPath(testDir) == None):
+    print >> stderr, ("ERROR: no failure report in " + testDir);
+    exit(1);
+  #end if
+  name = ".".join(parts[-4:]);
+  suffix = 1;
+  while(os.path.exists(os.path.join(spool, "incoming", name))):
+    suffix += 1;
+    name = "%s-%d" % (".".join(parts[-4:]), suffix);
+  #end while
+  staging = tempfile.mkdtemp(prefix=".", dir=os.path.join(spool, "incoming"));
+  shutil.copy(reportPath(testDir), staging);
+  with open(os.path.join(staging, SUBMISSION), 'w') as outFile:
+    json.dump({"app": parts[-4], "version": parts[-3], "fault": parts[-2],
+               "graph": [os.path.abspath(p) for p in
+                         findGraphInput(os.path.dirname(testDir))],
+               "priority": priority, "solvers": solvers,
+               "stackOnly": stackOnly}, outFile, indent=1, sort_keys=True);
+  #end with
+  os.rename(staging, os.path.join(spool, "incoming", name));
+  return(name);
+#end: submit
+
+def parseArguments():
+  parser = ArgumentParser(prog="spoolservice",
+              description="Analyze failures as they are submitted to a " + \
+                          "spool directory.");
+  commands = parser.add_subparsers(dest="command");
+  serving = commands.add_parser("serve",
+                                help="Run the service on a spool directory.");
+  serving.add_argument("spool", help="Path to the spool directory.");
+  serving.add_argument("-jobs", "--jobs", type=int, dest="jobs", default=1,
+                       help="Runs to execute at once. (default: 1)");
+  serving.add_argument("-memory-budget", "--memory-budget", type=int,
+                       dest="memoryBudget", default=None,
+                       help="MB of memory that concurrent runs may reserve " + \
+                            "in total. (default: physical memory)");
+  serving.add_argument("-warm", "--warm", type=int, dest="warm", default=100,
+                       help="Runs per worker before it is replaced. " + \
+                            "(default: 100)");
+  serving.add_argument("-poll", "--poll", type=float, dest="poll",
+                       default=5.0,
+                       help="Seconds between scans of the incoming " + \
+                            "directory. (default: 5)");
+  serving.add_argument("-extract", "--extract", dest="extract", default=None,
+                       help="Command that extracts a failure report: run " + \
+                            "as COMMAND EXECUTABLE CORE DIRECTORY, it " + \
+                            "should write DIRECTORY/data.json.");
+  serving.add_argument("-slice", "--slice", action="store_true",
+                       dest="slice", default=False,
+                       help="Solve on CFGs sliced for each failure (see " + \
+                            "analyzeAll.py -slice).");
+  serving.add_argument("-once", "--once", action="store_true", dest="once",
+                       default=False,
+                       help="Analyze what has been submitted so far, then " + \
+                            "exit.");
+  submitting = commands.add_parser("submit",
+                                   help="Submit test cases of a results tree.");
+  submitting.add_argument("spool", help="Path to the spool directory.");
+  submitting.add_argument("testcases", nargs="+",
+                          help="Test case directories (e.g., " + \
+                               "results_trace/tcas/v1/singleton/1138-trace).");
+  submitting.add_argument("-priority", "--priority", type=int,
+                          dest="priority", default=0,
+                          help="Higher priorities run first. (default: 0)");
+  submitting.add_argument("-solvers", "--solvers", nargs="+", dest="solvers",
+                          choices=SOLVERS, default=SOLVERS,
+                          help="Solvers to run. (default: all)");
+  submitting.add_argument("-stack", "--stack", action="store_true",
+                          dest="stack", default=False,
+                          help="Run the stack-only analysis.");
+  return(parser.parse_args());
+#end: parseArguments
+
+def main():
+  args = parseArguments();
+  if(args.command == "submit"):
+    Spool(args.spool);
+    for testDir in args.testcases:
+      print(submit(args.spool, testDir, args.priority, args.solvers,
+                   args.stack));
+    #end for
+    return;
+  #end if
+
+  analyzeAll.SLICE = args.slice;
+  spool = Spool(args.spool, args.extract, args.poll);
+  def stop(signum, frame):
+    print >> stderr, ("Stopping: finishing the runs already accepted.");
+    spool.stopping = True;
+  #end: stop
+  signal.signal(signal.SIGTERM, stop);
+  signal.signal(signal.SIGINT, stop);
+  if(args.once):
+    first = spool.poll();
+    spool.stopping = True;
+  else:
+    first = [];
+  #end if
+  memoryBudget = (args.memoryBudget if args.memoryBudget != None else \
+                  machineMemory());
+  runWarmJobs(first, limitChild, solveOne, spool.finish, args.jobs,
+              memoryBudget, args.warm, [spool], spool.group, spool.poll,
+              args.poll, spool.priority);
+#end: main
+
+if __name__ == '__main__' :
+  main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+
+# Read solver inputs that are split into parts and/or compressed as one
+# continuous stream, without writing the combined file to disk.  A file named
+# *.gz or *.zst is decompressed on the fly; several files are read one after
+# another, as "cat" would.
+
+import gzip
+import os
+import subprocess
+import threading
+
+CHUNK_SIZE = 1048576;
+
+def openOne(path):
+  if(path.endswith(".gz")):
+    return(gzip.open(path, 'rb'));
+  elif(path.endswith(".zst")):
+    try:
+      import zstandard
+      return(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb')));
+    except ImportError:
+      return(subprocess.Popen(["zstd", "-dcq", path],
+                              stdout=subprocess.PIPE).stdout);
+    #end try
+  else:
+    return(open(path, 'rb'));
+  #end if
+#end: openOne
+
+class ConcatenatedStream(object):
+  def __init__(self, paths):
+    self.paths = list(paths);
+    self.current = None;
+  #end: __init__
+
+  def read(self, size=-1):
+    pieces = [];
+    while(size != 0):
+      if(self.current == None):
+        if(not self.paths):
+          break;
+        #end if
+        self.current = openOne(self.paths.pop(0));
+      #end if
+      piece = self.current.read(size if size > 0 else CHUNK_SIZE);
+      if(not piece):
+        self.current.close();
+        self.current = None;
+        continue;
+      #end if
+      pieces.append(piece);
+      if(size > 0):
+        size -= len(piece);
+      #end if
+    #end while
+    return("".join(pieces));
+  #end: read
+
+  def close(self):
+    if(self.current != None):
+      self.current.close();
+      self.current = None;
+    #end if
+    self.paths = [];
+  #end: close
+#end: ConcatenatedStream
+
+def openInputs(paths):
+  return(ConcatenatedStream(paths));
+#end: openInputs
+
+def chunks(stream):
+  try:
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), ""):
+      yield chunk;
+  finally:
+    stream.close();
+  #end try
+#end: chunks
+
+# expose an iterable of strings as a readable path (/dev/fd/N) backed by a
+# pipe that a background thread fills; the path can be read exactly once
+def pipePath(pieces):
+  (readEnd, writeEnd) = os.pipe();
+
+  def feed():
+    try:
+      for piece in pieces:
+        offset = 0;
+        while(offset < len(piece)):
+          offset += os.write(writeEnd, buffer(piece, offset));
+        #end while
+      #end for
+    except OSError:
+      pass;
+    finally:
+      os.close(writeEnd);
+    #end try
+  #end: feed
+
+  feeder = threading.Thread(target=feed);
+  feeder.daemon = True;
+  feeder.start();
+  return("/dev/fd/%d" % readEnd);
+#end: pipePath
+
+# close the read end behind a path returned by pipePath, once it is consumed
+def releasePipePath(path):
+  if(path.startswith("/dev/fd/")):
+    try:
+      os.close(int(path[len("/dev/fd/"):]));
+    except OSError:
+      pass;
+    #end try
+  #end if
+#end: releasePipePath
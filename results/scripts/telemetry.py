@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+
+# Resource telemetry for analysis runs.  While a run is in progress, the
+# driver samples the resident size, virtual size, and CPU time of the run's
+# process tree every few seconds into a time-series file next to the result
+# file (inter.SOLVER.result[.stack].telemetry).  For SVPA runs, the child also
+# samples the JVM's used heap.  Each line of the time-series file is one of
+#   P elapsed_seconds rss_kb vsz_kb cpu_seconds
+#   J elapsed_seconds jvm_heap_used_kb
+# or, for a run answered from the result cache (see resultcache.py), which
+# has no samples, the single line
+#   C result_cache_key
+# When the run ends, a summary is appended to the result file as
+#   @PEAKRSS kb, @MEANRSS kb, @RSSGROWTH kb_per_second, @PEAKJVMHEAP kb
+# which makeCSV.py can report with --telemetry.
+
+import os
+import os.path
+import threading
+import time
+
+CLOCK_TICKS = float(os.sysconf("SC_CLK_TCK"));
+
+# parent pid of every process, from /proc
+def parentMap():
+  parents = dict();
+  for entry in os.listdir("/proc"):
+    if(not entry.isdigit()):
+      continue;
+    #end if
+    try:
+      with open("/proc/" + entry + "/stat", 'r') as readMe:
+        fields = readMe.read().rsplit(")", 1)[1].split();
+      #end with
+    except (IOError, IndexError):
+      continue;
+    #end try
+    parents[int(entry)] = int(fields[1]);
+  #end for
+  return(parents);
+#end: parentMap
+
+# pid and all of its (transitive) children
+def processTree(pid):
+  children = dict();
+  for (child, parent) in parentMap().items():
+    children.setdefault(parent, []).append(child);
+  #end for
+  tree = [pid];
+  for member in tree:
+    tree.extend(children.get(member, []));
+  #end for
+  return(tree);
+#end: processTree
+
+# (rss_kb, vsz_kb, cpu_seconds) of one process, or None if it has exited
+def sampleProcess(pid):
+  try:
+    rss = vsz = None;
+    with open("/proc/%d/status" % pid, 'r') as readMe:
+      for line in readMe:
+        if(line.startswith("VmRSS:")):
+          rss = int(line.split()[1]);
+        elif(line.startswith("VmSize:")):
+          vsz = int(line.split()[1]);
+        #end if
+      #end for
+    #end with
+    if(rss == None):
+      # a zombie, which has already released its memory
+      return(None);
+    #end if
+    with open("/proc/%d/stat" % pid, 'r') as readMe:
+      fields = readMe.read().rsplit(")", 1)[1].split();
+    #end with
+    return(rss, vsz, (int(fields[11]) + int(fields[12])) / CLOCK_TICKS);
+  except (IOError, IndexError, ValueError):
+    return(None);
+  #end try
+#end: sampleProcess
+
+def sampleTree(pid):
+  samples = [s for s in map(sampleProcess, processTree(pid)) if s != None];
+  return(tuple(sum(values) for values in zip(*samples)) if samples else None);
+#end: sampleTree
+
+def telemetryPath(resultPath):
+  return(resultPath + ".telemetry");
+#end: telemetryPath
+
+class Monitor(object):
+  def __init__(self, interval, resultPathFor):
+    self.interval = interval;
+    self.resultPathFor = resultPathFor;
+    self.runs = dict();
+  #end: __init__
+
+  # before the run starts, so that the run's own samples (see
+  # startHeapSampler) are never truncated away
+  def starting(self, job):
+    open(telemetryPath(self.resultPathFor(job)), 'w').close();
+  #end: starting
+
+  def started(self, job, pid):
+    path = telemetryPath(self.resultPathFor(job));
+    # append, as an SVPA child adds its own heap samples to the same file
+    self.runs[job] = (pid, time.time(), open(path, 'a'));
+  #end: started
+
+  def sample(self):
+    for (job, (pid, startingT, outFile)) in self.runs.items():
+      sample = sampleTree(pid);
+      if(sample != None):
+        print >> outFile, ("P %0.3f %d %d %0.2f" % \
+                           ((time.time() - startingT,) + sample));
+        outFile.flush();
+      #end if
+    #end for
+  #end: sample
+
+  def stopped(self, job):
+    if(job not in self.runs):
+      return;
+    #end if
+    self.runs.pop(job)[2].close();
+    resultPath = self.resultPathFor(job);
+    summary = summarize(telemetryPath(resultPath));
+    with open(resultPath, 'a') as resultFile:
+      print >> resultFile, ("");
+      for (marker, value) in summary:
+        print >> resultFile, ("%s %s" % (marker, value));
+      #end for
+    #end with
+  #end: stopped
+#end: Monitor
+
+def summarize(path):
+  rss = [];
+  heap = [];
+  with open(path, 'r') as readMe:
+    for line in readMe:
+      fields = line.split();
+      if(fields[:1] == ["P"]):
+        rss.append((float(fields[1]), int(fields[2])));
+      elif(fields[:1] == ["J"]):
+        heap.append(int(fields[2]));
+      #end if
+    #end for
+  #end with
+
+  summary = [];
+  if(rss):
+    summary.append(("@PEAKRSS", "%d" % max(r for (_, r) in rss)));
+    summary.append(("@MEANRSS", "%d" % (sum(r for (_, r) in rss) / len(rss))));
+    # least-squares slope of resident size over time
+    meanT = sum(t for (t, _) in rss) / len(rss);
+    meanR = sum(r for (_, r) in rss) / float(len(rss));
+    spread = sum((t - meanT) ** 2 for (t, _) in rss);
+    growth = (sum((t - meanT) * (r - meanR) for (t, r) in rss) / spread \
+              if spread > 0 else 0.0);
+    summary.append(("@RSSGROWTH", "%0.1f" % growth));
+  #end if
+  if(heap):
+    summary.append(("@PEAKJVMHEAP", "%d" % max(heap)));
+  #end if
+  return(summary);
+#end: summarize
+
+# in an SVPA child: sample the JVM's used heap until the returned event is set
+# (or the process exits)
+def startHeapSampler(resultPath, interval):
+  stopped = threading.Event();
+
+  def sampleHeap():
+    import jpype
+    startingT = time.time();
+    attached = False;
+    with open(telemetryPath(resultPath), 'a') as outFile:
+      while(not stopped.wait(interval)):
+        try:
+          if(not jpype.isJVMStarted()):
+            continue;
+          #end if
+          if(not attached):
+            jpype.attachThreadToJVM();
+            attached = True;
+          #end if
+          runtime = jpype.java.lang.Runtime.getRuntime();
+          used = runtime.totalMemory() - runtime.freeMemory();
+          print >> outFile, ("J %0.3f %d" % (time.time() - startingT,
+                                             used / 1024));
+          outFile.flush();
+        except Exception:
+          return;
+        #end try
+      #end while
+    #end with
+  #end: sampleHeap
+
+  sampler = threading.Thread(target=sampleHeap);
+  sampler.daemon = True;
+  sampler.start();
+  return(stopped);
+#end: startHeapSampler
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+# Two Leases instances sharing one sweep over a temporary directory, as two
+# analyzeAll.py -distribute instances would; run with
+#   python -m unittest test_leases
+# from this directory.
+
+import os
+import os.path
+import shutil
+import signal
+import subprocess
+import tempfile
+import time
+import unittest
+
+from leases import Leases, leasedFile
+from scheduler import Job
+
+EXPIRY = 60.0;
+
+class LeasesTest(unittest.TestCase):
+  def setUp(self):
+    self.dirname = tempfile.mkdtemp();
+    resultPathFor = lambda job: os.path.join(self.dirname,
+                                             "inter." + job.solver + ".result");
+    self.first = Leases("sweep1", resultPathFor, EXPIRY);
+    self.second = Leases("sweep1", resultPathFor, EXPIRY);
+    self.job = Job(self.dirname, "SVPA", False, 1024, 300);
+    self.children = [];
+  #end: setUp
+
+  def tearDown(self):
+    for child in self.children:
+      if(child.poll() == None):
+        child.kill();
+        child.wait();
+      #end if
+    #end for
+    shutil.rmtree(self.dirname);
+  #end: tearDown
+
+  def leaseFiles(self):
+    return(sorted(name for name in os.listdir(self.dirname)
+                  if leasedFile(name) != None));
+  #end: leaseFiles
+
+  # make the job's lease files look unrenewed for longer than the expiry
+  def age(self):
+    past = time.time() - 2 * EXPIRY;
+    for name in self.leaseFiles():
+      os.utime(os.path.join(self.dirname, name), (past, past));
+    #end for
+  #end: age
+
+  # a stand-in for a run's child
+  def spawn(self):
+    child = subprocess.Popen(["sleep", "60"]);
+    self.children.append(child);
+    return(child);
+  #end: spawn
+
+  def test_claim_is_exclusive(self):
+    self.assertTrue(self.first.claim(self.job));
+    self.assertFalse(self.second.claim(self.job));
+    self.assertFalse(self.first.claim(self.job));
+    self.assertEqual(self.leaseFiles(),
+                     ["inter.SVPA.result.sweep1.lease.0"]);
+  #end: test_claim_is_exclusive
+
+  def test_other_sweeps_do_not_share(self):
+    other = Leases("sweep2", self.first.resultPathFor, EXPIRY);
+    self.assertTrue(self.first.claim(self.job));
+    self.assertTrue(other.claim(self.job));
+  #end: test_other_sweeps_do_not_share
+
+  def test_released_lease_is_done(self):
+    self.assertTrue(self.first.claim(self.job));
+    self.assertFalse(self.second.finished(self.job));
+    self.first.release(self.job);
+    self.assertTrue(self.second.finished(self.job));
+    self.age();
+    self.assertFalse(self.second.claim(self.job));
+    self.assertEqual(self.leaseFiles(),
+                     ["inter.SVPA.result.sweep1.lease.0"]);
+  #end: test_released_lease_is_done
+
+  def test_heartbeat_keeps_lease(self):
+    self.assertTrue(self.first.claim(self.job));
+    self.age();
+    self.first.sample();
+    self.assertFalse(self.second.claim(self.job));
+    self.assertFalse(self.first.lostFor(self.job));
+  #end: test_heartbeat_keeps_lease
+
+  def test_expired_lease_is_taken_over(self):
+    self.assertTrue(self.first.claim(self.job));
+    self.age();
+    self.assertTrue(self.second.claim(self.job));
+    self.assertEqual(self.leaseFiles(),
+                     ["inter.SVPA.result.sweep1.lease.1"]);
+    # only one instance gets each generation
+    self.age();
+    third = Leases("sweep1", self.first.resultPathFor, EXPIRY);
+    self.assertTrue(third.claim(self.job));
+    self.assertFalse(self.second.claim(self.job));
+  #end: test_expired_lease_is_taken_over
+
+  def test_lost_lease_kills_run(self):
+    self.assertTrue(self.first.claim(self.job));
+    child = self.spawn();
+    self.first.started(self.job, child.pid);
+    self.age();
+    self.assertTrue(self.second.claim(self.job));
+    self.first.sample();
+    self.assertEqual(child.wait(), -signal.SIGKILL);
+    self.assertTrue(self.first.lostFor(self.job));
+    # the loser's release leaves the new holder's lease alone
+    self.first.stopped(self.job);
+    self.first.release(self.job);
+    self.assertFalse(self.first.lostFor(self.job));
+    self.assertFalse(self.second.finished(self.job));
+    self.second.release(self.job);
+    self.assertTrue(self.first.finished(self.job));
+  #end: test_lost_lease_kills_run
+
+  def test_untouched_run_survives_sample(self):
+    self.assertTrue(self.first.claim(self.job));
+    child = self.spawn();
+    self.first.started(self.job, child.pid);
+    self.first.sample();
+    self.assertEqual(child.poll(), None);
+    self.assertFalse(self.first.lostFor(self.job));
+  #end: test_untouched_run_survives_sample
+
+  def test_lease_file_names(self):
+    self.assertEqual(leasedFile("inter.SVPA.result.sweep1.lease.0"),
+                     "inter.SVPA.result");
+    self.assertEqual(leasedFile("inter.SVPA.result.stack.sweep1-2.lease.12"),
+                     "inter.SVPA.result.stack");
+    self.assertEqual(leasedFile("inter.SVPA.result.sweep1.lease.3.tmp"),
+                     "inter.SVPA.result");
+    self.assertEqual(leasedFile("inter.SVPA.result"), None);
+    self.assertEqual(leasedFile("inter.SVPA.result.sweep1.lease.x"), None);
+  #end: test_lease_file_names
+
+  def test_sweep_names(self):
+    for sweep in ("", "sweep.1", "a/b"):
+      self.assertRaises(ValueError, Leases, sweep, self.first.resultPathFor);
+    #end for
+  #end: test_sweep_names
+#end: LeasesTest
+
+if __name__ == '__main__' :
+  unittest.main()
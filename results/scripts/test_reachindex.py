@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# Settling blocks of a small CFG (the one test_slicing uses) from its
+# reachability index; run with
+#   python -m unittest test_reachindex
+# from this directory.
+
+from cStringIO import StringIO
+import os
+import tempfile
+import unittest
+
+from cfg import parseGraphML
+from reachindex import ReachIndex, buildIndex, settle
+from test_slicing import TEXT, report
+
+class ReachIndexTest(unittest.TestCase):
+  def setUp(self):
+    self.index = buildIndex(parseGraphML(StringIO(TEXT)));
+  #end: setUp
+
+  def test_settles_blocks_off_the_crash_path(self):
+    (keep, noBlocks, yesBlocks, blocks) = settle(self.index, report(), False);
+    # main's exit block, and all of g and h, are No; main's entry and the
+    # crash are Yes
+    self.assertEqual((noBlocks, yesBlocks, blocks), (7, 2, 12));
+    self.assertEqual(sorted(set(n.split(":")[1] for n in keep)), ["-1", "-2"]);
+    self.assertFalse("n:-1:2" in keep);
+  #end: test_settles_blocks_off_the_crash_path
+
+  def test_keeps_blocks_the_report_names(self):
+    (keep, noBlocks, yesBlocks, blocks) = \
+      settle(self.index, report(obsNo=[["n:-3:3"]]), False);
+    self.assertEqual(noBlocks, 6);
+    self.assertTrue("n:-3:3" in keep and "n:-3:4" in keep);
+    self.assertFalse("n:-3:1" in keep);
+  #end: test_keeps_blocks_the_report_names
+
+  def test_uncalled_procedures_are_roots(self):
+    self.assertEqual([self.index.nodes[n] for n in self.index.roots],
+                     ["n:-3:1", "n:-4:1"]);
+    # h may have been called from outside the CFG, by way of anything
+    (keep, noBlocks, yesBlocks, blocks) = \
+      settle(self.index, report(crash=["n:-4:4"]), False);
+    self.assertEqual(noBlocks, 0);
+    self.assertEqual(len(keep), 16);
+  #end: test_uncalled_procedures_are_roots
+
+  def test_read_back(self):
+    (fd, path) = tempfile.mkstemp(suffix=".reach");
+    try:
+      with os.fdopen(fd, 'wb') as outFile:
+        self.index.write(outFile);
+      #end with
+      with open(path, 'rb') as readMe:
+        readBack = ReachIndex.read(readMe);
+      #end with
+    finally:
+      os.remove(path);
+    #end try
+    self.assertEqual(readBack.nodes, self.index.nodes);
+    self.assertEqual(list(readBack.roots), list(self.index.roots));
+    self.assertEqual(settle(readBack, report(), False),
+                     settle(self.index, report(), False));
+  #end: test_read_back
+#end: ReachIndexTest
+
+if __name__ == '__main__' :
+  unittest.main()
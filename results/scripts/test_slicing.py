@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+
+# Slicing a small CFG for a failure report; run with
+#   python -m unittest test_slicing
+# from this directory.
+
+from cStringIO import StringIO
+import unittest
+
+from cfg import parseGraphML
+from failurereport import Report
+from reachindex import buildIndex
+from slicing import relevantProcedures, sliceGraphML, sliceSizes
+
+# main (-1) calls f (-2) and then crashes; g (-3) and h (-4) are never called
+GRAPH = """<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  <key id="kind" for="node" attr.name="kind" attr.type="string"> <default>declaration</default> </key>
+  <key id="basic-block" for="node" attr.name="basic-block" attr.type="string"/>
+  <key id="procedure" for="node" attr.name="procedure" attr.type="string"/>
+  <key id="scope" for="edge" attr.name="scope" attr.type="string"> <default>intraprocedural</default> </key>
+  <graph id="CFG" edgedefault="directed">
+%s
+  </graph>
+</graphml>
+""";
+
+def procedure(number, name, called=None):
+  text = ("""    <node id="n:%d:1">
+      <data key="basic-block">function_entry</data>
+      <data key="kind">entry</data>
+      <data key="procedure">%s</data>
+    </node>
+    <node id="n:%d:2">
+      <data key="basic-block">function_exit</data>
+      <data key="kind">exit</data>
+    </node>
+    <node id="n:%d:3">
+      <data key="basic-block">entry</data>
+      <data key="kind">expression</data>
+    </node>
+    <node id="n:%d:4">
+      <data key="basic-block">entry</data>
+      <data key="kind">expression</data>
+    </node>
+    <edge source="n:%d:1" target="n:%d:3"/>
+    <edge source="n:%d:3" target="n:%d:4"/>
+    <edge source="n:%d:4" target="n:%d:2"/>
+""" % ((number, name) + (number,) * 9));
+  if(called != None):
+    text += """    <edge source="n:%d:3" target="n:%d:1">
+      <data key="scope">interprocedural</data>
+    </edge>
+""" % (number, called);
+  #end if
+  return(text);
+#end: procedure
+
+TEXT = GRAPH % "".join([procedure(-1, "main", -2), procedure(-2, "f"),
+                        procedure(-3, "g"), procedure(-4, "h")]);
+
+def report(**parts):
+  data = {"crash": ["n:-1:4"], "obsYes": [], "obsNo": [], "stack": []};
+  data.update(parts);
+  return(Report.fromData(data));
+#end: report
+
+class SlicingTest(unittest.TestCase):
+  def setUp(self):
+    self.graph = parseGraphML(StringIO(TEXT));
+    self.index = buildIndex(self.graph);
+  #end: setUp
+
+  def sliced(self, keep):
+    return("".join(sliceGraphML([TEXT], lambda nodeId:
+                                 nodeId.split(":")[1] in keep)));
+  #end: sliced
+
+  def test_keeps_path_to_crash(self):
+    keep = relevantProcedures(self.index, report());
+    self.assertEqual(keep, set(["-1", "-2"]));
+    self.assertEqual(sliceSizes(self.graph, keep), [(4, 16, 12), (2, 8, 6)]);
+  #end: test_keeps_path_to_crash
+
+  def test_keeps_procedures_the_report_names(self):
+    keep = relevantProcedures(self.index,
+                              report(obsNo=[["n:-3:3"]],
+                                     obsYes=[{"reliable": False,
+                                              "entries": [["n:-4:4"]]}]));
+    self.assertEqual(keep, set(["-1", "-2", "-3", "-4"]));
+  #end: test_keeps_procedures_the_report_names
+
+  def test_slice_has_every_reported_node(self):
+    failure = report(obsNo=[["n:-3:3"]]);
+    keep = relevantProcedures(self.index, failure);
+    self.assertEqual(keep, set(["-1", "-2", "-3"]));
+    sliced = self.sliced(keep);
+    for nodeId in failure.toData()["obsNo"][0] + failure.toData()["crash"]:
+      self.assertTrue('<node id="%s">' % nodeId in sliced);
+    #end for
+    self.assertFalse('<node id="n:-4:' in sliced);
+    self.assertFalse('source="n:-4:' in sliced);
+  #end: test_slice_has_every_reported_node
+#end: SlicingTest
+
+if __name__ == '__main__' :
+  unittest.main()
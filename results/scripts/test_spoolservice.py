@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# Accepting and rejecting submissions in a temporary spool directory; run with
+#   python -m unittest test_spoolservice
+# from this directory.
+
+import json
+import os
+import os.path
+import shutil
+import tempfile
+import unittest
+
+from spoolservice import Spool
+
+GRAPH = """<?xml version="1.0" encoding="UTF-8"?>
+<graphml xmlns="http://graphml.graphdrawing.org/xmlns">
+  <graph id="CFG" edgedefault="directed"/>
+</graphml>
+""";
+
+class SpoolTest(unittest.TestCase):
+  def setUp(self):
+    self.dirname = tempfile.mkdtemp();
+    self.spool = Spool(os.path.join(self.dirname, "spool"));
+    self.graph = os.path.join(self.dirname, "tcas.graphml");
+    with open(self.graph, 'w') as outFile:
+      outFile.write(GRAPH);
+    #end with
+    self.savedStore = os.environ.pop("CFG_STORE", None);
+  #end: setUp
+
+  def tearDown(self):
+    if(self.savedStore != None):
+      os.environ["CFG_STORE"] = self.savedStore;
+    #end if
+    shutil.rmtree(self.dirname);
+  #end: tearDown
+
+  def submit(self, name, graph):
+    incoming = self.spool.path("incoming", name);
+    os.makedirs(incoming);
+    with open(os.path.join(incoming, "job.json"), 'w') as outFile:
+      json.dump({"app": "tcas", "version": "v1", "fault": "singleton",
+                 "graph": graph, "solvers": ["SVPA"]}, outFile);
+    #end with
+    with open(os.path.join(incoming, "data.json"), 'w') as outFile:
+      json.dump({"crash": [], "obsYes": [], "obsNo": [], "stack": []},
+                outFile);
+    #end with
+    return(self.spool.accept(name));
+  #end: submit
+
+  def state(self, name):
+    with open(self.spool.path("status", name + ".json"), 'r') as readMe:
+      return(json.load(readMe)["state"]);
+    #end with
+  #end: state
+
+  def faultDir(self):
+    return(self.spool.path("results", "tcas", "v1", "singleton"));
+  #end: faultDir
+
+  def test_accepts_graph(self):
+    self.assertEqual(len(self.submit("first", [self.graph])), 1);
+    self.assertEqual(self.state("first"), "queued");
+    self.assertTrue(os.path.islink(os.path.join(self.faultDir(),
+                                                "tcas.graphml")));
+    # later runs of the fault use the CFG already there
+    self.assertEqual(len(self.submit("second", [self.graph])), 1);
+    self.assertEqual(len(self.submit("third", [])), 1);
+  #end: test_accepts_graph
+
+  def test_rejects_missing_graph(self):
+    missing = os.path.join(self.dirname, "missing.graphml");
+    self.assertEqual(self.submit("first", [missing]), []);
+    self.assertEqual(self.state("first"), "failed");
+    self.assertTrue(os.path.isdir(self.spool.path("failed", "first")));
+    self.assertEqual(os.listdir(self.faultDir()) if \
+                     os.path.isdir(self.faultDir()) else [], []);
+  #end: test_rejects_missing_graph
+
+  def test_rejects_misnamed_graph(self):
+    misnamed = os.path.join(self.dirname, "tcas.xml");
+    shutil.copy(self.graph, misnamed);
+    for name in ("first", "second"):
+      self.assertEqual(self.submit(name, [misnamed]), []);
+      self.assertEqual(self.state(name), "failed");
+    #end for
+    self.assertEqual(len(self.submit("third", [self.graph])), 1);
+  #end: test_rejects_misnamed_graph
+
+  def test_rejects_failed_setup(self):
+    # a file where the fault directory's parent should be
+    versionDir = os.path.dirname(self.faultDir());
+    os.makedirs(os.path.dirname(versionDir));
+    open(versionDir, 'w').close();
+    self.assertEqual(self.submit("first", [self.graph]), []);
+    self.assertEqual(self.state("first"), "failed");
+    os.remove(versionDir);
+    self.assertEqual(len(self.submit("second", [self.graph])), 1);
+  #end: test_rejects_failed_setup
+#end: SpoolTest
+
+if __name__ == '__main__' :
+  unittest.main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+
+# Tiered analysis: skip the more precise solvers once a cheaper one has
+# settled every block.  The solvers run from cheapest to most precise, and a
+# more precise solver runs only if every solver before it left some blocks
+# Maybe (or didn't finish).  All three solvers are sound, so a block that one
+# tier answers Yes or No gets the same answer from every more precise tier;
+# once a tier leaves nothing Maybe, later tiers can't add anything.  A tier
+# that does run still solves every block of the CFG it is given, as a run of
+# that solver on its own would (grissom can't be asked about only some
+# blocks), so tiering saves nothing on runs where the cheaper tiers leave
+# Maybe blocks.  The tiers' answers are merged into one result file,
+# inter.TIERED.result[.stack], with a @TIER line per tier that ran; the most
+# precise tier that completed has the final counts.  Only tiers with a final
+# outcome (see resultfile.isFinal) are merged; a tier that failed some other
+# way, or never finished, is listed but otherwise ignored.
+
+import os
+import os.path
+from sys import stderr
+
+from resultfile import isFinal, readResult, recordPath, scanResult
+
+# cheapest first
+TIERS = ["UTL", "FSA", "SVPA"];
+
+TIERED = "TIERED";
+
+# whether a run needs another tier, given the results of the tiers so far
+def needsTier(results):
+  return(not any(r["status"] == "completed" and r["maybeCount"] == 0
+                 for r in results));
+#end: needsTier
+
+def runTime(result):
+  if(result["analysisTime"] != None):
+    return(result["analysisTime"]);
+  #end if
+  return(result["failureTime"] if result["failureTime"] != None else 0.0);
+#end: runTime
+
+# merge the results of the tiers that ran (a list of (solver, resultPath),
+# cheapest first) into outPath; returns what the merged record should add, or
+# None if no tier has a final outcome, in which case there is no merged result
+def mergeTiers(tierPaths, outPath):
+  tiers = [(solver, readResult(path)) for (solver, path) in tierPaths];
+  final = [(solver, r) for (solver, r) in tiers if isFinal(r)];
+  if(not final):
+    print >> stderr, ("No tier has a final outcome; not merging " + outPath);
+    for path in (outPath, recordPath(outPath)):
+      if(os.path.exists(path)):
+        os.remove(path);
+      #end if
+    #end for
+    return(None);
+  #end if
+  completed = [(solver, r) for (solver, r) in final
+               if r["status"] == "completed"];
+  for (solver, r) in completed:
+    if(None in (r["yesCount"], r["noCount"], r["maybeCount"])):
+      raise ValueError("%s completed without Yes, No, and Maybe counts" % \
+                       dict(tierPaths)[solver]);
+    #end if
+  #end for
+  total = sum(runTime(r) for (_, r) in tiers);
+  with open(outPath, 'w') as outFile:
+    for (solver, r) in tiers:
+      print >> outFile, ("@TIER %s %s %0.3f" % (solver, r["status"],
+                                                runTime(r)));
+    #end for
+    if(completed):
+      last = completed[-1][1];
+      for (header, count) in (("defYes", "yesCount"), ("defNo", "noCount"),
+                              ("maybe", "maybeCount")):
+        print >> outFile, ("%s (%d total):" % (header, last[count]));
+      #end for
+      # what the final tier's solver was handed (see analyzeAll.solveOne)
+      markers = scanResult(dict(tierPaths)[completed[-1][0]])["markers"];
+      for marker in ("@SLICE", "@REACHINDEX"):
+        if(marker in markers):
+          print >> outFile, ("\n%s %s" % (marker, markers[marker]));
+        #end if
+      #end for
+      print >> outFile, ("\n@ANALYSISTIME %0.3f" % total);
+    else:
+      # no tier completed: report the cheapest tier's time or memory out
+      failed = final[0][1];
+      print >> outFile, ("\n@FAILURETIME %0.3f" % total);
+      print >> outFile, ("@TIMEOUT" if failed["timedOut"] else "@MEMORYOUT");
+    #end if
+  #end with
+  return({"tiers": [{"solver": solver, "status": r["status"],
+                     "time": runTime(r), "maybeCount": r["maybeCount"]}
+                    for (solver, r) in tiers]});
+#end: mergeTiers
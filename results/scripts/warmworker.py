@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+
+# Run analysis jobs in long-lived worker processes instead of forking a fresh
+# child per run.  A worker keeps the grissom modules (and, for SVPA, the JVM)
+# loaded between runs and receives jobs over a pipe.  Each worker only serves
+# one (solver, MAX_MEMORY) pair, so its address-space limit never changes.
+# A worker is recycled after a fixed number of runs, after any failed run
+# (e.g., running out of memory), and whenever it dies; the run it was working
+# on is then accounted for exactly like a forked child that exited.
+#
+# A worker's own peak resident size covers all of its runs, so before each
+# run it resets the peak (through /proc/self/clear_refs) and reports the
+# run's own peak afterwards.  A worker whose lifetime peak has reached the
+# memoryout threshold is replaced, so that the lifetime peak of a worker that
+# dies during a run is that run's.
+
+from collections import namedtuple
+import errno
+import json
+import os
+import resource
+import select
+import signal
+from sys import stdout, stderr
+import time
+
+from memlimit import memoryoutRSS
+from scheduler import Job, TICK
+
+# the subset of a struct_rusage that finishOne() looks at
+Usage = namedtuple("Usage", ["ru_utime", "ru_stime", "ru_maxrss"]);
+
+class Worker(object):
+  def __init__(self, key, pid, jobsDown, resultsUp):
+    self.key = key;
+    self.pid = pid;
+    self.jobsDown = jobsDown;
+    self.resultsUp = resultsUp;
+    self.buffer = "";
+    self.job = None;
+    self.group = None;
+    self.startingT = None;
+    self.reserved = 0;
+    self.jobsDone = 0;
+    self.cpuSeen = 0.0;
+  #end: __init__
+#end: Worker
+
+def workerKey(job):
+  return((job.solver, job.maxMemory));
+#end: workerKey
+
+def cpuTime(usage):
+  return(usage.ru_utime + usage.ru_stime);
+#end: cpuTime
+
+# start counting this process's peak resident size afresh; returns whether
+# the kernel supports it
+def resetPeakRSS():
+  try:
+    with open("/proc/self/clear_refs", 'w') as outFile:
+      outFile.write("5");
+    #end with
+  except IOError:
+    return(False);
+  #end try
+  return(True);
+#end: resetPeakRSS
+
+# this process's peak resident size (KB) since the last resetPeakRSS(), or
+# None if it can't be read
+def peakRSSSinceReset():
+  try:
+    with open("/proc/self/status", 'r') as readMe:
+      for line in readMe:
+        if(line.startswith("VmHWM:")):
+          return(int(line.split()[1]));
+        #end if
+      #end for
+    #end with
+  except (IOError, ValueError):
+    pass;
+  #end try
+  return(None);
+#end: peakRSSSinceReset
+
+def workerLoop(jobsDown, resultsUp, limit, solveOne, jobsPerWorker):
+  jobsIn = os.fdopen(jobsDown, 'r');
+  homeDir = os.getcwd();
+  savedOut = os.dup(stdout.fileno());
+  savedErr = os.dup(stderr.fileno());
+  for jobsDone in range(jobsPerWorker):
+    line = jobsIn.readline();
+    if(not line):
+      break;
+    #end if
+    job = Job(**json.loads(line));
+
+    limit(job, cpuTime(resource.getrusage(resource.RUSAGE_SELF)));
+    fresh = resetPeakRSS();
+    exitStatus = solveOne(job);
+    stdout.flush();
+    stderr.flush();
+    os.dup2(savedOut, stdout.fileno());
+    os.dup2(savedErr, stderr.fileno());
+    os.chdir(homeDir);
+
+    usage = resource.getrusage(resource.RUSAGE_SELF);
+    runPeak = (peakRSSSinceReset() if fresh else None);
+    os.write(resultsUp, "%d %f %f %d %d\n" % \
+             (exitStatus, usage.ru_utime, usage.ru_stime,
+              (runPeak if runPeak != None else usage.ru_maxrss),
+              usage.ru_maxrss));
+    if(exitStatus != 0):
+      # don't trust a worker that just ran out of memory with another job
+      break;
+    #end if
+  #end for
+  os._exit(0);
+#end: workerLoop
+
+def startWorker(key, workers, limit, solveOne, jobsPerWorker):
+  (jobsRead, jobsWrite) = os.pipe();
+  (resultsRead, resultsWrite) = os.pipe();
+  pid = os.fork();
+  if(pid == 0):
+    os.close(jobsWrite);
+    os.close(resultsRead);
+    for other in workers:
+      os.close(other.jobsDown);
+      os.close(other.resultsUp);
+    #end for
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL);
+    try:
+      workerLoop(jobsRead, resultsWrite, limit, solveOne, jobsPerWorker);
+    finally:
+      os._exit(1);
+    #end try
+  #end if
+  os.close(jobsRead);
+  os.close(resultsWrite);
+  return(Worker(key, pid, jobsWrite, resultsRead));
+#end: startWorker
+
+def stopWorker(worker, workers):
+  workers.remove(worker);
+  os.close(worker.jobsDown);
+  os.close(worker.resultsUp);
+  return(os.wait4(worker.pid, 0));
+#end: stopWorker
+
+# limit: function(job, cpuUsed) that applies the per-run resource limits
+# solveOne: function(job) -> exit status, running the job in-process
+# finish: function(job, exitStatus, rusage, elapsedSeconds)
+# monitors: as for scheduler.runJobs
+# reserve: as for scheduler.runJobs; a worker holds the most that any of its
+# runs has reserved, as what a run leaves behind stays with the worker
+# group: if given, function(job) -> a key; an idle worker takes a pending job
+# from the same group as its last one before any other job
+# incoming: if given, function() -> more jobs to run, or None once there will
+# be no more; it is polled every pollInterval seconds, and idle workers are
+# kept until it returns None
+# priority: if given, function(job) -> a key; pending jobs are handed out in
+# order of their keys (and otherwise in the order they came)
+# claim: as for scheduler.runJobs
+def runWarmJobs(jobs, limit, solveOne, finish, numWorkers=1,
+                memoryBudget=None, jobsPerWorker=25, monitors=None, group=None,
+                incoming=None, pollInterval=5.0, priority=None, claim=None,
+                reserve=None):
+  monitors = (monitors if monitors != None else []);
+  reservation = (reserve if reserve != None else lambda job: job.maxMemory);
+  pending = list(jobs);
+  workers = [];
+  accepting = (incoming != None);
+  lastPoll = None;
+
+  while(pending or accepting or any(w.job != None for w in workers)):
+    if(accepting and \
+       (lastPoll == None or time.time() - lastPoll >= pollInterval)):
+      more = incoming();
+      lastPoll = time.time();
+      if(more == None):
+        accepting = False;
+      else:
+        pending += more;
+      #end if
+    #end if
+    if(priority != None):
+      pending.sort(key=priority);
+    #end if
+
+    # hand pending jobs to idle workers, starting (or swapping) workers
+    # as the worker count and memory budget allow
+    affine = [];
+    if(group != None):
+      for worker in [w for w in workers if w.job == None and w.group != None]:
+        same = [job for job in pending if job not in affine and \
+                workerKey(job) == worker.key and group(job) == worker.group];
+        affine += same[:1];
+      #end for
+    #end if
+    for job in affine + [job for job in pending if job not in affine]:
+      key = workerKey(job);
+      idle = [w for w in workers if w.job == None];
+      chosen = [w for w in idle if w.key == key];
+      if(group != None):
+        chosen.sort(key=lambda w: w.group != group(job));
+      #end if
+      if(chosen):
+        worker = chosen[0];
+      else:
+        reserved = sum(w.reserved for w in workers);
+        if(len(workers) >= max(numWorkers, 1) or \
+           (workers and memoryBudget != None and \
+            reserved + reservation(job) > memoryBudget)):
+          if(not idle):
+            continue;
+          #end if
+          stopWorker(idle[0], workers);
+          reserved -= idle[0].reserved;
+          if(workers and memoryBudget != None and \
+             reserved + reservation(job) > memoryBudget):
+            continue;
+          #end if
+        #end if
+        worker = startWorker(key, workers, limit, solveOne, jobsPerWorker);
+        workers.append(worker);
+      #end if
+      pending.remove(job);
+      if(claim != None and not claim(job)):
+        continue;
+      #end if
+      worker.job = job;
+      worker.reserved = max(worker.reserved, reservation(job));
+      worker.group = (group(job) if group != None else None);
+      for monitor in monitors:
+        monitor.starting(job);
+      #end for
+      worker.startingT = time.time();
+      os.write(worker.jobsDown, json.dumps(job._asdict()) + "\n");
+      for monitor in monitors:
+        monitor.started(job, worker.pid);
+      #end for
+    #end for
+
+    busy = dict((w.resultsUp, w) for w in workers if w.job != None);
+    timeout = min([TICK] + [m.interval for m in monitors] + \
+                  ([pollInterval] if accepting else []));
+    try:
+      (ready, _, _) = select.select(busy.keys(), [], [], timeout);
+    except select.error as caughtError:
+      if(caughtError.args[0] != errno.EINTR):
+        raise;
+      #end if
+      ready = [];
+    #end try
+    for monitor in monitors:
+      monitor.sample();
+    #end for
+
+    for fd in ready:
+      worker = busy[fd];
+      data = os.read(fd, 4096);
+      job = worker.job;
+      elapsed = time.time() - worker.startingT;
+      if(not data):
+        # the worker died during the run (timeout, crash, ...)
+        (_, exitStatus, usage) = stopWorker(worker, workers);
+        for monitor in monitors:
+          monitor.stopped(job);
+        #end for
+        finish(job, exitStatus, \
+               Usage(cpuTime(usage) - worker.cpuSeen, 0.0, usage.ru_maxrss), \
+               elapsed);
+        continue;
+      #end if
+      worker.buffer += data;
+      if("\n" not in worker.buffer):
+        continue;
+      #end if
+      (exitStatus, utime, stime, maxrss, lifetimeRSS) = worker.buffer.split();
+      worker.buffer = "";
+      worker.job = None;
+      worker.jobsDone += 1;
+      cpuUsed = float(utime) + float(stime);
+      for monitor in monitors:
+        monitor.stopped(job);
+      #end for
+      finish(job, int(exitStatus), \
+             Usage(cpuUsed - worker.cpuSeen, 0.0, int(maxrss)), elapsed);
+      worker.cpuSeen = cpuUsed;
+      if(int(exitStatus) != 0 or worker.jobsDone >= jobsPerWorker or \
+         int(lifetimeRSS) >= memoryoutRSS(worker.key[1])):
+        stopWorker(worker, workers);
+      #end if
+    #end for
+
+    for worker in [w for w in workers if w.job != None]:
+      if(time.time() - worker.startingT > worker.job.maxTime + 600):
+        print >> stderr, ("Killing worker who missed timeout signal");
+        os.kill(worker.pid, signal.SIGKILL);
+      #end if
+    #end for
+  #end while
+
+  for worker in list(workers):
+    stopWorker(worker, workers);
+  #end for
+#end: runWarmJobs
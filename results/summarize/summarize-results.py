@@ -4,9 +4,12 @@ import pandas
 
 from argparse import ArgumentParser
 from collections import OrderedDict
+from io import StringIO
 from pathlib import Path
 from tabulate import tabulate
 
+import summarizer
+
 
 ########################################################################
 #
@@ -30,9 +33,15 @@ def rename_solvers(column):
 
 CSV_DIR = Path(__file__).parent
 
+# intermediate tables built in this process (see --build), by basename
+TABLES = {}
+
 
 def read_csv(basename):
-    path = (CSV_DIR / basename).with_suffix('.csv')
+    if basename in TABLES:
+        path = StringIO(TABLES[basename])
+    else:
+        path = (CSV_DIR / basename).with_suffix('.csv')
     frame = pandas.read_csv(path, index_col='App')
     frame.index = frame.index.str.replace('\\\_', '_')
     frame.index.rename('Application', inplace=True)
@@ -114,7 +123,12 @@ def main():
 
     parser = ArgumentParser(description='Summarize experimental results.')
     parser.add_argument('--only', action='append', choices=handlers.keys(), help='table or figure to summarize; can be used multiple times; default shows everything, in paper order')
-    only = parser.parse_args().only or handlers.keys()
+    parser.add_argument('--build', action='store_true', help='first rebuild the intermediate tables from csi-data.csv and stack-data.csv, in this process, re-aggregating only applications whose runs changed since the last build')
+    args = parser.parse_args()
+    only = args.only or handlers.keys()
+
+    if args.build:
+        TABLES.update(summarizer.build(CSV_DIR))
 
     for key in only:
         handlers[key]()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+import hashlib
+import pickle
+
+from collections import OrderedDict
+from io import StringIO
+from pathlib import Path
+
+import pandas
+
+
+########################################################################
+#
+#  Shared engine behind the prepare-*.py scripts and
+#  summarize-results.py --build.
+#
+#  Every intermediate table is built in two steps.  A "piece" aggregates
+#  the runs of one application.  A "finish" step concatenates the
+#  pieces of all applications and shapes the table for the paper.  The
+#  raw runs are read once, in-process.  The pieces are cached per
+#  application, keyed by a digest of that application's rows, so a
+#  rebuild only re-reads and re-aggregates the applications whose runs
+#  changed.
+#
+
+
+SUMMARIZE_DIR = Path(__file__).parent
+
+FEEDBACKS = ('csi', 'stack')
+
+ASPECTS = ('certain', 'incomplete', 'relative-time')
+
+SOLVERS = ('FSA', 'SVPA', 'UTL')
+
+CACHE_NAME = '.summarize-cache'
+
+# bump whenever a piece changes; an older cache is ignored
+CACHE_VERSION = 1
+
+
+########################################################################
+#
+#  per-application pieces
+#
+
+
+def certain_piece(csv):
+    # only consider analyses that completed
+    csv = csv[['Solver', 'App', 'Completed', 'Yes', 'No', 'Maybe']]
+    csv = csv[csv.Completed].copy()
+    if csv.empty:
+        return None
+    del csv['Completed']
+
+    # compute fraction of answers that were certain: yes or no, not maybe
+    certain = csv.Yes + csv.No
+    csv['Certain'] = certain / (certain + csv.Maybe)
+    for junk in 'Yes', 'No', 'Maybe':
+        del csv[junk]
+
+    # aggregate
+    pivot = csv.pivot_table(index='App', columns='Solver')
+    pivot.columns = pivot.columns.droplevel()
+    return pivot
+
+
+def incomplete_piece(csv):
+    csv = csv[['Solver', 'App', 'Timeout', 'Memoryout']].copy()
+    csv['Attempted'] = 1
+    return csv.pivot_table(index='App', columns='Solver', aggfunc=sum)
+
+
+def relative_time_piece(csv):
+    # only consider analyses that completed
+    csv = csv[['Solver', 'App', 'Version', 'Fault', 'Completed', 'AnalysisTime']]
+    csv = csv[csv.Completed].copy()
+    if csv.empty:
+        return None
+    del csv['Completed']
+
+    # pull analysis times by various solvers up into side-by-side columns
+    pivot = csv.pivot_table(index=('App', 'Version', 'Fault'), columns='Solver')
+    pivot.columns = pivot.columns.droplevel()
+    pivot = pivot.reindex(columns=pivot.columns.union(SOLVERS))
+
+    # replace absolute analysis times with UTL-relative times
+    pivot['SVPA Over UTL'] = pivot.SVPA / pivot.UTL
+    pivot['FSA Over UTL'] = pivot.FSA / pivot.UTL
+    del pivot['SVPA']
+    del pivot['FSA']
+    del pivot['UTL']
+    pivot.columns.name = 'Ratio'
+
+    # unpivot and ignore relative times where either involved solver failed to complete
+    pivot.reset_index(inplace=True)
+    pivot.columns.name = 'Comparison'
+    melted = pandas.melt(pivot, id_vars=('App', 'Version', 'Fault'), value_name='Ratio')
+    melted.dropna(inplace=True)
+    if melted.empty:
+        return None
+
+    # re-pivot to put FSA/UTL and SVPA/UTL ratios back into side-by-side columns
+    del melted['Version']
+    del melted['Fault']
+    pivot = melted.pivot_table(index='App', columns='Comparison')
+    pivot.columns = pivot.columns.droplevel()
+    return pivot
+
+
+PIECES = OrderedDict((
+    ('certain', certain_piece),
+    ('incomplete', incomplete_piece),
+    ('relative-time', relative_time_piece),
+))
+
+
+########################################################################
+#
+#  whole tables, from the pieces of every application
+#
+
+
+def concat_pieces(pieces):
+    pieces = [piece for piece in pieces if piece is not None]
+    return pandas.concat(pieces)
+
+
+def save(pivot, sizes, **options):
+    # add LoC column for later sorting
+    pivot = pivot.join(sizes)
+
+    # protect underscores from LaTeX and save for use by paper
+    pivot.set_index(pivot.index.str.replace('_', '\\_'), inplace=True)
+    out = StringIO()
+    pivot.to_csv(out, **options)
+    return out.getvalue()
+
+
+def finish_certain(pieces, sizes):
+    pivot = concat_pieces(pieces).sort_index(axis=1)
+    return save(pivot, sizes)
+
+
+def finish_incomplete(pieces, sizes):
+    pivot = concat_pieces(pieces)
+
+    # validate attempt counts, save for later, and temporarily remove
+    assert (pivot.Attempted.UTL == pivot.Attempted.FSA).all()
+    # assert (pivot.Attempted.UTL == pivot.Attempted.SVPA).all()
+    attempted = pivot.Attempted.UTL
+    del pivot['Attempted']
+
+    # identify and remove rows with neither timeouts nor memoryouts
+    filter = (pivot.Timeout == 0) & (pivot.Memoryout == 0)
+    filter = filter.SVPA & filter.FSA & filter.UTL
+    pivot = pivot[~filter]
+
+    # shuffle columns around to group by solver first, then by problem count
+    pivot = pivot.reorder_levels([1, 0], axis=1)
+    colindex = pandas.MultiIndex.from_product((
+        ('SVPA', 'FSA', 'UTL'),
+        ('Timeout', 'Memoryout'),
+    ), names=('Solver', 'Count'))
+    pivot = pivot.reindex_axis(colindex, 1)
+
+    # flatten columns
+    pivot.columns = [' '.join(pair) for pair in colindex.tolist()]
+
+    # restore "Attempted" column
+    pivot.insert(0, 'Attempted', attempted)
+
+    return save(pivot, sizes, float_format='%.f')
+
+
+def finish_relative_time(pieces, sizes):
+    pivot = concat_pieces(pieces).sort_index(axis=1)
+    pivot = pivot[pivot.columns.values[::-1]]
+    return save(pivot, sizes)
+
+
+FINISHES = OrderedDict((
+    ('certain', finish_certain),
+    ('incomplete', finish_incomplete),
+    ('relative-time', finish_relative_time),
+))
+
+
+def read_sizes(path):
+    return pandas.read_csv(str(path), index_col='App', usecols=('App', 'Mean LoC'))
+
+
+# one intermediate table, as CSV text, from a whole *-data.csv file
+def prepare(aspect, applications, data):
+    csv = pandas.read_csv(str(data))
+    return FINISHES[aspect]([PIECES[aspect](csv)], read_sizes(applications))
+
+
+########################################################################
+#
+#  incremental builds
+#
+
+
+# the header of a *-data.csv file, and its rows grouped by application
+def rows_by_app(path):
+    with open(str(path)) as lines:
+        header = next(lines)
+        app = header.rstrip('\n').split(',').index('App')
+        rows = OrderedDict()
+        for line in lines:
+            rows.setdefault(line.split(',', app + 1)[app], []).append(line)
+    return header, rows
+
+
+def load_cache(path):
+    try:
+        with path.open('rb') as cached:
+            cache = pickle.load(cached)
+    except (IOError, EOFError, pickle.UnpicklingError):
+        return {}
+    if cache.get('version') != (CACHE_VERSION, pandas.__version__):
+        return {}
+    return cache['pieces']
+
+
+def save_cache(path, pieces):
+    temp = path.with_name(path.name + '.tmp')
+    with temp.open('wb') as out:
+        pickle.dump({'version': (CACHE_VERSION, pandas.__version__), 'pieces': pieces}, out, pickle.HIGHEST_PROTOCOL)
+    temp.replace(path)
+
+
+# build every intermediate table from the *-data.csv files in directory,
+# write any that changed, and return them as basename -> CSV text
+def build(directory=SUMMARIZE_DIR):
+    directory = Path(directory)
+    sizes = read_sizes(directory / 'applications.csv')
+    cached = load_cache(directory / CACHE_NAME)
+    pieces = {}
+    tables = OrderedDict()
+    for feedback in FEEDBACKS:
+        header, rows = rows_by_app(directory / (feedback + '-data.csv'))
+        for app, lines in sorted(rows.items()):
+            digest = hashlib.sha1((header + ''.join(lines)).encode()).hexdigest()
+            key = (feedback, app)
+            if key in cached and cached[key][0] == digest:
+                pieces[key] = cached[key]
+                continue
+            csv = pandas.read_csv(StringIO(header + ''.join(lines)))
+            pieces[key] = (digest, dict((aspect, piece(csv)) for aspect, piece in PIECES.items()))
+        for aspect, finish in FINISHES.items():
+            tables[feedback + '-' + aspect] = finish(
+                [pieces[(feedback, app)][1][aspect] for app in sorted(rows)], sizes)
+    save_cache(directory / CACHE_NAME, pieces)
+
+    for basename, text in tables.items():
+        path = directory / (basename + '.csv')
+        if not path.exists() or path.read_text() != text:
+            path.write_text(text)
+    return tables